@@ -0,0 +1,139 @@
+"""Проверка переносов в дереве видов деятельности на 100k узлов
+
+Сравнивается прежняя проверка (подъём от родителя по одному find_one на
+уровень, каждый с загрузкой детей) с одним запросом check_move, а для
+перестройки — чтение дерева целиком и проверка переносов в памяти
+(src.activity.tree.check_moves) против check_move на каждый перенос.
+Последним замером переносы применяются move_many.
+
+Дерево строится во внешней транзакции, которая в конце откатывается:
+коммиты репозитория становятся точками сохранения, данные БД не меняются.
+
+    python -m benchmarks.activity_tree --nodes 100000 --depth 6 --moves 1000
+"""
+import argparse
+import asyncio
+import math
+import random
+import statistics
+import time
+
+from sqlalchemy import insert, text
+
+from src.activity.models import Activity
+from src.activity.repository import ActivityRepository
+from src.activity.tree import check_moves
+from src.common.database import create_session_maker, engine
+
+
+async def build_tree(session, nodes: int, depth: int) -> list[list[int]]:
+    """Уровни дерева: fanout детей у каждого узла, всего не больше nodes"""
+    fanout = math.ceil(nodes ** (1 / depth))
+    stmt = insert(Activity).returning(Activity.id, sort_by_parameter_order=True)
+    levels: list[list[int]] = []
+    parents: list[int | None] = [None]
+    total = 0
+    for level in range(depth):
+        rows = [
+            {"name": f"Бенчмарк {level}.{n}", "parent_id": parent}
+            for n, parent in enumerate(p for p in parents for _ in range(fanout))
+        ][: nodes - total]
+        ids = list((await session.execute(stmt, rows)).scalars().all())
+        levels.append(ids)
+        total += len(ids)
+        parents = ids
+    return levels
+
+
+async def legacy_walk(repository: ActivityRepository, session, activity_id: int, parent_id: int):
+    """Прежняя проверка: запрос на каждый уровень до корня"""
+    current_id = parent_id
+    while current_id is not None:
+        if current_id == activity_id:
+            return True
+        current = await repository.find_one(session, current_id)
+        current_id = current.parent_id
+    return False
+
+
+async def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--moves", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    repository = ActivityRepository()
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        maker = create_session_maker(conn)
+        async with maker(join_transaction_mode="create_savepoint") as session:
+            started = time.perf_counter()
+            levels = await build_tree(session, args.nodes, args.depth)
+            # Статистика как у заполненной таблицы: иначе планировщик считает
+            # activities пустой и обходит дерево seq scan на каждом уровне
+            await session.execute(text("ANALYZE activities"))
+            print(
+                f"дерево: {sum(map(len, levels))} узлов, {args.depth} уровней, "
+                f"{(time.perf_counter() - started):.1f} с"
+            )
+
+            # Лист переносится под узел предпоследнего уровня другой ветки
+            leaf = levels[-1][-1]
+            target = levels[-2][0]
+            legacy = await timed(
+                lambda: legacy_walk(repository, session, leaf, target), args.repeat
+            )
+            single = await timed(
+                lambda: repository.check_move(session, leaf, target, args.depth),
+                args.repeat,
+            )
+            # Поддерево второго уровня под другой корень: спуск по поддереву
+            subtree = await timed(
+                lambda: repository.check_move(
+                    session, levels[1][-1], levels[0][0], args.depth + 1
+                ),
+                args.repeat,
+            )
+            print(f"{'перенос листа, по уровню':34} {legacy:9.2f} мс")
+            print(f"{'перенос листа, check_move':34} {single:9.2f} мс")
+            print(f"{'перенос поддерева, check_move':34} {subtree:9.2f} мс")
+
+            moves = {
+                id: rng.choice(levels[-2])
+                for id in rng.sample(levels[-1], min(args.moves, len(levels[-1])))
+            }
+            started = time.perf_counter()
+            tree = await repository.find_tree(session)
+            loaded = time.perf_counter()
+            check_moves(tree, moves, args.depth)
+            checked = time.perf_counter()
+            print(
+                f"{len(moves)} переносов в памяти: чтение дерева "
+                f"{(loaded - started) * 1000:.1f} мс, проверка "
+                f"{(checked - loaded) * 1000:.1f} мс"
+            )
+            print(
+                f"{len(moves)} переносов по check_move: ~{single * len(moves):.0f} мс"
+            )
+
+            started = time.perf_counter()
+            await repository.move_many(session, moves)
+            print(f"move_many: {(time.perf_counter() - started) * 1000:.1f} мс")
+        await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
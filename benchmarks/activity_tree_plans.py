@@ -0,0 +1,154 @@
+"""Поиск по поддереву вида деятельности: индекс против скана и выбор планировщика
+
+Для корня, среднего узла, популярного и редкого листа сравнивается время
+страницы find_by_activity_tree по GIN-индексу и последовательным сканом
+(только основной запрос, без загрузки связей), а
+также план, который выбирает src.organization.planner по размеру
+поддерева.
+
+Набор данных строится во внешней транзакции, которая в конце
+откатывается: --organizations организаций, у каждой один лист дерева
+5 × 10 × 20 со смещённой популярностью (первые листья частые, последние
+редкие), документы organization_search собираются refresh_search.
+
+    python -m benchmarks.activity_tree_plans --organizations 100000 --limit 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import Integer, bindparam, insert, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from src.activity.models import Activity
+from src.common.database import create_session_maker, engine
+from src.organization.planner import ActivityTreePlanner
+from src.organization.repository import (
+    FIND_BY_ACTIVITY_TREE,
+    FIND_BY_ACTIVITY_TREE_SCAN,
+    OrganizationRepository,
+)
+
+FANOUT = (5, 10, 20)
+
+BUILDINGS = text("""
+    INSERT INTO buildings (address, latitude, longitude)
+    SELECT 'Бенчмарк ' || g, 55.5 + random(), 37.5 + random()
+    FROM generate_series(1, 1000) g
+    RETURNING id
+""")
+ORGANIZATIONS = text("""
+    INSERT INTO organizations (name, building_id)
+    SELECT 'Бенчмарк ' || g, (:buildings)[1 + g % cardinality(:buildings)]
+    FROM generate_series(1, :count) g
+    RETURNING id
+""").bindparams(bindparam("buildings", type_=ARRAY(Integer)))
+# power(random(), 3) сгущает выбор к началу списка листьев
+LINKS = text("""
+    INSERT INTO organization_activities (organization_id, activity_id)
+    SELECT id, (:leaves)[1 + floor(power(random(), 3) * cardinality(:leaves))::int]
+    FROM unnest(:organizations) id
+""").bindparams(
+    bindparam("leaves", type_=ARRAY(Integer)),
+    bindparam("organizations", type_=ARRAY(Integer)),
+)
+
+# Новые документы лежат в списке ожидания GIN-индексов секций, который
+# каждый поиск просматривает целиком; в работающей базе его разбирает
+# autovacuum, внутри откатываемой транзакции — только явный вызов
+CLEAN_PENDING = text("""
+    SELECT gin_clean_pending_list(inhrelid)
+    FROM pg_inherits
+    WHERE inhparent = 'ix_organization_search_activity_ids'::regclass
+""")
+
+
+async def build(session, count: int) -> list[list[int]]:
+    levels: list[list[int]] = []
+    parents: list[int | None] = [None]
+    for depth, fanout in enumerate(FANOUT):
+        rows = [
+            {"name": f"Бенчмарк {depth}.{n}", "parent_id": parent}
+            for n, parent in enumerate(p for p in parents for _ in range(fanout))
+        ]
+        stmt = insert(Activity).returning(Activity.id, sort_by_parameter_order=True)
+        ids = list((await session.execute(stmt, rows)).scalars().all())
+        levels.append(ids)
+        parents = ids
+
+    buildings = list((await session.execute(BUILDINGS)).scalars().all())
+    organizations = list(
+        (
+            await session.execute(ORGANIZATIONS, {"buildings": buildings, "count": count})
+        ).scalars().all()
+    )
+    await session.execute(
+        LINKS, {"leaves": levels[-1], "organizations": organizations}
+    )
+    # Без статистики по новым строкам сборка документов уходит во вложенные
+    # циклы по всей таблице, а оценки поддеревьев — в пустые секции
+    for table in ("activities", "organizations", "organization_activities"):
+        await session.execute(text(f"ANALYZE {table}"))
+    await OrganizationRepository().refresh_search(session, organizations)
+    await session.execute(text("ANALYZE organization_search"))
+    await session.execute(CLEAN_PENDING)
+    return levels
+
+
+async def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--organizations", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    planner = ActivityTreePlanner()
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        maker = create_session_maker(conn)
+        async with maker(join_transaction_mode="create_savepoint") as session:
+            started = time.perf_counter()
+            levels = await build(session, args.organizations)
+            await planner.refresh(session, force=True)
+            print(f"данные: {args.organizations} организаций, {time.perf_counter() - started:.1f} с")
+
+            cases = {
+                "корень": levels[0][0],
+                "средний узел": levels[1][0],
+                "популярный лист": levels[2][0],
+                "редкий лист": levels[2][-1],
+            }
+            print(
+                f"{'поддерево':16} {'организаций':>11} {'индекс, мс':>11} "
+                f"{'скан, мс':>9} {'выбор':>6}"
+            )
+            for name, activity_id in cases.items():
+                params = {"activity_id": activity_id, "limit": args.limit, "offset": 0}
+                timings = {}
+                for plan, stmt in (("index", FIND_BY_ACTIVITY_TREE), ("scan", FIND_BY_ACTIVITY_TREE_SCAN)):
+                    timings[plan] = await timed(
+                        lambda: session.execute(stmt, params),
+                        args.repeat,
+                    )
+                    session.expunge_all()
+                choice = planner.choose(activity_id, args.limit, 0)
+                print(
+                    f"{name:16} {planner.estimate(activity_id):11} "
+                    f"{timings['index']:11.2f} {timings['scan']:9.2f} {choice:>6}"
+                )
+        await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
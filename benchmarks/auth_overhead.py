@@ -0,0 +1,62 @@
+"""Накладные расходы проверки ключа API на запрос
+
+Вызывает verify_api_key напрямую, без HTTP и БД, и печатает среднее время
+на вызов для ключа без лимитов, с token bucket + квотой и для неверного ключа.
+
+    python -m benchmarks.auth_overhead --iterations 200000
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from fastapi import HTTPException
+
+from src.common.api_keys import ApiKeyStore, InMemoryRateLimiter, hash_api_key
+from src.common import verify_key
+
+
+async def measure(key: str, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            await verify_key.verify_api_key(key)
+        except HTTPException:
+            pass
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    keys_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+    json.dump(
+        [
+            {"name": "plain", "key_hash": hash_api_key("plain")},
+            {
+                "name": "limited",
+                "key_hash": hash_api_key("limited"),
+                "rate": 1e9,
+                "burst": 10**9,
+                "quota": 10**12,
+            },
+        ],
+        keys_file,
+    )
+    keys_file.close()
+    verify_key.api_key_store = ApiKeyStore(path=keys_file.name)
+    verify_key.rate_limiter = InMemoryRateLimiter()
+
+    for label, key in (
+        ("без лимитов", "plain"),
+        ("token bucket + квота", "limited"),
+        ("неверный ключ", "wrong"),
+    ):
+        print(f"{label:>22}: {await measure(key, args.iterations):6.2f} мкс/запрос")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
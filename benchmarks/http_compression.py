@@ -0,0 +1,116 @@
+"""Размер и время ответов списка организаций: сжатие и условный GET
+
+Без --url скрипт сжимает синтетическую страницу из 100 организаций (тот же
+формат, что у GET /api/organizations) каждой доступной кодировкой и
+печатает размер и время сжатия. С --url запросы идут к запущенному
+приложению: для каждой кодировки — байты на проводе и медианное время
+ответа, затем повтор с If-None-Match полученного ETag (ответ 304 без
+обращения к БД).
+
+    python -m benchmarks.http_compression
+    python -m benchmarks.http_compression --url "http://localhost:8123/api/organizations?limit=100" --api-key ...
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import urllib.error
+import urllib.request
+
+from src.common.compression import ENCODERS
+
+STREETS = ["Ленина", "Гагарина", "Мира", "Советская", "Блюхера 32/1", "Красный проспект"]
+ACTIVITIES = ["Еда", "Мясная продукция", "Молочная продукция", "Автомобили", "Запчасти"]
+
+
+def synthetic_page(size: int = 100) -> bytes:
+    rng = random.Random(0)
+    page = []
+    for i in range(size):
+        activity_ids = rng.sample(range(len(ACTIVITIES)), 2)
+        page.append(
+            {
+                "id": 1000 + i,
+                "name": f'ООО "{rng.choice(ACTIVITIES)} {i}"',
+                "phones": [
+                    {"phone": f"8-923-{rng.randint(100, 999)}-{rng.randint(10, 99)}-13"}
+                    for _ in range(rng.randint(1, 3))
+                ],
+                "building_id": rng.randint(1, 500),
+                "building_address": f"г. Москва, ул. {rng.choice(STREETS)}, {rng.randint(1, 99)}",
+                "activity_ids": activity_ids,
+                "activity_names": [ACTIVITIES[a] for a in activity_ids],
+                "version": 1,
+            }
+        )
+    return json.dumps(page, ensure_ascii=False).encode()
+
+
+def offline(number: int):
+    body = synthetic_page()
+    print(f"{'кодировка':<10} {'байт':>8} {'доля':>7} {'сжатие, мс':>11}")
+    print(f"{'identity':<10} {len(body):>8} {1:>7.0%} {0:>11.3f}")
+    for name, encode in ENCODERS.items():
+        compressed = encode(body)
+        started = time.perf_counter()
+        for _ in range(number):
+            encode(body)
+        elapsed = (time.perf_counter() - started) / number * 1000
+        print(
+            f"{name:<10} {len(compressed):>8} {len(compressed) / len(body):>7.1%} "
+            f"{elapsed:>11.3f}"
+        )
+
+
+def fetch(url: str, headers: dict) -> tuple[int, int, dict, float]:
+    request = urllib.request.Request(url, headers=headers)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            status, response_headers = response.status, response.headers
+    except urllib.error.HTTPError as e:
+        body, status, response_headers = e.read(), e.code, e.headers
+    return status, len(body), response_headers, time.perf_counter() - started
+
+
+def online(url: str, api_key: str, number: int):
+    print(f"{'кодировка':<14} {'статус':>6} {'байт':>8} {'p50, мс':>8}")
+    etag = None
+    for name in ("identity", *ENCODERS):
+        headers = {"api-key": api_key, "Accept-Encoding": name}
+        timings = []
+        for _ in range(number):
+            status, size, response_headers, elapsed = fetch(url, headers)
+            timings.append(elapsed)
+        etag = response_headers.get("ETag") or etag
+        print(
+            f"{name:<14} {status:>6} {size:>8} {statistics.median(timings) * 1000:>8.2f}"
+        )
+    if etag is None:
+        print("ETag не выставлен: нет подписки на уведомления или включено шардирование")
+        return
+    timings = []
+    for _ in range(number):
+        status, size, _, elapsed = fetch(url, {"api-key": api_key, "If-None-Match": etag})
+        timings.append(elapsed)
+    print(
+        f"{'If-None-Match':<14} {status:>6} {size:>8} {statistics.median(timings) * 1000:>8.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+    if args.url:
+        online(args.url, args.api_key, args.number)
+    else:
+        offline(args.number)
+
+
+if __name__ == "__main__":
+    main()
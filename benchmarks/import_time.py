@@ -0,0 +1,66 @@
+"""Время импорта приложения (холодный старт воркера)
+
+Запускает `python -X importtime -c "import src.main"` в отдельных
+процессах и печатает медиану общего времени и модули с наибольшим
+собственным временем. С --budget-ms завершается с кодом 1, если медиана
+превышает бюджет, — так проверку можно включить в CI.
+
+    python -m benchmarks.import_time --runs 5 --budget-ms 1500
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def profile_import(module: str) -> tuple[float, dict[str, float]]:
+    """Общее время импорта и собственное время модулей, мс"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    own, total = {}, 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        own[name.strip()] = int(self_us) / 1000
+        if name.strip() == module:
+            total = int(cumulative_us) / 1000
+    return total, own
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="src.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float)
+    args = parser.parse_args()
+
+    totals = []
+    own: defaultdict[str, list[float]] = defaultdict(list)
+    for _ in range(args.runs):
+        total, modules = profile_import(args.module)
+        totals.append(total)
+        for name, ms in modules.items():
+            own[name].append(ms)
+
+    median = statistics.median(totals)
+    print(f"import {args.module}: медиана {median:.0f} мс, минимум {min(totals):.0f} мс")
+    print("Собственное время модулей (медиана), мс:")
+    top = sorted(own.items(), key=lambda item: -statistics.median(item[1]))
+    for name, values in top[: args.top]:
+        print(f"  {statistics.median(values):>8.1f}  {name}")
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"Бюджет {args.budget_ms:.0f} мс превышен")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
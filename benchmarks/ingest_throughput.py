@@ -0,0 +1,87 @@
+"""Сравнение скорости создания организаций: синхронный путь и очередь
+
+Запуск (нужна БД с применёнными миграциями и тестовыми данными из src.seed):
+
+    python -m benchmarks.ingest_throughput --count 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+
+from src.activity.models import Activity
+from src.building.models import Building
+from src.common.database import async_session_maker, engine
+from src.organization.ingest import OrganizationIngestQueue
+from src.organization.repository import OrganizationRepository
+from src.organization.schemas import OrganizationCreateSchema
+
+
+def make_payloads(count: int, building_id: int, activity_id: int):
+    return [
+        OrganizationCreateSchema(
+            name=f"bench-org-{i}",
+            phones=[{"phone": "8-800-555-35-35"}],
+            building_id=building_id,
+            activity_ids=[activity_id],
+        )
+        for i in range(count)
+    ]
+
+
+async def bench_sync(payloads, concurrency: int) -> float:
+    repository = OrganizationRepository()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(data: OrganizationCreateSchema):
+        async with semaphore, async_session_maker() as session:
+            await repository.create_many(session, [data.model_dump()])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(create(data) for data in payloads))
+    return len(payloads) / (time.perf_counter() - started)
+
+
+async def bench_queue(payloads, batch_size: int, concurrency: int) -> float:
+    queue = OrganizationIngestQueue(
+        repository=OrganizationRepository(), batch_size=batch_size
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def submit(data: OrganizationCreateSchema):
+        async with semaphore, async_session_maker() as session:
+            await queue.submit(session, data)
+
+    await queue.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(submit(data) for data in payloads))
+    async with async_session_maker() as session:
+        while await queue.pending(session):
+            await asyncio.sleep(queue.flush_interval)
+    elapsed = time.perf_counter() - started
+    await queue.stop()
+    return len(payloads) / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    async with async_session_maker() as session:
+        building_id = (await session.execute(select(Building.id).limit(1))).scalar_one()
+        activity_id = (await session.execute(select(Activity.id).limit(1))).scalar_one()
+
+    payloads = make_payloads(args.count, building_id, activity_id)
+    sync_rate = await bench_sync(payloads, args.concurrency)
+    print(f"sync:  {sync_rate:10.0f} вставок/с (concurrency={args.concurrency})")
+    queue_rate = await bench_queue(payloads, args.batch_size, args.concurrency)
+    print(f"queue: {queue_rate:10.0f} вставок/с (batch_size={args.batch_size})")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""Стоимость логирования в обработке запроса
+
+Сравнивает время вызова logger.error в event loop для прежнего синхронного
+цветного вывода и для JSON-вывода через очередь (LOG_FORMAT=json), в том
+числе когда поток вывода медленный (stderr, перенаправленный в
+перегруженный сборщик логов, имитируется задержкой записи). Затем
+измеряет накладные расходы RequestLogMiddleware на запрос при разной доле
+выборки успешных запросов. БД не нужна.
+
+    python -m benchmarks.logging_overhead --number 20000
+"""
+import argparse
+import asyncio
+import io
+import time
+
+from loguru import logger
+
+from src.common.logger import QueueSink
+from src.common.request_log import RequestLogMiddleware
+
+TEXT_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return super().write(text)
+
+
+def log_calls(number: int) -> float:
+    error = ConnectionRefusedError("connection refused")
+    started = time.perf_counter()
+    for i in range(number):
+        logger.error(f"Ошибка при получении списка организаций: {str(error)} ({i})")
+    return (time.perf_counter() - started) / number * 1e6
+
+
+def measure_sinks(number: int, delay: float):
+    print(f"logger.error, мкс на вызов (задержка записи {delay * 1000:.1f} мс):")
+    logger.remove()
+    logger.add(SlowStream(delay), format=TEXT_FORMAT, colorize=True)
+    print(f"  text, синхронно      {log_calls(number):>8.2f}")
+
+    logger.remove()
+    sink = QueueSink(SlowStream(delay), maxsize=number)
+    logger.add(sink, format="{message}", backtrace=False, diagnose=False)
+    print(f"  json, через очередь  {log_calls(number):>8.2f}")
+    logger.remove()
+
+
+async def app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"[]"})
+
+
+async def measure_middleware(number: int):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/organizations",
+        "headers": [],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    logger.add(QueueSink(io.StringIO(), maxsize=number), format="{message}")
+    print("Накладные расходы на запрос, мкс:")
+    started = time.perf_counter()
+    for _ in range(number):
+        await app(scope, receive, send)
+    baseline = (time.perf_counter() - started) / number * 1e6
+    for rate in (0.0, 0.01, 1.0):
+        wrapped = RequestLogMiddleware(app, sample_rate=rate, sample_rates={})
+        started = time.perf_counter()
+        for _ in range(number):
+            await wrapped(scope, receive, send)
+        elapsed = (time.perf_counter() - started) / number * 1e6
+        print(f"  выборка {rate:>5.0%}  {elapsed - baseline:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--slow-delay", type=float, default=0.001)
+    args = parser.parse_args()
+    measure_sinks(args.number, 0)
+    measure_sinks(max(args.number // 20, 1), args.slow_delay)
+    asyncio.run(measure_middleware(args.number))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Ближайшие организации вида деятельности: KNN по индексу против сортировки поддерева
+
+Для каждого вида деятельности из выборки сравнивается время запроса
+find_nearest_by_activity_tree (KNN-скан GiST-индекса organization_search) и
+наивного варианта, который выбирает все организации поддерева через связи,
+считает расстояние и сортирует. Корневые виды деятельности дают большие поддеревья, листья —
+маленькие.
+
+Запуск (нужна БД с применёнными миграциями и тестовыми данными из src.seed):
+
+    python -m benchmarks.nearest_activity --repeat 50 --limit 10
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import Float, func, select
+
+from src.activity.models import Activity, OrganizationActivity
+from src.activity.tree import activity_subtree
+from src.building.models import Building
+from src.common.database import async_session_maker, engine
+from src.organization.models import Organization
+from src.organization.repository import OrganizationRepository
+
+
+async def naive_nearest(session, activity_id: int, lat: float, lon: float, limit: int):
+    subtree = activity_subtree(Activity.id == activity_id)
+    distance = func.point(Building.longitude, Building.latitude).op(
+        "<->", return_type=Float
+    )(func.point(lon, lat))
+    # OFFSET 0 не даёт планировщику свести запрос к KNN-скану
+    candidates = (
+        select(Organization.id, distance.label("distance"))
+        .join(Building, Organization.building_id == Building.id)
+        .join(
+            OrganizationActivity,
+            OrganizationActivity.organization_id == Organization.id,
+        )
+        .where(OrganizationActivity.activity_id.in_(select(subtree.c.id)))
+        .distinct()
+        .offset(0)
+        .subquery()
+    )
+    stmt = (
+        select(candidates.c.id).order_by(candidates.c.distance).limit(limit)
+    )
+    return (await session.execute(stmt)).all()
+
+
+async def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    repository = OrganizationRepository()
+    async with async_session_maker() as session:
+        activities = (
+            await session.execute(select(Activity.id, Activity.name).order_by(Activity.id))
+        ).all()
+        bounds = (
+            await session.execute(
+                select(
+                    func.min(Building.latitude),
+                    func.max(Building.latitude),
+                    func.min(Building.longitude),
+                    func.max(Building.longitude),
+                )
+            )
+        ).one()
+
+        print(f"{'activity':30} {'subtree':>8} {'knn, мс':>9} {'sort, мс':>9}")
+        for activity_id, name in activities:
+            size = (
+                await session.execute(
+                    select(func.count(func.distinct(OrganizationActivity.organization_id)))
+                    .where(
+                        OrganizationActivity.activity_id.in_(
+                            select(activity_subtree(Activity.id == activity_id).c.id)
+                        )
+                    )
+                )
+            ).scalar_one()
+            lat = random.uniform(bounds[0], bounds[1])
+            lon = random.uniform(bounds[2], bounds[3])
+            knn = await timed(
+                lambda: repository.find_nearest_by_activity_tree(
+                    session, activity_id, lat, lon, args.limit
+                ),
+                args.repeat,
+            )
+            naive = await timed(
+                lambda: naive_nearest(session, activity_id, lat, lon, args.limit),
+                args.repeat,
+            )
+            print(f"{name[:30]:30} {size:8} {knn:9.2f} {naive:9.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""Накладные расходы Python на запрос: построение выражения и ключ кэша
+
+До выполнения в БД SQLAlchemy строит выражение и вычисляет его ключ в
+кэше компиляции. Скрипт сравнивает прежний вариант (новый select(...)
+.options(...) на каждый вызов) с выражениями, построенными один раз в
+репозиториях. С флагом --db дополнительно измеряется полное время вызова
+репозитория против БД (нужны миграции и данные из src.seed).
+
+    python -m benchmarks.query_overhead --number 20000
+    python -m benchmarks.query_overhead --db --number 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import timeit
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from src.activity import repository as activity_repository
+from src.activity.models import Activity
+from src.building import repository as building_repository
+from src.building.models import Building
+from src.common.database import async_session_maker, engine
+from src.common.metrics import metrics
+from src.organization import repository as organization_repository
+from src.organization.models import Organization, OrganizationSearch
+
+
+def old_organization_find_one(id: int):
+    return (
+        select(Organization)
+        .where(Organization.id == id)
+        .options(
+            selectinload(Organization.building),
+            selectinload(Organization.activities),
+            selectinload(Organization.phones),
+        )
+    )
+
+
+def old_organization_activity_tree(activity_id: int):
+    return (
+        select(Organization)
+        .join(OrganizationSearch, OrganizationSearch.id == Organization.id)
+        .where(OrganizationSearch.activity_ids.contains([activity_id]))
+        .options(
+            selectinload(Organization.building),
+            selectinload(Organization.activities),
+            selectinload(Organization.phones),
+        )
+        .limit(10)
+        .offset(0)
+    )
+
+
+def old_activity_find_one(id: int):
+    return (
+        select(Activity)
+        .where(Activity.id == id)
+        .options(
+            selectinload(Activity.parent),
+            selectinload(Activity.children),
+            selectinload(Activity.organizations),
+        )
+    )
+
+
+def old_building_find_one(id: int):
+    return select(Building).where(Building.id == id)
+
+
+CASES = [
+    (
+        "organization.find_one",
+        old_organization_find_one,
+        organization_repository.FIND_ONE,
+    ),
+    (
+        "organization.find_by_activity_tree",
+        old_organization_activity_tree,
+        organization_repository.FIND_BY_ACTIVITY_TREE,
+    ),
+    ("activity.find_one", old_activity_find_one, activity_repository.FIND_ONE),
+    ("building.find_one", old_building_find_one, building_repository.FIND_ONE),
+]
+
+
+def bench_python(number: int):
+    print(f"{'запрос':36} {'было, мкс':>10} {'стало, мкс':>11}")
+    for name, build, prepared in CASES:
+        before = timeit.timeit(lambda: build(1)._generate_cache_key(), number=number)
+        after = timeit.timeit(lambda: prepared._generate_cache_key(), number=number)
+        print(f"{name:36} {before / number * 1e6:10.1f} {after / number * 1e6:11.2f}")
+
+
+async def bench_db(number: int):
+    repository = organization_repository.OrganizationRepository()
+    async with async_session_maker() as session:
+        org_id = (await session.execute(select(Organization.id).limit(1))).scalar_one()
+        samples = []
+        for _ in range(number):
+            started = time.perf_counter()
+            await repository.find_one(session, org_id)
+            samples.append(time.perf_counter() - started)
+            session.expunge_all()
+    print(
+        f"organization.find_one против БД: медиана "
+        f"{statistics.median(samples) * 1000:.3f} мс"
+    )
+    print(
+        "кэш компиляции: "
+        + ", ".join(
+            f"{key.rsplit('.', 1)[1]}={value:g}"
+            for key, value in metrics.snapshot().items()
+            if key.startswith("db.compiled_cache.")
+        )
+    )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--db", action="store_true")
+    args = parser.parse_args()
+    bench_python(args.number)
+    if args.db:
+        asyncio.run(bench_db(args.number))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Пропускная способность production-профиля в зависимости от числа воркеров
+
+Для каждого числа воркеров поднимает gunicorn с gunicorn.conf.py и
+нагружает его keep-alive соединениями на время --duration. Нужна БД с
+применёнными миграциями и тестовыми данными (src.seed).
+
+    python -m benchmarks.serving_throughput --workers 1 2 4 8 --connections 64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from src.common.config import API_KEY
+
+DEFAULT_PATHS = [
+    "/api/organizations?limit=100",
+    "/api/organizations?activity_id=1",
+    "/api/activities",
+    "/api/buildings/1",
+]
+
+
+async def wait_for_port(host: str, port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Сервер на {host}:{port} не запустился")
+
+
+async def run_connection(host, port, paths, deadline, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\napi-key: {API_KEY}\r\n\r\n".encode()
+        )
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in headers.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - started)
+    writer.close()
+
+
+async def load(host, port, paths, connections, duration):
+    latencies: list[float] = []
+    deadline = time.monotonic() + duration
+    await asyncio.gather(
+        *(
+            run_connection(host, port, paths, deadline, latencies)
+            for _ in range(connections)
+        )
+    )
+    latencies.sort()
+    return (
+        len(latencies) / duration,
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8124)
+    parser.add_argument("--path", action="append", dest="paths")
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+
+    print(f"{'workers':>8} {'req/s':>10} {'p50, мс':>9} {'p99, мс':>9}")
+    for workers in args.workers:
+        env = dict(
+            os.environ,
+            WEB_CONCURRENCY=str(workers),
+            WEB_BIND=f"127.0.0.1:{args.port}",
+            RUN_MIGRATIONS_IN_MASTER="false",
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "src.main:app", "-c", "gunicorn.conf.py"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            asyncio.run(wait_for_port("127.0.0.1", args.port))
+            rps, p50, p99 = asyncio.run(
+                load("127.0.0.1", args.port, paths, args.connections, args.duration)
+            )
+            print(f"{workers:>8} {rps:>10.0f} {p50:>9.1f} {p99:>9.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
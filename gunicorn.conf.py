@@ -0,0 +1,49 @@
+"""Production-профиль запуска: gunicorn с uvicorn-воркерами
+
+    gunicorn src.main:app -c gunicorn.conf.py
+
+Все параметры задаются переменными окружения, см. src/common/config.py.
+"""
+import os
+import subprocess
+
+# Миграции выполняет мастер-процесс один раз, а не каждый воркер в lifespan
+os.environ.setdefault("RUN_MIGRATIONS", "false")
+
+from src.common.config import (  # noqa: E402
+    WEB_BACKLOG,
+    WEB_GRACEFUL_TIMEOUT,
+    WEB_KEEPALIVE,
+    WEB_PRELOAD,
+    WEB_WORKERS,
+)
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:8123")
+workers = WEB_WORKERS
+worker_class = "src.common.worker.TunedUvicornWorker"
+backlog = WEB_BACKLOG
+keepalive = WEB_KEEPALIVE
+graceful_timeout = WEB_GRACEFUL_TIMEOUT
+preload_app = WEB_PRELOAD
+
+
+def on_starting(server):
+    if os.getenv("RUN_MIGRATIONS_IN_MASTER", "true").lower() == "true":
+        subprocess.run("alembic upgrade head", shell=True, check=True)
+    # Приложение уже импортировано мастером: маршруты и маперы строятся
+    # здесь один раз, lifespan воркеров их только проверяет
+    if preload_app:
+        from src.main import app, configure
+
+        configure(app)
+
+
+def post_fork(server, worker):
+    # При preload_app движок создан до fork: соединения пула родителя
+    # нельзя использовать в дочернем процессе, поэтому пул сбрасывается
+    # без закрытия чужих сокетов и воркер открывает свои соединения
+    if preload_app:
+        from src.common.database import shard_router
+
+        for shard in shard_router.shards:
+            shard.engine.sync_engine.dispose(close=False)
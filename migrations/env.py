@@ -8,9 +8,19 @@ from logging.config import fileConfig
 
 from src.common.config import DB_HOST, DB_PORT, DB_USER, DB_NAME, DB_PASS
 from src.common.database import Base
+from src.common.models import QueryCallSite
 from src.building.models import Building
-from src.organization.models import Organization, OrganizationPhone
+from src.organization.models import (
+    ActivityTreeStats,
+    Organization,
+    OrganizationIngestJob,
+    OrganizationPhone,
+    OrganizationSearch,
+    OrganizationSearchState,
+)
 from src.activity.models import Activity, OrganizationActivity
+from src.changes.models import ChangeTombstone
+from src.dedup.models import DuplicateCandidate
 
 config = context.config
 
@@ -21,7 +31,16 @@ config.set_section_option(section, "DB_USER", DB_USER)
 config.set_section_option(section, "DB_NAME", DB_NAME)
 config.set_section_option(section, "DB_PASS", DB_PASS)
 
-if config.config_file_name is not None:
+# Шард мигрируется той же цепочкой: alembic -x url=<url шарда> upgrade head
+shard_url = context.get_x_argument(as_dictionary=True).get("url")
+if shard_url:
+    config.set_main_option("sqlalchemy.url", shard_url.replace("%", "%%"))
+
+# Тесты применяют миграции на своём соединении (со схемой теста в
+# search_path): command.upgrade с config.attributes["connection"]
+shared_connection = config.attributes.get("connection")
+
+if config.config_file_name is not None and shared_connection is None:
     fileConfig(config.config_file_name)
 
 target_metadata = Base.metadata
@@ -77,6 +96,9 @@ async def run_async_migrations() -> None:
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
+    if shared_connection is not None:
+        do_run_migrations(shared_connection)
+        return
     asyncio.run(run_async_migrations())
 
 
@@ -0,0 +1,31 @@
+"""version columns
+
+Revision ID: 3c1f7a2b9d40
+Revises: afe91c91d80c
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f7a2b9d40'
+down_revision: Union[str, None] = 'afe91c91d80c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('activities', 'buildings', 'organizations'):
+        op.add_column(
+            table,
+            sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        )
+
+
+def downgrade() -> None:
+    for table in ('organizations', 'buildings', 'activities'):
+        op.drop_column(table, 'version')
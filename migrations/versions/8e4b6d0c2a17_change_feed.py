@@ -0,0 +1,134 @@
+"""change feed columns and triggers
+
+Revision ID: 8e4b6d0c2a17
+Revises: 3c1f7a2b9d40
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4b6d0c2a17'
+down_revision: Union[str, None] = '3c1f7a2b9d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# таблица -> имя сущности в ленте изменений
+TRACKED_TABLES = {
+    'organizations': 'organization',
+    'buildings': 'building',
+    'activities': 'activity',
+    'organization_phones': 'phone',
+}
+
+
+def upgrade() -> None:
+    op.create_table('change_tombstones',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('entity', sa.String(length=32), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_change_tombstones_change_seq'), 'change_tombstones', ['change_seq'], unique=False)
+
+    for table in TRACKED_TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+        op.add_column(table, sa.Column('change_seq', sa.BigInteger(), server_default='1', nullable=False))
+        op.create_index(op.f(f'ix_{table}_change_seq'), table, ['change_seq'], unique=False)
+
+    # change_seq — id транзакции, которая последней изменила строку. Лента
+    # отдаёт только строки транзакций старше xmin текущего снимка, поэтому
+    # транзакция с меньшим номером не может закоммититься позже уже
+    # отданной клиенту позиции.
+    op.execute("""
+        CREATE FUNCTION mark_change() RETURNS trigger AS $$
+        BEGIN
+            NEW.change_seq := pg_current_xact_id()::text::bigint;
+            NEW.updated_at := now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION record_deletions() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO change_tombstones (entity, record_id, change_seq)
+            SELECT TG_ARGV[0], id, pg_current_xact_id()::text::bigint
+            FROM deleted_rows;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION notify_directory_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('directory_changes', '');
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    # Связи с видами деятельности входят в событие организации, поэтому
+    # их изменение помечает организацию изменённой
+    op.execute("""
+        CREATE FUNCTION touch_linked_organizations() RETURNS trigger AS $$
+        BEGIN
+            UPDATE organizations SET updated_at = now()
+            WHERE id IN (SELECT organization_id FROM changed_links);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    for table, entity in TRACKED_TABLES.items():
+        op.execute(f"""
+            CREATE TRIGGER {table}_mark_change
+            BEFORE INSERT OR UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION mark_change()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_record_deletions
+            AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS deleted_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION record_deletions('{entity}')
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_change
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_directory_change()
+        """)
+    op.execute("""
+        CREATE TRIGGER organization_activities_insert_touch
+        AFTER INSERT ON organization_activities
+        REFERENCING NEW TABLE AS changed_links
+        FOR EACH STATEMENT EXECUTE FUNCTION touch_linked_organizations()
+    """)
+    op.execute("""
+        CREATE TRIGGER organization_activities_delete_touch
+        AFTER DELETE ON organization_activities
+        REFERENCING OLD TABLE AS changed_links
+        FOR EACH STATEMENT EXECUTE FUNCTION touch_linked_organizations()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER organization_activities_delete_touch ON organization_activities")
+    op.execute("DROP TRIGGER organization_activities_insert_touch ON organization_activities")
+    for table in TRACKED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_notify_change ON {table}")
+        op.execute(f"DROP TRIGGER {table}_record_deletions ON {table}")
+        op.execute(f"DROP TRIGGER {table}_mark_change ON {table}")
+        op.drop_index(op.f(f'ix_{table}_change_seq'), table_name=table)
+        op.drop_column(table, 'change_seq')
+        op.drop_column(table, 'updated_at')
+    op.execute("DROP FUNCTION touch_linked_organizations()")
+    op.execute("DROP FUNCTION notify_directory_change()")
+    op.execute("DROP FUNCTION record_deletions()")
+    op.execute("DROP FUNCTION mark_change()")
+    op.drop_index(op.f('ix_change_tombstones_change_seq'), table_name='change_tombstones')
+    op.drop_table('change_tombstones')
@@ -0,0 +1,85 @@
+"""data versions from sequences instead of a shared row
+
+Revision ID: a4e9c7f2d6b8
+Revises: f2d8a5c3b7e1
+Create Date: 2026-10-20 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e9c7f2d6b8'
+down_revision: Union[str, None] = 'f2d8a5c3b7e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DATA_VERSIONS = ('organizations', 'buildings', 'activities', 'organization_search')
+
+# Строки data_versions под UPDATE держались до конца транзакции и
+# выстраивали всех писателей группы в очередь. nextval не блокирует, но
+# номера выдаются не в порядке коммитов, поэтому подписчик берёт версию из
+# последнего уведомления, а не максимум (см. ChangeNotifier)
+BUMP_FROM_SEQUENCE = """
+    CREATE OR REPLACE FUNCTION bump_data_version(version_name text) RETURNS bigint AS $$
+    DECLARE
+        new_version bigint;
+    BEGIN
+        new_version := nextval(('data_version_' || version_name)::regclass);
+        PERFORM pg_notify('directory_changes', version_name || ':' || new_version);
+        RETURN new_version;
+    END
+    $$ LANGUAGE plpgsql
+"""
+BUMP_FROM_ROW = """
+    CREATE OR REPLACE FUNCTION bump_data_version(version_name text) RETURNS bigint AS $$
+    DECLARE
+        new_version bigint;
+    BEGIN
+        INSERT INTO data_versions AS d (name, version) VALUES (version_name, 1)
+        ON CONFLICT (name) DO UPDATE SET version = d.version + 1
+        RETURNING d.version INTO new_version;
+        PERFORM pg_notify('directory_changes', version_name || ':' || new_version);
+        RETURN new_version;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    for name in DATA_VERSIONS:
+        op.execute(f"CREATE SEQUENCE data_version_{name}")
+        op.execute(f"""
+            SELECT setval('data_version_{name}', version)
+            FROM data_versions WHERE name = '{name}' AND version > 0
+        """)
+    op.execute(BUMP_FROM_SEQUENCE)
+    op.drop_table('data_versions')
+    # Последние выданные номера для подписчиков; номер может принадлежать
+    # ещё не закоммиченной транзакции
+    op.execute(
+        "CREATE VIEW data_versions AS "
+        + " UNION ALL ".join(
+            f"SELECT '{name}'::varchar(63) AS name, "
+            f"CASE WHEN is_called THEN last_value ELSE 0 END AS version "
+            f"FROM data_version_{name}"
+            for name in DATA_VERSIONS
+        )
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER VIEW data_versions RENAME TO data_versions_sequences")
+    op.create_table('data_versions',
+    sa.Column('name', sa.String(length=63), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO data_versions SELECT name, version FROM data_versions_sequences")
+    op.execute("DROP VIEW data_versions_sequences")
+    op.execute(BUMP_FROM_ROW)
+    for name in DATA_VERSIONS:
+        op.execute(f"DROP SEQUENCE data_version_{name}")
@@ -0,0 +1,95 @@
+"""per-table data versions for conditional GET
+
+Revision ID: a7d4c2e8f3b1
+Revises: f1c3e7a9b2d4
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d4c2e8f3b1'
+down_revision: Union[str, None] = 'f1c3e7a9b2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# таблица -> версия данных, которую она увеличивает. Телефоны и связи с
+# видами деятельности пишутся вместе с организацией и делят её версию:
+# одна строка на группу таблиц, которые пишутся в одной транзакции,
+# не даёт встречным транзакциям блокировать строки версий в разном порядке
+VERSIONED_TABLES = {
+    'organizations': 'organizations',
+    'organization_phones': 'organizations',
+    'buildings': 'buildings',
+    'activities': 'activities',
+}
+# Версию organization_search увеличивает фоновое обновление таблицы поиска
+DATA_VERSIONS = ('organizations', 'buildings', 'activities', 'organization_search')
+
+
+def upgrade() -> None:
+    op.create_table('data_versions',
+    sa.Column('name', sa.String(length=63), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute(
+        "INSERT INTO data_versions (name) VALUES "
+        + ", ".join(f"('{name}')" for name in DATA_VERSIONS)
+    )
+    # Строка версии блокируется до конца транзакции, поэтому версии растут
+    # в порядке коммитов, а уведомления приходят в том же порядке
+    op.execute("""
+        CREATE FUNCTION bump_data_version(version_name text) RETURNS bigint AS $$
+        DECLARE
+            new_version bigint;
+        BEGIN
+            INSERT INTO data_versions AS d (name, version) VALUES (version_name, 1)
+            ON CONFLICT (name) DO UPDATE SET version = d.version + 1
+            RETURNING d.version INTO new_version;
+            PERFORM pg_notify('directory_changes', version_name || ':' || new_version);
+            RETURN new_version;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION notify_data_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM bump_data_version(TG_ARGV[0]);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table, version_name in VERSIONED_TABLES.items():
+        op.execute(f"DROP TRIGGER {table}_notify_change ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_change
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_data_change('{version_name}')
+        """)
+    op.execute("DROP FUNCTION notify_directory_change()")
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE FUNCTION notify_directory_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('directory_changes', '');
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_notify_change ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_change
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_directory_change()
+        """)
+    op.execute("DROP FUNCTION notify_data_change()")
+    op.execute("DROP FUNCTION bump_data_version(text)")
+    op.drop_table('data_versions')
@@ -0,0 +1,32 @@
+"""query call sites table
+
+Revision ID: b3f7d1e9c5a2
+Revises: a4e9c7f2d6b8
+Create Date: 2026-10-20 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f7d1e9c5a2'
+down_revision: Union[str, None] = 'a4e9c7f2d6b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('query_call_sites',
+    sa.Column('fingerprint', sa.String(length=32), nullable=False),
+    sa.Column('call_site', sa.String(length=255), nullable=False),
+    sa.Column('query', sa.Text(), nullable=False),
+    sa.Column('seen_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('fingerprint', 'call_site')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('query_call_sites')
@@ -0,0 +1,27 @@
+"""geo_region bit order, per-organization search source (moved)
+
+Revision ID: b5e1f9c3d7a2
+Revises: a7d4c2e8f3b1
+Create Date: 2026-10-19 20:00:00.000000
+
+Исправления перенесены в ревизии e7c4b1d9a3f5 (представление
+organization_search_source с подзапросом на организацию) и f2d8a5c3b7e1
+(geo_region со скобками и пересборка organization_search). Ревизия
+оставлена пустой, чтобы не рвать цепочку у баз, где она уже применена.
+"""
+from typing import Sequence, Union
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e1f9c3d7a2'
+down_revision: Union[str, None] = 'a7d4c2e8f3b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    pass
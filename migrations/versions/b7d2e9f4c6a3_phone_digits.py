@@ -0,0 +1,35 @@
+"""normalized phone digits
+
+Revision ID: b7d2e9f4c6a3
+Revises: 8e4b6d0c2a17
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e9f4c6a3'
+down_revision: Union[str, None] = '8e4b6d0c2a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('organization_phones', sa.Column(
+        'phone_digits',
+        sa.String(length=20, collation='C'),
+        sa.Computed("regexp_replace(phone, '\\D', '', 'g')", persisted=True),
+        nullable=False,
+    ))
+    op.create_index(op.f('ix_organization_phones_phone_digits'), 'organization_phones', ['phone_digits'], unique=False)
+    op.create_index(op.f('ix_organization_phones_organization_id'), 'organization_phones', ['organization_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_organization_phones_organization_id'), table_name='organization_phones')
+    op.drop_index(op.f('ix_organization_phones_phone_digits'), table_name='organization_phones')
+    op.drop_column('organization_phones', 'phone_digits')
@@ -0,0 +1,47 @@
+"""organization duplicate candidates
+
+Revision ID: c4a8f1e3b5d9
+Revises: b7d2e9f4c6a3
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8f1e3b5d9'
+down_revision: Union[str, None] = 'b7d2e9f4c6a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Триграммный индекс нужен поиску дубликатов и ускоряет поиск ILIKE '%...%'
+    op.execute(
+        "CREATE INDEX ix_organizations_name_trgm ON organizations "
+        "USING gin (name gin_trgm_ops)"
+    )
+    op.create_table('organization_duplicate_candidates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('left_id', sa.Integer(), nullable=False),
+    sa.Column('right_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('reason', sa.String(length=16), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('left_id', 'right_id')
+    )
+    op.create_index(op.f('ix_organization_duplicate_candidates_right_id'), 'organization_duplicate_candidates', ['right_id'], unique=False)
+    op.create_index(op.f('ix_organization_duplicate_candidates_status'), 'organization_duplicate_candidates', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_organization_duplicate_candidates_status'), table_name='organization_duplicate_candidates')
+    op.drop_index(op.f('ix_organization_duplicate_candidates_right_id'), table_name='organization_duplicate_candidates')
+    op.drop_table('organization_duplicate_candidates')
+    op.execute("DROP INDEX ix_organizations_name_trgm")
@@ -0,0 +1,28 @@
+"""indexes for activity subtree walks
+
+Revision ID: c8f2a6d1e4b9
+Revises: b5e1f9c3d7a2
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f2a6d1e4b9'
+down_revision: Union[str, None] = 'b5e1f9c3d7a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_activities_parent_id'), 'activities', ['parent_id'], unique=False)
+    op.create_index(op.f('ix_organization_activities_activity_id'), 'organization_activities', ['activity_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_organization_activities_activity_id'), table_name='organization_activities')
+    op.drop_index(op.f('ix_activities_parent_id'), table_name='activities')
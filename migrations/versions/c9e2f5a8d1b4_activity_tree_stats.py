@@ -0,0 +1,34 @@
+"""shared activity subtree statistics
+
+Revision ID: c9e2f5a8d1b4
+Revises: b3f7d1e9c5a2
+Create Date: 2026-10-20 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e2f5a8d1b4'
+down_revision: Union[str, None] = 'b3f7d1e9c5a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('activity_tree_stats',
+    sa.Column('id', sa.SmallInteger(), nullable=False),
+    sa.Column('activity_ids', postgresql.ARRAY(sa.Integer()), nullable=True),
+    sa.Column('organizations', postgresql.ARRAY(sa.Integer()), nullable=True),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('activity_tree_stats')
@@ -0,0 +1,40 @@
+"""organization ingest jobs table
+
+Revision ID: d3a9e6b2f7c1
+Revises: c8f2a6d1e4b9
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a9e6b2f7c1'
+down_revision: Union[str, None] = 'c8f2a6d1e4b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('organization_ingest_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_organization_ingest_jobs_pending', 'organization_ingest_jobs', ['created_at'], unique=False, postgresql_where=sa.text("status = 'pending'"))
+    op.create_index(op.f('ix_organization_ingest_jobs_updated_at'), 'organization_ingest_jobs', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_organization_ingest_jobs_updated_at'), table_name='organization_ingest_jobs')
+    op.drop_index('ix_organization_ingest_jobs_pending', table_name='organization_ingest_jobs', postgresql_where=sa.text("status = 'pending'"))
+    op.drop_table('organization_ingest_jobs')
@@ -0,0 +1,28 @@
+"""indexes for nearest organization search
+
+Revision ID: d9e3a7b1f2c8
+Revises: c4a8f1e3b5d9
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e3a7b1f2c8'
+down_revision: Union[str, None] = 'c4a8f1e3b5d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_buildings_location', 'buildings', [sa.text('point(longitude, latitude)')], unique=False, postgresql_using='gist')
+    op.create_index(op.f('ix_organizations_building_id'), 'organizations', ['building_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_organizations_building_id'), table_name='organizations')
+    op.drop_index('ix_buildings_location', table_name='buildings')
@@ -0,0 +1,119 @@
+"""denormalized organization search table
+
+Revision ID: e5b2c8d4a1f6
+Revises: d9e3a7b1f2c8
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b2c8d4a1f6'
+down_revision: Union[str, None] = 'd9e3a7b1f2c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Документ организации в том виде, в каком он хранится в
+    # organization_search. Общий WITH RECURSIVE не раскрывается
+    # планировщиком, и условие по o.id до него не доходит: замыкание
+    # строится для всего дерева, см. e7c4b1d9a3f5.
+    op.execute("""
+        CREATE VIEW organization_search_source AS
+        WITH RECURSIVE activity_paths (id, ancestor_id) AS (
+            SELECT id, id FROM activities
+            UNION ALL
+            SELECT p.id, a.parent_id
+            FROM activity_paths p
+            JOIN activities a ON a.id = p.ancestor_id
+            WHERE a.parent_id IS NOT NULL
+        )
+        SELECT
+            o.id,
+            o.name,
+            o.building_id,
+            b.address,
+            b.latitude,
+            b.longitude,
+            coalesce((
+                SELECT array_agg(DISTINCT p.ancestor_id)
+                FROM organization_activities oa
+                JOIN activity_paths p ON p.id = oa.activity_id
+                WHERE oa.organization_id = o.id
+            ), '{}') AS activity_ids,
+            coalesce((
+                SELECT array_agg(DISTINCT ph.phone_digits)
+                FROM organization_phones ph
+                WHERE ph.organization_id = o.id
+            ), '{}') AS phone_digits,
+            o.change_seq
+        FROM organizations o
+        JOIN buildings b ON b.id = o.building_id
+    """)
+    op.create_table('organization_search',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('building_id', sa.Integer(), nullable=False),
+    sa.Column('address', sa.String(length=255), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('activity_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.Column('phone_digits', postgresql.ARRAY(sa.String(length=20, collation='C')), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('organization_search_state',
+    sa.Column('id', sa.SmallInteger(), nullable=False),
+    sa.Column('watermark', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Позиция берётся до заполнения: всё, что изменится во время миграции,
+    # будет повторно обработано обновлением, это безопасно
+    op.execute("""
+        INSERT INTO organization_search_state (id, watermark)
+        SELECT 1, pg_snapshot_xmin(pg_current_snapshot())::text::bigint
+    """)
+    op.execute("INSERT INTO organization_search SELECT * FROM organization_search_source")
+
+    op.create_index(op.f('ix_organization_search_building_id'), 'organization_search', ['building_id'], unique=False)
+    op.execute(
+        "CREATE INDEX ix_organization_search_name_trgm ON organization_search "
+        "USING gin (name gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_activity_ids ON organization_search "
+        "USING gin (activity_ids)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_phone_digits ON organization_search "
+        "USING gin (phone_digits)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_location ON organization_search "
+        "USING gist (point(longitude, latitude))"
+    )
+    # Поиск ближайших теперь идёт по organization_search
+    op.execute("DROP INDEX ix_buildings_location")
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE INDEX ix_buildings_location ON buildings "
+        "USING gist (point(longitude, latitude))"
+    )
+    op.execute("DROP INDEX ix_organization_search_location")
+    op.execute("DROP INDEX ix_organization_search_phone_digits")
+    op.execute("DROP INDEX ix_organization_search_activity_ids")
+    op.execute("DROP INDEX ix_organization_search_name_trgm")
+    op.drop_index(op.f('ix_organization_search_building_id'), table_name='organization_search')
+    op.drop_table('organization_search_state')
+    op.drop_table('organization_search')
+    op.execute("DROP VIEW organization_search_source")
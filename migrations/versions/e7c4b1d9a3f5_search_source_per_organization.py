@@ -0,0 +1,125 @@
+"""per-organization search source, phone tombstones with organization id
+
+Revision ID: e7c4b1d9a3f5
+Revises: d3a9e6b2f7c1
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c4b1d9a3f5'
+down_revision: Union[str, None] = 'd3a9e6b2f7c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Предки видов деятельности считаются подзапросом на каждую организацию:
+# представление без WITH на верхнем уровне раскрывается планировщиком, и
+# условие refresh_search по id доходит до organizations. С общим WITH
+# RECURSIVE замыкание строилось для всего дерева при каждой записи.
+SOURCE_SELECT = """
+    SELECT
+        o.id,
+        o.name,
+        o.building_id,
+        b.address,
+        b.latitude,
+        b.longitude,
+        coalesce((
+            WITH RECURSIVE paths (ancestor_id) AS (
+                SELECT oa.activity_id
+                FROM organization_activities oa
+                WHERE oa.organization_id = o.id
+                UNION
+                SELECT a.parent_id
+                FROM paths p
+                JOIN activities a ON a.id = p.ancestor_id
+                WHERE a.parent_id IS NOT NULL
+            )
+            SELECT array_agg(ancestor_id ORDER BY ancestor_id) FROM paths
+        ), '{}') AS activity_ids,
+        coalesce((
+            SELECT array_agg(DISTINCT ph.phone_digits)
+            FROM organization_phones ph
+            WHERE ph.organization_id = o.id
+        ), '{}') AS phone_digits,
+        o.change_seq,
+        geo_region(b.latitude, b.longitude) AS region
+    FROM organizations o
+    JOIN buildings b ON b.id = o.building_id
+"""
+
+PREVIOUS_SOURCE_SELECT = """
+    WITH RECURSIVE activity_paths (id, ancestor_id) AS (
+        SELECT id, id FROM activities
+        UNION ALL
+        SELECT p.id, a.parent_id
+        FROM activity_paths p
+        JOIN activities a ON a.id = p.ancestor_id
+        WHERE a.parent_id IS NOT NULL
+    )
+    SELECT
+        o.id,
+        o.name,
+        o.building_id,
+        b.address,
+        b.latitude,
+        b.longitude,
+        coalesce((
+            SELECT array_agg(DISTINCT p.ancestor_id)
+            FROM organization_activities oa
+            JOIN activity_paths p ON p.id = oa.activity_id
+            WHERE oa.organization_id = o.id
+        ), '{}') AS activity_ids,
+        coalesce((
+            SELECT array_agg(DISTINCT ph.phone_digits)
+            FROM organization_phones ph
+            WHERE ph.organization_id = o.id
+        ), '{}') AS phone_digits,
+        o.change_seq,
+        geo_region(b.latitude, b.longitude) AS region
+    FROM organizations o
+    JOIN buildings b ON b.id = o.building_id
+"""
+
+
+def upgrade() -> None:
+    op.execute("CREATE OR REPLACE VIEW organization_search_source AS " + SOURCE_SELECT)
+
+    # Удалённый телефон меняет документ своей организации, а строки
+    # телефона уже нет: организация запоминается в записи об удалении
+    op.add_column('change_tombstones', sa.Column('organization_id', sa.Integer(), nullable=True))
+    op.execute("""
+        CREATE FUNCTION record_phone_deletions() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO change_tombstones (entity, record_id, organization_id, change_seq)
+            SELECT 'phone', id, organization_id, pg_current_xact_id()::text::bigint
+            FROM deleted_rows;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER organization_phones_record_deletions ON organization_phones")
+    op.execute("""
+        CREATE TRIGGER organization_phones_record_deletions
+        AFTER DELETE ON organization_phones
+        REFERENCING OLD TABLE AS deleted_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION record_phone_deletions()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER organization_phones_record_deletions ON organization_phones")
+    op.execute("""
+        CREATE TRIGGER organization_phones_record_deletions
+        AFTER DELETE ON organization_phones
+        REFERENCING OLD TABLE AS deleted_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION record_deletions('phone')
+    """)
+    op.execute("DROP FUNCTION record_phone_deletions()")
+    op.drop_column('change_tombstones', 'organization_id')
+    op.execute("CREATE OR REPLACE VIEW organization_search_source AS " + PREVIOUS_SOURCE_SELECT)
@@ -0,0 +1,156 @@
+"""partition organization_search by geographic region
+
+Revision ID: f1c3e7a9b2d4
+Revises: e5b2c8d4a1f6
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c3e7a9b2d4'
+down_revision: Union[str, None] = 'e5b2c8d4a1f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Регионы — первый символ geohash, см. src/common/geo.py
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+SOURCE_SELECT = """
+    WITH RECURSIVE activity_paths (id, ancestor_id) AS (
+        SELECT id, id FROM activities
+        UNION ALL
+        SELECT p.id, a.parent_id
+        FROM activity_paths p
+        JOIN activities a ON a.id = p.ancestor_id
+        WHERE a.parent_id IS NOT NULL
+    )
+    SELECT
+        o.id,
+        o.name,
+        o.building_id,
+        b.address,
+        b.latitude,
+        b.longitude,
+        coalesce((
+            SELECT array_agg(DISTINCT p.ancestor_id)
+            FROM organization_activities oa
+            JOIN activity_paths p ON p.id = oa.activity_id
+            WHERE oa.organization_id = o.id
+        ), '{}') AS activity_ids,
+        coalesce((
+            SELECT array_agg(DISTINCT ph.phone_digits)
+            FROM organization_phones ph
+            WHERE ph.organization_id = o.id
+        ), '{}') AS phone_digits,
+        o.change_seq{region}
+    FROM organizations o
+    JOIN buildings b ON b.id = o.building_id
+"""
+
+
+def _create_search_table(partitioned: bool) -> None:
+    columns = [
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('building_id', sa.Integer(), nullable=False),
+        sa.Column('address', sa.String(length=255), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('activity_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('phone_digits', postgresql.ARRAY(sa.String(length=20, collation='C')), nullable=False),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['id'], ['organizations.id'], ondelete='CASCADE'),
+    ]
+    if partitioned:
+        op.create_table('organization_search',
+        *columns,
+        sa.Column('region', sa.String(length=1), nullable=False),
+        sa.PrimaryKeyConstraint('region', 'id'),
+        postgresql_partition_by='LIST (region)'
+        )
+        for region in GEOHASH_ALPHABET:
+            op.execute(
+                f"CREATE TABLE organization_search_{region} "
+                f"PARTITION OF organization_search FOR VALUES IN ('{region}')"
+            )
+        op.create_index(op.f('ix_organization_search_id'), 'organization_search', ['id'], unique=False)
+    else:
+        op.create_table('organization_search', *columns, sa.PrimaryKeyConstraint('id'))
+
+
+def _create_search_indexes() -> None:
+    op.create_index(op.f('ix_organization_search_building_id'), 'organization_search', ['building_id'], unique=False)
+    op.execute(
+        "CREATE INDEX ix_organization_search_name_trgm ON organization_search "
+        "USING gin (name gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_activity_ids ON organization_search "
+        "USING gin (activity_ids)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_phone_digits ON organization_search "
+        "USING gin (phone_digits)"
+    )
+    op.execute(
+        "CREATE INDEX ix_organization_search_location ON organization_search "
+        "USING gist (point(longitude, latitude))"
+    )
+
+
+def _fill() -> None:
+    # Как и при создании таблицы: позиция до заполнения, остальное дочитает
+    # фоновое обновление
+    op.execute("""
+        UPDATE organization_search_state
+        SET watermark = pg_snapshot_xmin(pg_current_snapshot())::text::bigint
+    """)
+    op.execute("INSERT INTO organization_search SELECT * FROM organization_search_source")
+
+
+def upgrade() -> None:
+    # Регион по формуле src.common.geo.region_of при REGION_PRECISION = 1:
+    # 8 ячеек по долготе и 4 по широте, биты чередуются с долготы
+    op.execute("""
+        CREATE FUNCTION geo_region(latitude double precision, longitude double precision)
+        RETURNS varchar(1) AS $$
+            SELECT substr(
+                '0123456789bcdefghjkmnpqrstuvwxyz',
+                ((((lo >> 2) & 1) << 4) | (((la >> 1) & 1) << 3)
+                 | (((lo >> 1) & 1) << 2) | ((la & 1) << 1) | (lo & 1)) + 1,
+                1
+            )::varchar(1)
+            FROM (
+                SELECT
+                    least(greatest(floor((longitude + 180) / 360 * 8)::int, 0), 7) AS lo,
+                    least(greatest(floor((latitude + 90) / 180 * 4)::int, 0), 3) AS la
+            ) cell
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """)
+    op.execute("DROP TABLE organization_search")
+    op.execute("DROP VIEW organization_search_source")
+    op.execute(
+        "CREATE VIEW organization_search_source AS "
+        + SOURCE_SELECT.replace(
+            "{region}", ",\n        geo_region(b.latitude, b.longitude) AS region"
+        )
+    )
+    _create_search_table(partitioned=True)
+    _create_search_indexes()
+    _fill()
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE organization_search")
+    op.execute("DROP VIEW organization_search_source")
+    op.execute("CREATE VIEW organization_search_source AS " + SOURCE_SELECT.replace("{region}", ""))
+    _create_search_table(partitioned=False)
+    _create_search_indexes()
+    _fill()
+    op.execute("DROP FUNCTION geo_region(double precision, double precision)")
@@ -0,0 +1,51 @@
+"""repair geo_region bit order on databases with the unparenthesized version
+
+Revision ID: f2d8a5c3b7e1
+Revises: e7c4b1d9a3f5
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d8a5c3b7e1'
+down_revision: Union[str, None] = 'e7c4b1d9a3f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # В Postgres <<, & и | одного приоритета и выполняются слева направо.
+    # Ранняя версия f1c3e7a9b2d4 собирала индекс без скобок, и строки
+    # organization_search не находили секцию; функция заменяется исправленной
+    # (как в f1c3e7a9b2d4 сейчас), документы пересобираются с верным регионом
+    op.execute("""
+        CREATE OR REPLACE FUNCTION geo_region(latitude double precision, longitude double precision)
+        RETURNS varchar(1) AS $$
+            SELECT substr(
+                '0123456789bcdefghjkmnpqrstuvwxyz',
+                ((((lo >> 2) & 1) << 4) | (((la >> 1) & 1) << 3)
+                 | (((lo >> 1) & 1) << 2) | ((la & 1) << 1) | (lo & 1)) + 1,
+                1
+            )::varchar(1)
+            FROM (
+                SELECT
+                    least(greatest(floor((longitude + 180) / 360 * 8)::int, 0), 7) AS lo,
+                    least(greatest(floor((latitude + 90) / 180 * 4)::int, 0), 3) AS la
+            ) cell
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    """)
+    op.execute("""
+        UPDATE organization_search_state
+        SET watermark = pg_snapshot_xmin(pg_current_snapshot())::text::bigint
+    """)
+    op.execute("DELETE FROM organization_search")
+    op.execute("INSERT INTO organization_search SELECT * FROM organization_search_source")
+
+
+def downgrade() -> None:
+    # Прежняя формула региона неверна, функция остаётся исправленной
+    pass
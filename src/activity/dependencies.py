@@ -1,6 +1,15 @@
 from src.activity.repository import ActivityRepository
 from src.activity.service import ActivityService
+from src.common.config import DIRECTORY_BACKEND
+
+
+def activity_repository() -> ActivityRepository:
+    if DIRECTORY_BACKEND == "replica":
+        from src.replica.repository import ReplicaActivityRepository
+
+        return ReplicaActivityRepository()
+    return ActivityRepository()
 
 
 def activity_service() -> ActivityService:
-    return ActivityService(repository=ActivityRepository())
+    return ActivityService(repository=activity_repository())
@@ -1,4 +1,14 @@
-from sqlalchemy import String, Integer, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    FetchedValue,
+    ForeignKey,
+    Integer,
+    String,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.common.database import Base
 
@@ -9,7 +19,23 @@ class Activity(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     parent_id: Mapped[int | None] = mapped_column(
-        ForeignKey("activities.id"), nullable=True
+        ForeignKey("activities.id"), nullable=True, index=True
+    )
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1"
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
+    )
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        index=True,
+        server_default="1",
+        server_onupdate=FetchedValue(),
     )
 
     parent: Mapped["Activity | None"] = relationship(
@@ -29,5 +55,5 @@ class OrganizationActivity(Base):
         ForeignKey("organizations.id"), primary_key=True
     )
     activity_id: Mapped[int] = mapped_column(
-        ForeignKey("activities.id"), primary_key=True
+        ForeignKey("activities.id"), primary_key=True, index=True
     )
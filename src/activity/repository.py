@@ -1,50 +1,233 @@
-from sqlalchemy import select, insert
+from sqlalchemy import (
+    Integer,
+    String,
+    any_,
+    bindparam,
+    column,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from src.common.repository import SQLAlchemyRepository
-from src.activity.models import Activity
+from src.activity.models import Activity, OrganizationActivity
+
+# Опции загрузки ниже настраивают все мапперы, поэтому модели связей
+# должны быть импортированы до них
+from src.building.models import Building  # noqa: F401
+from src.organization.models import Organization  # noqa: F401
+from src.common.exceptions import ItemNotExist
+from src.common.fields import FieldSet, ResponseField
+from src.activity.tree import activity_subtree
+from src.organization.repository import OrganizationRepository
+
+# Горячие запросы строятся один раз, значения передаются параметрами.
+# LIMIT NULL и OFFSET NULL в Postgres означают отсутствие ограничения.
+# Ответ использует только дочерние виды деятельности: родитель и
+# организации не загружаются
+WITH_RELATIONS = (selectinload(Activity.children),)
+FIND_ONE = (
+    select(Activity)
+    .where(Activity.id == bindparam("id", type_=Integer))
+    .options(*WITH_RELATIONS)
+)
+FIND_ALL = (
+    select(Activity)
+    .limit(bindparam("limit", type_=Integer))
+    .offset(bindparam("offset", type_=Integer))
+)
+# Нужен только для проверки уникальности названия
+FIND_BY_NAME = select(Activity).where(Activity.name == bindparam("name", type_=String))
+FIND_MANY = (
+    select(Activity)
+    .where(Activity.id == any_(bindparam("ids", type_=ARRAY(Integer))))
+    .order_by(Activity.id)
+    .options(*WITH_RELATIONS)
+)
+# Строки для пакетного эндпоинта (src.batch), без загрузки детей
+FIND_ROWS = select(
+    Activity.id, Activity.name, Activity.parent_id, Activity.version
+).where(Activity.id == any_(bindparam("ids", type_=ARRAY(Integer))))
+# Дерево целиком для проверки перестройки в памяти (src.activity.tree).
+# Два массива в одной строке вместо строки на узел: на 100k узлов разбор
+# строк результата стоил в 6-9 раз дороже. Оба агрегата читают одни и те же
+# строки в одном порядке, поэтому элементы массивов соответствуют друг другу
+FIND_TREE = select(func.array_agg(Activity.id), func.array_agg(Activity.parent_id))
+
+# Проверка переноса (или создания, id = NULL) одним запросом: предки нового
+# родителя с его глубиной, признак цикла — перемещаемый узел среди предков
+# родителя — и высота поддерева перемещаемого узла. Спуск по поддереву
+# ограничен max_depth уровнями: глубже превышение уже очевидно
+_ID = bindparam("id", type_=Integer)
+_PARENT_ID = bindparam("parent_id", type_=Integer)
+_ancestors = (
+    select(Activity.id, Activity.parent_id, literal(1, Integer).label("depth"))
+    .where(Activity.id == _PARENT_ID)
+    .cte("ancestors", recursive=True)
+)
+_ancestors = _ancestors.union_all(
+    select(Activity.id, Activity.parent_id, _ancestors.c.depth + 1)
+    .join(_ancestors, Activity.id == _ancestors.c.parent_id)
+    .where(_ancestors.c.id.is_distinct_from(_ID))
+)
+_descendants = (
+    select(Activity.id, literal(0, Integer).label("height"))
+    .where(Activity.id == _ID)
+    .cte("descendants", recursive=True)
+)
+_descendants = _descendants.union_all(
+    select(Activity.id, _descendants.c.height + 1)
+    .join(_descendants, Activity.parent_id == _descendants.c.id)
+    .where(_descendants.c.height < bindparam("max_depth", type_=Integer))
+)
+MOVE_CHECK = select(
+    select(func.count())
+    .select_from(_ancestors)
+    .scalar_subquery()
+    .label("parent_depth"),
+    exists().where(_ancestors.c.id == _ID).label("cycle"),
+    select(func.coalesce(func.max(_descendants.c.height), 0))
+    .scalar_subquery()
+    .label("height"),
+)
+# Изменения дерева выполняются по очереди: два параллельных переноса, каждый
+# допустимый по отдельности, вместе могут образовать цикл
+TREE_LOCK_KEY = 40_020
+LOCK_TREE = text("SELECT pg_advisory_xact_lock(:key)")
+
+ACTIVITY_FIELDS = FieldSet(
+    {
+        "id": ResponseField(columns=(Activity.id,)),
+        "name": ResponseField(columns=(Activity.name,)),
+        "parent_id": ResponseField(columns=(Activity.parent_id,)),
+        "version": ResponseField(columns=(Activity.version,)),
+        "children_ids": ResponseField(
+            relations=(Activity.children,),
+            value=lambda activity: [child.id for child in activity.children],
+        ),
+    },
+    default_options=WITH_RELATIONS,
+)
 
 
 class ActivityRepository(SQLAlchemyRepository[Activity]):
     model = Activity
+    fields = ACTIVITY_FIELDS
+    search = OrganizationRepository()
 
     async def find_one(self, session: AsyncSession, id: int):
-        stmt = (
-            select(self.model)
-            .where(self.model.id == id)
-            .options(
-                selectinload(self.model.parent),
-                selectinload(self.model.children),
-                selectinload(self.model.organizations),
+        return await self._find_existing(session, FIND_ONE, {"id": id})
+
+    async def find_all(
+        self,
+        session: AsyncSession,
+        limit: int = None,
+        offset: int = None,
+        fields: tuple | None = None,
+    ):
+        stmt = ACTIVITY_FIELDS.statement(FIND_ALL, fields)
+        res = await session.execute(stmt, {"limit": limit, "offset": offset})
+        return ACTIVITY_FIELDS.rows(res, fields)
+
+    async def warm_up(self, session: AsyncSession):
+        """Загружает дерево видов деятельности целиком
+
+        Дерево небольшое и читается почти каждым запросом поиска по виду
+        деятельности, поэтому его страницы заранее попадают в буферы БД.
+        """
+        await session.execute(FIND_ONE, {"id": 0})
+        await self.find_all(session)
+
+    async def find_many(self, session: AsyncSession, ids: list[int]) -> list[Activity]:
+        res = await session.execute(FIND_MANY, {"ids": ids})
+        return list(res.scalars().all())
+
+    async def find_rows(self, session: AsyncSession, ids: list[int]) -> dict[int, dict]:
+        """Виды деятельности ids словарями: id -> строка"""
+        res = await session.execute(FIND_ROWS, {"ids": ids})
+        return {row.id: dict(row._mapping) for row in res}
+
+    async def find_tree(self, session: AsyncSession) -> dict[int, int | None]:
+        """Дерево видов деятельности: id -> parent_id"""
+        ids, parents = (await session.execute(FIND_TREE)).one()
+        return dict(zip(ids or (), parents or ()))
+
+    async def lock_tree(self, session: AsyncSession):
+        """Блокирует изменения дерева до конца транзакции сессии"""
+        await session.execute(LOCK_TREE, {"key": TREE_LOCK_KEY})
+
+    async def check_move(
+        self,
+        session: AsyncSession,
+        id: int | None,
+        parent_id: int | None,
+        max_depth: int,
+    ):
+        """Строка parent_depth, cycle, height для переноса id под parent_id
+
+        parent_depth — глубина нового родителя (0 — родитель не найден или
+        не задан), height — высота поддерева id, не больше max_depth.
+        """
+        params = {"id": id, "parent_id": parent_id, "max_depth": max_depth}
+        return (await session.execute(MOVE_CHECK, params)).one()
+
+    async def update_one(
+        self, session: AsyncSession, id: int, data: dict, version: int | None = None
+    ):
+        """Обновление с оптимистической блокировкой, как в базовом классе
+
+        При смене родителя меняются предки у всего поддерева, поэтому
+        документы поиска его организаций пересобираются в той же транзакции.
+        """
+        stmt = update(self.model).where(self.model.id == id)
+        if version is not None:
+            stmt = stmt.where(self.model.version == version)
+        stmt = stmt.values(**data, version=self.model.version + 1).returning(self.model)
+        item = (await session.execute(stmt)).scalar_one_or_none()
+        if item is not None and "parent_id" in data:
+            await self._refresh_search(session, [id])
+        await session.commit()
+        return item
+
+    async def move_many(self, session: AsyncSession, moves: dict[int, int | None]):
+        """Переносит поддеревья одним UPDATE и пересобирает их документы поиска"""
+        batch = (
+            func.unnest(
+                bindparam("move_ids", list(moves), type_=ARRAY(Integer)),
+                bindparam(
+                    "move_parent_ids", list(moves.values()), type_=ARRAY(Integer)
+                ),
             )
+            .table_valued(column("id", Integer), column("parent_id", Integer))
+            .render_derived(name="moves")
         )
-        res = await session.execute(stmt)
-        return res.scalar_one()
+        stmt = (
+            update(self.model)
+            .where(self.model.id == batch.c.id)
+            .values(parent_id=batch.c.parent_id, version=self.model.version + 1)
+        )
+        await session.execute(stmt)
+        await self._refresh_search(session, list(moves))
+        await session.commit()
 
-    async def find_all(self, session: AsyncSession, limit: int = None, offset: int = None):
-        stmt = select(self.model).options(
-            selectinload(self.model.parent),
-            selectinload(self.model.children),
-            selectinload(self.model.organizations),
+    async def _refresh_search(self, session: AsyncSession, ids: list[int]) -> int:
+        subtree = activity_subtree(
+            self.model.id == any_(bindparam("subtree_ids", ids, type_=ARRAY(Integer)))
         )
-        if limit is not None:
-            stmt = stmt.limit(limit)
-        if offset is not None:
-            stmt = stmt.offset(offset)
-        res = await session.execute(stmt)
-        return res.scalars().all()
+        organizations = select(OrganizationActivity.organization_id).where(
+            OrganizationActivity.activity_id.in_(select(subtree.c.id))
+        )
+        return await self.search.refresh_search(session, organizations)
 
     async def find_by_name(self, session: AsyncSession, name: str):
-        stmt = (
-            select(self.model)
-            .where(self.model.name == name)
-            .options(
-                selectinload(self.model.parent),
-                selectinload(self.model.children),
-                selectinload(self.model.organizations),
-            )
-        )
-        res = await session.execute(stmt)
+        res = await session.execute(FIND_BY_NAME, {"name": name})
         return res.scalar_one_or_none()
 
     async def create_one(self, session: AsyncSession, data: dict) -> Activity:
@@ -52,3 +235,22 @@ class ActivityRepository(SQLAlchemyRepository[Activity]):
         res = await session.execute(stmt)
         await session.commit()
         return res.scalar_one()
+
+    async def delete_one(
+        self, session: AsyncSession, id: int, version: int | None = None
+    ):
+        """Удаление вида деятельности вместе со связями с организациями одним запросом"""
+        removed = delete(self.model).where(self.model.id == id)
+        if version is not None:
+            removed = removed.where(self.model.version == version)
+        removed = removed.returning(self.model.id).cte("removed")
+        links = (
+            delete(OrganizationActivity)
+            .where(OrganizationActivity.activity_id.in_(select(removed.c.id)))
+            .cte("removed_links")
+        )
+        res = await session.execute(select(removed.c.id).add_cte(links))
+        deleted_id = res.scalar_one_or_none()
+        await session.commit()
+        if deleted_id is None:
+            raise ItemNotExist
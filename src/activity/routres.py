@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.activity.schemas import ActivityResponseSchema, ActivityCreateSchema
+from src.activity.schemas import (
+    ActivityResponseSchema,
+    ActivityCreateSchema,
+    ActivityRestructureSchema,
+    ActivityUpdateSchema,
+)
 from src.activity.service import ActivityService
 from src.activity.dependencies import activity_service
 from src.common.database import get_async_session
+from src.common.conditional import ACTIVITY_VERSIONS, conditional_get
 from src.common.verify_key import verify_api_key
 from src.common.logger import logger
 from src.common.exceptions import (
+    ActivityDepthExceededException,
     ActivityNotFoundException,
     InvalidActivityDataException,
     DuplicateActivityNameException,
     ParentActivityNotFoundException,
     CircularDependencyException,
+    ActivityInUseException,
+    VersionConflictException,
+    InvalidFieldsException,
 )
 
 activity_router = APIRouter(
@@ -24,16 +35,28 @@ activity_router = APIRouter(
 @activity_router.get(
     "",
     response_model=list[ActivityResponseSchema],
-    description="Получить список всех видов деятельности с пагинацией",
+    description="Получить список всех видов деятельности с пагинацией. "
+    "С параметром fields возвращаются только перечисленные поля",
+    dependencies=[conditional_get(ACTIVITY_VERSIONS)],
 )
 async def get_activities(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    fields: str | None = Query(
+        None,
+        description="Поля ответа через запятую, например id,name. "
+        "Загружаются только нужные колонки и связи",
+    ),
     service: ActivityService = Depends(activity_service),
     session: AsyncSession = Depends(get_async_session),
 ):
     try:
-        return await service.get_activities(session, limit, offset)
+        activities = await service.get_activities(session, limit, offset, fields)
+        if fields is not None:
+            return JSONResponse(content=activities)
+        return activities
+    except InvalidFieldsException as e:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении списка видов деятельности: {str(e)}")
         raise HTTPException(
@@ -46,6 +69,7 @@ async def get_activities(
     "/{activity_id}",
     response_model=ActivityResponseSchema,
     description="Получить подробную информацию о виде деятельности по его идентификатору",
+    dependencies=[conditional_get(ACTIVITY_VERSIONS)],
 )
 async def get_activity(
     activity_id: int,
@@ -83,6 +107,7 @@ async def create_activity(
         DuplicateActivityNameException,
         ParentActivityNotFoundException,
         CircularDependencyException,
+        ActivityDepthExceededException,
     ) as e:
         raise
     except Exception as e:
@@ -91,3 +116,94 @@ async def create_activity(
             status_code=500,
             detail="Внутренняя ошибка сервера при создании вида деятельности",
         )
+
+
+@activity_router.post(
+    "/restructure",
+    response_model=list[ActivityResponseSchema],
+    description="Перенести несколько видов деятельности вместе с поддеревьями "
+    "в одной транзакции. Переносы проверяются вместе: цикл или превышение "
+    "глубины отклоняет весь запрос",
+)
+async def restructure_activities(
+    data: ActivityRestructureSchema,
+    service: ActivityService = Depends(activity_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.restructure(session, data)
+    except (
+        ActivityNotFoundException,
+        InvalidActivityDataException,
+        ParentActivityNotFoundException,
+        CircularDependencyException,
+        ActivityDepthExceededException,
+    ) as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при перестройке дерева видов деятельности: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при перестройке дерева видов деятельности",
+        )
+
+
+@activity_router.patch(
+    "/{activity_id}",
+    response_model=ActivityResponseSchema,
+    description="Частично обновить вид деятельности, в том числе перенести его "
+    "к другому родителю. Если передана версия, обновление выполняется только "
+    "при её совпадении",
+)
+async def update_activity(
+    activity_id: int,
+    data: ActivityUpdateSchema,
+    service: ActivityService = Depends(activity_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.update_activity(session, activity_id, data)
+    except (
+        ActivityNotFoundException,
+        InvalidActivityDataException,
+        DuplicateActivityNameException,
+        ParentActivityNotFoundException,
+        CircularDependencyException,
+        ActivityDepthExceededException,
+        VersionConflictException,
+    ) as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при обновлении вида деятельности {activity_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при обновлении вида деятельности",
+        )
+
+
+@activity_router.delete(
+    "/{activity_id}",
+    status_code=204,
+    description="Удалить вид деятельности без дочерних видов вместе с его связями",
+)
+async def delete_activity(
+    activity_id: int,
+    version: int | None = Query(None, description="Ожидаемая версия записи"),
+    service: ActivityService = Depends(activity_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        await service.delete_activity(session, activity_id, version)
+        return Response(status_code=204)
+    except (
+        ActivityNotFoundException,
+        ActivityInUseException,
+        VersionConflictException,
+    ) as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при удалении вида деятельности {activity_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при удалении вида деятельности",
+        )
@@ -1,5 +1,6 @@
+from src.common.config import ACTIVITY_RESTRUCTURE_MAX_MOVES
 from src.common.schema import BaseSchema
-from pydantic import model_validator
+from pydantic import Field, model_validator
 
 
 class ActivityCreateSchema(BaseSchema):
@@ -7,10 +8,28 @@ class ActivityCreateSchema(BaseSchema):
     parent_id: int | None = None
 
 
+class ActivityUpdateSchema(BaseSchema):
+    name: str | None = None
+    parent_id: int | None = None
+    version: int | None = None
+
+
+class ActivityMoveSchema(BaseSchema):
+    id: int
+    parent_id: int | None
+
+
+class ActivityRestructureSchema(BaseSchema):
+    moves: list[ActivityMoveSchema] = Field(
+        min_length=1, max_length=ACTIVITY_RESTRUCTURE_MAX_MOVES
+    )
+
+
 class ActivityResponseSchema(BaseSchema):
     id: int
     name: str
     parent_id: int | None
+    version: int
     children_ids: list[int]
 
     @model_validator(mode="before")
@@ -1,17 +1,30 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.activity.repository import ActivityRepository
-from src.activity.schemas import ActivityCreateSchema
+from src.activity.schemas import (
+    ActivityCreateSchema,
+    ActivityResponseSchema,
+    ActivityRestructureSchema,
+    ActivityUpdateSchema,
+)
+from src.activity.tree import check_moves
+from src.common.config import ACTIVITY_MAX_DEPTH
 from src.common.exceptions import (
+    ActivityDepthExceededException,
     ActivityNotFoundException,
     InvalidActivityDataException,
     DuplicateActivityNameException,
     ParentActivityNotFoundException,
     CircularDependencyException,
+    ActivityInUseException,
 )
 from src.common.exceptions import ItemNotExist
+from src.common.singleflight import SingleFlight
 
 
 class ActivityService:
+    _activity_flight = SingleFlight("activity")
+
     def __init__(self, repository: ActivityRepository):
         self.repository: ActivityRepository = repository
 
@@ -25,53 +38,110 @@ class ActivityService:
         if existing_activity:
             raise DuplicateActivityNameException(data.name)
 
-        # Если указан родительский вид деятельности, проверяем его существование
+        # Новый узел не может образовать цикл: проверяются только
+        # существование родителя и глубина
         if data.parent_id is not None:
-            try:
-                parent = await self.repository.find_one(session, data.parent_id)
-                if not parent:
-                    raise ParentActivityNotFoundException(data.parent_id)
-
-                # Проверка на циклическую зависимость
-                if await self._check_circular_dependency(
-                    session, data.parent_id, data.name
-                ):
-                    raise CircularDependencyException()
-            except ItemNotExist:
-                raise ParentActivityNotFoundException(data.parent_id)
+            await self._check_move(session, None, data.parent_id)
 
         data_dict = data.model_dump()
         return await self.repository.create_one(session, data_dict)
 
-    async def get_activity(self, session: AsyncSession, activity_id: int):
+    async def update_activity(
+        self, session: AsyncSession, activity_id: int, data: ActivityUpdateSchema
+    ):
+        changes = data.model_dump(exclude_unset=True, exclude={"version"})
+
+        if "name" in changes:
+            if not changes["name"] or len(changes["name"].strip()) == 0:
+                raise InvalidActivityDataException("Название не может быть пустым")
+            existing_activity = await self.repository.find_by_name(
+                session, changes["name"]
+            )
+            if existing_activity and existing_activity.id != activity_id:
+                raise DuplicateActivityNameException(changes["name"])
+
+        if "parent_id" in changes:
+            await self._check_move(session, activity_id, changes["parent_id"])
+
+        activity = await self.repository.update_one(
+            session, activity_id, changes, data.version
+        )
+        if activity is None:
+            await self.repository.raise_missing_or_conflict(
+                session, activity_id, data.version, ActivityNotFoundException
+            )
+        return await self.repository.find_one(session, activity_id)
+
+    async def delete_activity(
+        self, session: AsyncSession, activity_id: int, version: int | None = None
+    ):
         try:
-            return await self.repository.find_one(session, activity_id)
+            await self.repository.delete_one(session, activity_id, version)
         except ItemNotExist:
-            raise ActivityNotFoundException(activity_id)
+            await self.repository.raise_missing_or_conflict(
+                session, activity_id, version, ActivityNotFoundException
+            )
+        except IntegrityError:
+            await session.rollback()
+            raise ActivityInUseException(activity_id)
 
-    async def get_activities(self, session: AsyncSession, limit: int = None, offset: int = None):
-        return await self.repository.find_all(session, limit, offset)
+    async def restructure(self, session: AsyncSession, data: ActivityRestructureSchema):
+        """Переносит несколько поддеревьев в одной транзакции
 
-    async def _check_circular_dependency(
-        self, session: AsyncSession, parent_id: int, new_name: str
-    ) -> bool:
+        Дерево читается целиком одним запросом и проверяется в памяти
+        (src.activity.tree), так что переносы могут зависеть друг от друга:
+        например, поменять местами родителя и ребёнка.
         """
-        Проверяет, не создаст ли добавление нового вида деятельности циклическую зависимость
+        moves = {move.id: move.parent_id for move in data.moves}
+        if len(moves) != len(data.moves):
+            raise InvalidActivityDataException(
+                "вид деятельности перемещается несколько раз"
+            )
+        await self.repository.lock_tree(session)
+        check_moves(await self.repository.find_tree(session), moves, ACTIVITY_MAX_DEPTH)
+        await self.repository.move_many(session, moves)
+        return await self.repository.find_many(session, list(moves))
+
+    async def _check_move(
+        self, session: AsyncSession, activity_id: int | None, parent_id: int | None
+    ):
         """
-        current_id = parent_id
-        visited = set()
-
-        while current_id is not None:
-            if current_id in visited:
-                return True
-            visited.add(current_id)
-
-            try:
-                activity = await self.repository.find_one(session, current_id)
-                if not activity:
-                    return False
-                current_id = activity.parent_id
-            except ItemNotExist:
-                return False
-
-        return False
+        Проверяет одним запросом, что новый родитель существует, не лежит в
+        поддереве перемещаемого вида деятельности и что поддерево после
+        переноса не глубже ACTIVITY_MAX_DEPTH. Дерево блокируется до коммита
+        """
+        await self.repository.lock_tree(session)
+        check = await self.repository.check_move(
+            session, activity_id, parent_id, ACTIVITY_MAX_DEPTH
+        )
+        if parent_id is not None and check.parent_depth == 0:
+            raise ParentActivityNotFoundException(parent_id)
+        if check.cycle:
+            raise CircularDependencyException()
+        if check.parent_depth + 1 + check.height > ACTIVITY_MAX_DEPTH:
+            raise ActivityDepthExceededException(ACTIVITY_MAX_DEPTH)
+
+    async def get_activity(self, session: AsyncSession, activity_id: int):
+        return await self._activity_flight.do(
+            activity_id, lambda: self._get_activity(session, activity_id)
+        )
+
+    async def _get_activity(self, session: AsyncSession, activity_id: int):
+        try:
+            activity = await self.repository.find_one(session, activity_id)
+        except ItemNotExist:
+            raise ActivityNotFoundException(activity_id)
+        # Результат получают и ожидающие запросы со своими сессиями, поэтому
+        # отдаётся схема ответа, а не объект сессии ведущего запроса
+        return ActivityResponseSchema.model_validate(activity)
+
+    async def get_activities(
+        self,
+        session: AsyncSession,
+        limit: int = None,
+        offset: int = None,
+        fields: str | None = None,
+    ):
+        return await self.repository.find_all(
+            session, limit, offset, self.repository.fields.parse(fields)
+        )
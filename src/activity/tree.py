@@ -0,0 +1,65 @@
+"""Дерево видов деятельности: поддеревья в SQL и проверка перестройки в памяти
+
+Для проверки перестройки дерево целиком читается одним запросом (id и
+parent_id), переносы применяются к копии, и за один проход по узлам
+считается глубина каждого узла с запоминанием: путь вверх обрывается на
+первом узле с известной глубиной, поэтому каждый узел посещается один раз.
+Узел, встреченный повторно на текущем пути, означает цикл.
+"""
+from sqlalchemy import select
+
+from src.activity.models import Activity
+from src.common.exceptions import (
+    ActivityDepthExceededException,
+    ActivityNotFoundException,
+    CircularDependencyException,
+    ParentActivityNotFoundException,
+)
+
+
+def activity_subtree(*conditions):
+    """Рекурсивный CTE с id выбранных видов деятельности и всех их потомков"""
+    cte = select(Activity.id).where(*conditions).cte(recursive=True)
+    return cte.union_all(select(Activity.id).join(cte, Activity.parent_id == cte.c.id))
+
+
+def check_moves(
+    parents: dict[int, int | None], moves: dict[int, int | None], max_depth: int
+) -> dict[int, int | None]:
+    """Дерево после переносов moves (id -> новый parent_id)
+
+    Глубина проверяется только у перенесённых поддеревьев: остальные узлы
+    переносы не затрагивают, и уже существующие более глубокие ветки не
+    мешают перестройке. Корень имеет глубину 1.
+    """
+    for id, parent_id in moves.items():
+        if id not in parents:
+            raise ActivityNotFoundException(id)
+        if parent_id is not None and parent_id not in parents:
+            raise ParentActivityNotFoundException(parent_id)
+
+    tree = {**parents, **moves}
+    depths: dict[int, int] = {}
+    # Узел лежит в перенесённом поддереве
+    moved: dict[int, bool] = {}
+    for node in tree:
+        path = []
+        on_path = set()
+        current = node
+        while current is not None and current not in depths:
+            if current in on_path:
+                raise CircularDependencyException()
+            on_path.add(current)
+            path.append(current)
+            current = tree[current]
+
+        depth = 0 if current is None else depths[current]
+        inside = current is not None and moved[current]
+        for id in reversed(path):
+            depth += 1
+            inside = inside or id in moves
+            if inside and depth > max_depth:
+                raise ActivityDepthExceededException(max_depth)
+            depths[id] = depth
+            moved[id] = inside
+    return tree
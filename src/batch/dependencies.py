@@ -0,0 +1,12 @@
+from src.activity.dependencies import activity_repository
+from src.batch.service import BatchService
+from src.building.dependencies import building_repository
+from src.organization.dependencies import organization_repository
+
+
+def batch_service() -> BatchService:
+    return BatchService(
+        organization_repository=organization_repository(),
+        building_repository=building_repository(),
+        activity_repository=activity_repository(),
+    )
@@ -0,0 +1,37 @@
+"""Загрузка записей по id с объединением запросов (DataLoader)
+
+Загрузчик живёт один запрос к API. Сначала все нужные id собираются через
+add, затем dispatch читает их одним вызовом fetch — запросом
+WHERE id = ANY($1). Прочитанные записи остаются в загрузчике, повторный
+add тех же id к запросу в БД не приводит.
+"""
+from collections.abc import Awaitable, Callable, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+Fetch = Callable[[AsyncSession, list[int]], Awaitable[dict[int, dict]]]
+
+
+class DataLoader:
+    def __init__(self, fetch: Fetch):
+        self.fetch = fetch
+        self._rows: dict[int, dict | None] = {}
+        self._pending: set[int] = set()
+        # Число запросов к БД, для проверок и метрик
+        self.batches = 0
+
+    def add(self, ids: Iterable[int]):
+        self._pending.update(id for id in ids if id not in self._rows)
+
+    async def dispatch(self, session: AsyncSession):
+        if not self._pending:
+            return
+        ids, self._pending = sorted(self._pending), set()
+        rows = await self.fetch(session, ids)
+        self.batches += 1
+        # Отсутствующие id тоже запоминаются, чтобы не читать их повторно
+        self._rows.update(dict.fromkeys(ids))
+        self._rows.update(rows)
+
+    def get(self, id: int) -> dict | None:
+        return self._rows.get(id)
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.batch.dependencies import batch_service
+from src.batch.schemas import BatchRequestSchema, BatchResponseSchema
+from src.batch.service import BatchService
+from src.common.database import get_async_session
+from src.common.exceptions import BatchTooComplexException
+from src.common.logger import logger
+from src.common.verify_key import verify_api_key
+
+batch_router = APIRouter(
+    prefix="/batch",
+    tags=["batch"],
+    dependencies=[Depends(verify_api_key)],
+)
+
+
+@batch_router.post(
+    "",
+    response_model=BatchResponseSchema,
+    description="Несколько запросов организаций, зданий и видов деятельности "
+    "одним вызовом. Каждый запрос — {entity, ids, include}: include загружает "
+    "связи (у организации building и activities, у вида деятельности parent). "
+    "Все записи одного типа читаются одним запросом к БД. Стоимость пакета — "
+    "сумма по запросам числа id × (1 + число связей) — ограничена",
+)
+async def execute_batch(
+    data: BatchRequestSchema,
+    service: BatchService = Depends(batch_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.execute(session, data)
+    except BatchTooComplexException as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении пакета запросов: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при выполнении пакета запросов",
+        )
@@ -0,0 +1,42 @@
+from typing import Literal
+
+from pydantic import Field, model_validator
+
+from src.common.config import BATCH_MAX_QUERIES
+from src.common.schema import BaseSchema
+
+# Связи, которые можно запросить в include для каждой сущности
+ENTITY_INCLUDES = {
+    "organization": ("building", "activities"),
+    "building": (),
+    "activity": ("parent",),
+}
+
+
+class BatchQuerySchema(BaseSchema):
+    entity: Literal["organization", "building", "activity"]
+    ids: list[int] = Field(min_length=1)
+    include: list[str] = []
+
+    @model_validator(mode="after")
+    def check_include(self):
+        unknown = [name for name in self.include if name not in ENTITY_INCLUDES[self.entity]]
+        if unknown:
+            raise ValueError(
+                f"Неизвестные связи {', '.join(unknown)} для {self.entity}. "
+                f"Доступные связи: {', '.join(ENTITY_INCLUDES[self.entity]) or 'нет'}"
+            )
+        return self
+
+    @property
+    def cost(self) -> int:
+        return len(self.ids) * (1 + len(set(self.include)))
+
+
+class BatchRequestSchema(BaseSchema):
+    queries: list[BatchQuerySchema] = Field(min_length=1, max_length=BATCH_MAX_QUERIES)
+
+
+class BatchResponseSchema(BaseSchema):
+    # По списку на запрос, в порядке id запроса; null — записи нет
+    results: list[list[dict | None]]
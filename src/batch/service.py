@@ -0,0 +1,137 @@
+"""Пакетные запросы справочника поверх репозиториев
+
+Пакет — список запросов {"entity", "ids", "include"}. Записи читаются в
+два прохода: сначала все запрошенные id всех запросов, затем связи из
+include. В каждом проходе на тип сущности приходится не больше одного
+запроса WHERE id = ANY($1) (на шард — для шардированных организаций и
+зданий), сколько бы запросов в пакете ни было. Стоимость пакета
+ограничена BATCH_MAX_COST.
+"""
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.activity.repository import ActivityRepository
+from src.batch.loader import DataLoader, Fetch
+from src.batch.schemas import BatchQuerySchema, BatchRequestSchema
+from src.building.repository import BuildingRepository
+from src.common.config import BATCH_MAX_COST
+from src.common.database import shard_router
+from src.common.exceptions import BatchTooComplexException
+from src.common.metrics import metrics
+from src.organization.repository import OrganizationRepository
+
+
+@dataclass(frozen=True)
+class Relation:
+    entity: str
+    # id связанных записей по строке
+    ids: Callable[[dict], list[int]]
+    many: bool = False
+
+
+RELATIONS = {
+    "building": Relation("building", lambda row: [row["building_id"]]),
+    "activities": Relation("activity", lambda row: row["activity_ids"], many=True),
+    "parent": Relation(
+        "activity",
+        lambda row: [] if row["parent_id"] is None else [row["parent_id"]],
+    ),
+}
+# Таблицы, строки которых распределены по шардам диапазонами id
+SHARDED = {"organization", "building"}
+
+
+def _sharded(fetch: Fetch) -> Fetch:
+    """fetch с разбиением id по шардам: запрос на каждый затронутый шард"""
+
+    async def fetch_sharded(session: AsyncSession, ids: list[int]) -> dict[int, dict]:
+        if not shard_router.sharded:
+            return await fetch(session, ids)
+        by_shard: defaultdict[int, list[int]] = defaultdict(list)
+        for id in ids:
+            by_shard[shard_router.for_id(id).index].append(id)
+        rows = {}
+        for index, shard_ids in by_shard.items():
+            if index == 0:
+                rows.update(await fetch(session, shard_ids))
+                continue
+            async with shard_router.shards[index].session() as shard_session:
+                rows.update(await fetch(shard_session, shard_ids))
+        return rows
+
+    return fetch_sharded
+
+
+class BatchService:
+    def __init__(
+        self,
+        organization_repository: OrganizationRepository,
+        building_repository: BuildingRepository,
+        activity_repository: ActivityRepository,
+    ):
+        self.fetchers: dict[str, Fetch] = {
+            "organization": organization_repository.find_rows,
+            "building": building_repository.find_rows,
+            "activity": activity_repository.find_rows,
+        }
+
+    def create_loaders(self) -> dict[str, DataLoader]:
+        """Загрузчики одного пакета, по одному на тип сущности"""
+        return {
+            entity: DataLoader(_sharded(fetch) if entity in SHARDED else fetch)
+            for entity, fetch in self.fetchers.items()
+        }
+
+    async def execute(self, session: AsyncSession, request: BatchRequestSchema):
+        cost = sum(query.cost for query in request.queries)
+        if cost > BATCH_MAX_COST:
+            raise BatchTooComplexException(cost, BATCH_MAX_COST)
+        metrics.inc("batch.cost", cost)
+
+        loaders = self.create_loaders()
+        for query in request.queries:
+            loaders[query.entity].add(query.ids)
+        await self._dispatch(session, loaders)
+
+        for query in request.queries:
+            for name in set(query.include):
+                relation = RELATIONS[name]
+                for id in query.ids:
+                    row = loaders[query.entity].get(id)
+                    if row is not None:
+                        loaders[relation.entity].add(relation.ids(row))
+        await self._dispatch(session, loaders)
+
+        return {
+            "results": [
+                [self._render(loaders, query, id) for id in query.ids]
+                for query in request.queries
+            ]
+        }
+
+    @staticmethod
+    async def _dispatch(session: AsyncSession, loaders: dict[str, DataLoader]):
+        # Сессия не выполняет запросы параллельно, поэтому загрузчики по очереди
+        for loader in loaders.values():
+            await loader.dispatch(session)
+
+    @staticmethod
+    def _render(loaders: dict[str, DataLoader], query: BatchQuerySchema, id: int):
+        row = loaders[query.entity].get(id)
+        if row is None:
+            return None
+        item = dict(row)
+        if query.entity == "organization":
+            # Телефоны в том же виде, что и в OrganizationResponseSchema
+            item["phones"] = [{"phone": phone} for phone in row["phones"]]
+        for name in query.include:
+            relation = RELATIONS[name]
+            related = [loaders[relation.entity].get(i) for i in relation.ids(row)]
+            if relation.many:
+                item[name] = [r for r in related if r is not None]
+            else:
+                item[name] = related[0] if related else None
+        return item
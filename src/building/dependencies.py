@@ -1,6 +1,15 @@
 from src.building.repository import BuildingRepository
 from src.building.service import BuildingService
+from src.common.config import DIRECTORY_BACKEND
+
+
+def building_repository() -> BuildingRepository:
+    if DIRECTORY_BACKEND == "replica":
+        from src.replica.repository import ReplicaBuildingRepository
+
+        return ReplicaBuildingRepository()
+    return BuildingRepository()
 
 
 def building_service() -> BuildingService:
-    return BuildingService(repository=BuildingRepository())
+    return BuildingService(repository=building_repository())
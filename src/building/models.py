@@ -1,4 +1,6 @@
-from sqlalchemy import String, Integer, Float
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, FetchedValue, Float, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.common.database import Base
 
@@ -10,6 +12,22 @@ class Building(Base):
     address: Mapped[str] = mapped_column(String(255), nullable=False)
     latitude: Mapped[float] = mapped_column(Float, nullable=False)
     longitude: Mapped[float] = mapped_column(Float, nullable=False)
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1"
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
+    )
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        index=True,
+        server_default="1",
+        server_onupdate=FetchedValue(),
+    )
 
     organizations: Mapped[list["Organization"]] = relationship(
         back_populates="building"
@@ -1,42 +1,83 @@
-from sqlalchemy import select, insert, and_
+from sqlalchemy import Float, Integer, String, any_, bindparam, select, insert, and_
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.common.repository import SQLAlchemyRepository
 from src.building.models import Building
+from src.common.fields import FieldSet, ResponseField
+
+# Горячие запросы строятся один раз, значения передаются параметрами.
+# LIMIT NULL и OFFSET NULL в Postgres означают отсутствие ограничения
+FIND_ONE = select(Building).where(Building.id == bindparam("id", type_=Integer))
+FIND_ALL = (
+    select(Building)
+    .limit(bindparam("limit", type_=Integer))
+    .offset(bindparam("offset", type_=Integer))
+)
+BUILDING_FIELDS = FieldSet(
+    {
+        name: ResponseField(columns=(getattr(Building, name),))
+        for name in ("id", "address", "latitude", "longitude", "version")
+    },
+    default_options=(),
+)
+# Строки для пакетного эндпоинта (src.batch)
+FIND_ROWS = select(
+    Building.id,
+    Building.address,
+    Building.latitude,
+    Building.longitude,
+    Building.version,
+).where(Building.id == any_(bindparam("ids", type_=ARRAY(Integer))))
+FIND_BY_ADDRESS = select(Building).where(
+    Building.address == bindparam("address", type_=String)
+)
+FIND_IN_BOX = select(Building).where(
+    and_(
+        Building.latitude >= bindparam("lat_min", type_=Float),
+        Building.latitude <= bindparam("lat_max", type_=Float),
+        Building.longitude >= bindparam("lon_min", type_=Float),
+        Building.longitude <= bindparam("lon_max", type_=Float),
+    )
+)
 
 
 class BuildingRepository(SQLAlchemyRepository[Building]):
     model = Building
+    fields = BUILDING_FIELDS
 
     async def find_one(self, session: AsyncSession, id: int):
-        stmt = select(self.model).where(self.model.id == id)
-        res = await session.execute(stmt)
-        return res.scalar_one()
+        return await self._find_existing(session, FIND_ONE, {"id": id})
 
-    async def find_all(self, session: AsyncSession, limit: int = None, offset: int = None):
-        stmt = select(self.model)
-        if limit is not None:
-            stmt = stmt.limit(limit)
-        if offset is not None:
-            stmt = stmt.offset(offset)
-        res = await session.execute(stmt)
-        return res.scalars().all()
+    async def find_all(
+        self,
+        session: AsyncSession,
+        limit: int = None,
+        offset: int = None,
+        fields: tuple | None = None,
+    ):
+        stmt = BUILDING_FIELDS.statement(FIND_ALL, fields)
+        res = await session.execute(stmt, {"limit": limit, "offset": offset})
+        return BUILDING_FIELDS.rows(res, fields)
+
+    async def warm_up(self, session: AsyncSession):
+        await session.execute(FIND_ONE, {"id": 0})
+        await self.find_all(session, limit=1, offset=0)
+
+    async def find_rows(self, session: AsyncSession, ids: list[int]) -> dict[int, dict]:
+        """Здания ids словарями: id -> строка"""
+        res = await session.execute(FIND_ROWS, {"ids": ids})
+        return {row.id: dict(row._mapping) for row in res}
 
     async def find_by_address(self, session: AsyncSession, address: str):
-        stmt = select(self.model).where(self.model.address == address)
-        res = await session.execute(stmt)
+        res = await session.execute(FIND_BY_ADDRESS, {"address": address})
         return res.scalar_one_or_none()
 
-    async def find_in_radius(self, session: AsyncSession, lat: float, lon: float, radius: float):
-        stmt = select(self.model).where(
-            and_(
-                self.model.latitude >= lat - radius,
-                self.model.latitude <= lat + radius,
-                self.model.longitude >= lon - radius,
-                self.model.longitude <= lon + radius,
-            )
+    async def find_in_radius(
+        self, session: AsyncSession, lat: float, lon: float, radius: float
+    ):
+        return await self.find_in_bbox(
+            session, lat - radius, lat + radius, lon - radius, lon + radius
         )
-        res = await session.execute(stmt)
-        return res.scalars().all()
 
     async def find_in_bbox(
         self,
@@ -46,15 +87,13 @@ class BuildingRepository(SQLAlchemyRepository[Building]):
         lon_min: float,
         lon_max: float,
     ):
-        stmt = select(self.model).where(
-            and_(
-                self.model.latitude >= lat_min,
-                self.model.latitude <= lat_max,
-                self.model.longitude >= lon_min,
-                self.model.longitude <= lon_max,
-            )
-        )
-        res = await session.execute(stmt)
+        params = {
+            "lat_min": lat_min,
+            "lat_max": lat_max,
+            "lon_min": lon_min,
+            "lon_max": lon_max,
+        }
+        res = await session.execute(FIND_IN_BOX, params)
         return res.scalars().all()
 
     async def create_one(self, session: AsyncSession, data: dict) -> Building:
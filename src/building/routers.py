@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.building.schemas import BuildingResponseSchema, BuildingCreateSchema
+from src.building.schemas import (
+    BuildingResponseSchema,
+    BuildingCreateSchema,
+    BuildingUpdateSchema,
+)
 from src.building.service import BuildingService
 from src.building.dependencies import building_service
 from src.common.database import get_async_session
+from src.common.conditional import BUILDING_VERSIONS, conditional_get
 from src.common.verify_key import verify_api_key
 from src.common.logger import logger
 from src.common.exceptions import (
@@ -12,6 +18,9 @@ from src.common.exceptions import (
     DuplicateBuildingAddressException,
     InvalidCoordinatesException,
     InvalidAddressException,
+    BuildingInUseException,
+    VersionConflictException,
+    InvalidFieldsException,
 )
 
 building_router = APIRouter(
@@ -24,16 +33,28 @@ building_router = APIRouter(
 @building_router.get(
     "",
     response_model=list[BuildingResponseSchema],
-    description="Получить список всех зданий с пагинацией",
+    description="Получить список всех зданий с пагинацией. "
+    "С параметром fields возвращаются только перечисленные поля",
+    dependencies=[conditional_get(BUILDING_VERSIONS)],
 )
 async def get_buildings(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    fields: str | None = Query(
+        None,
+        description="Поля ответа через запятую, например id,name. "
+        "Загружаются только нужные колонки и связи",
+    ),
     service: BuildingService = Depends(building_service),
     session: AsyncSession = Depends(get_async_session),
 ):
     try:
-        return await service.get_buildings(session, limit, offset)
+        buildings = await service.get_buildings(session, limit, offset, fields)
+        if fields is not None:
+            return JSONResponse(content=buildings)
+        return buildings
+    except InvalidFieldsException as e:
+        raise
     except Exception as e:
         logger.error(f"Ошибка при получении списка зданий: {str(e)}")
         raise HTTPException(
@@ -46,12 +67,12 @@ async def get_buildings(
     "/{building_id}",
     response_model=BuildingResponseSchema,
     description="Получить подробную информацию о здании по его идентификатору",
+    dependencies=[conditional_get(BUILDING_VERSIONS)],
 )
 async def get_building(
     building_id: int,
     service: BuildingService = Depends(building_service),
     session: AsyncSession = Depends(get_async_session),
-    api_key: str = Depends(verify_api_key),
 ):
     try:
         return await service.get_building(session, building_id)
@@ -91,3 +112,59 @@ async def create_building(
         raise HTTPException(
             status_code=500, detail="Внутренняя ошибка сервера при создании здания"
         )
+
+
+@building_router.patch(
+    "/{building_id}",
+    response_model=BuildingResponseSchema,
+    description="Частично обновить здание. Если передана версия, обновление "
+    "выполняется только при её совпадении",
+)
+async def update_building(
+    building_id: int,
+    data: BuildingUpdateSchema,
+    service: BuildingService = Depends(building_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.update_building(session, building_id, data)
+    except (
+        BuildingNotFoundException,
+        DuplicateBuildingAddressException,
+        InvalidCoordinatesException,
+        InvalidAddressException,
+        VersionConflictException,
+    ) as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при обновлении здания {building_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail="Внутренняя ошибка сервера при обновлении здания"
+        )
+
+
+@building_router.delete(
+    "/{building_id}",
+    status_code=204,
+    description="Удалить здание, в котором нет организаций",
+)
+async def delete_building(
+    building_id: int,
+    version: int | None = Query(None, description="Ожидаемая версия записи"),
+    service: BuildingService = Depends(building_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        await service.delete_building(session, building_id, version)
+        return Response(status_code=204)
+    except (
+        BuildingNotFoundException,
+        BuildingInUseException,
+        VersionConflictException,
+    ) as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при удалении здания {building_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail="Внутренняя ошибка сервера при удалении здания"
+        )
@@ -8,8 +8,16 @@ class BuildingCreateSchema(BaseSchema):
     longitude: float = Field(ge=-180, le=180)
 
 
+class BuildingUpdateSchema(BaseSchema):
+    address: str | None = None
+    latitude: float | None = Field(default=None, ge=-90, le=90)
+    longitude: float | None = Field(default=None, ge=-180, le=180)
+    version: int | None = None
+
+
 class BuildingResponseSchema(BaseSchema):
     id: int
     address: str
     latitude: float
     longitude: float
+    version: int
@@ -1,17 +1,26 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.building.repository import BuildingRepository
-from src.building.schemas import BuildingCreateSchema
+from src.building.schemas import (
+    BuildingCreateSchema,
+    BuildingResponseSchema,
+    BuildingUpdateSchema,
+)
 from src.common.exceptions import (
     BuildingNotFoundException,
     InvalidBuildingDataException,
     DuplicateBuildingAddressException,
     InvalidCoordinatesException,
     InvalidAddressException,
+    BuildingInUseException,
 )
 from src.common.exceptions import ItemNotExist
+from src.common.singleflight import SingleFlight
 
 
 class BuildingService:
+    _building_flight = SingleFlight("building")
+
     def __init__(self, repository: BuildingRepository):
         self.repository: BuildingRepository = repository
 
@@ -32,16 +41,71 @@ class BuildingService:
         data_dict = data.model_dump()
         return await self.repository.create_one(session, data_dict)
 
+    async def update_building(
+        self, session: AsyncSession, building_id: int, data: BuildingUpdateSchema
+    ):
+        changes = data.model_dump(exclude_unset=True, exclude={"version"})
+
+        if "address" in changes:
+            if not changes["address"] or len(changes["address"].strip()) == 0:
+                raise InvalidAddressException("Адрес не может быть пустым")
+            existing_building = await self.repository.find_by_address(
+                session, changes["address"]
+            )
+            if existing_building and existing_building.id != building_id:
+                raise DuplicateBuildingAddressException(changes["address"])
+
+        if any(
+            changes.get(field, 0) is None for field in ("latitude", "longitude")
+        ):
+            raise InvalidCoordinatesException()
+
+        building = await self.repository.update_one(
+            session, building_id, changes, data.version
+        )
+        if building is None:
+            await self.repository.raise_missing_or_conflict(
+                session, building_id, data.version, BuildingNotFoundException
+            )
+        return building
+
+    async def delete_building(
+        self, session: AsyncSession, building_id: int, version: int | None = None
+    ):
+        try:
+            await self.repository.delete_one(session, building_id, version)
+        except ItemNotExist:
+            await self.repository.raise_missing_or_conflict(
+                session, building_id, version, BuildingNotFoundException
+            )
+        except IntegrityError:
+            await session.rollback()
+            raise BuildingInUseException(building_id)
+
     async def get_building(self, session: AsyncSession, building_id: int):
+        return await self._building_flight.do(
+            building_id, lambda: self._get_building(session, building_id)
+        )
+
+    async def _get_building(self, session: AsyncSession, building_id: int):
         try:
-            return await self.repository.find_one(session, building_id)
+            building = await self.repository.find_one(session, building_id)
         except ItemNotExist:
             raise BuildingNotFoundException(building_id)
+        # Результат получают и ожидающие запросы со своими сессиями, поэтому
+        # отдаётся схема ответа, а не объект сессии ведущего запроса
+        return BuildingResponseSchema.model_validate(building)
 
     async def get_buildings(
-        self, session: AsyncSession, limit: int = None, offset: int = None
+        self,
+        session: AsyncSession,
+        limit: int = None,
+        offset: int = None,
+        fields: str | None = None,
     ):
-        return await self.repository.find_all(session, limit, offset)
+        return await self.repository.find_all(
+            session, limit, offset, self.repository.fields.parse(fields)
+        )
 
     async def get_buildings_in_radius(
         self, session: AsyncSession, lat: float, lon: float, radius: float
@@ -0,0 +1,7 @@
+from src.changes.notifier import change_notifier
+from src.changes.repository import ChangeRepository
+from src.changes.service import ChangeService
+
+
+def change_service() -> ChangeService:
+    return ChangeService(repository=ChangeRepository(), notifier=change_notifier)
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from src.common.database import Base
+
+
+class ChangeTombstone(Base):
+    """Запись об удалении строки для ленты изменений
+
+    Заполняется триггерами при удалении организаций, зданий, видов
+    деятельности и телефонов; у телефона запоминается его организация,
+    документ которой надо пересобрать.
+    """
+
+    __tablename__ = "change_tombstones"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    entity: Mapped[str] = mapped_column(String(32), nullable=False)
+    record_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    organization_id: Mapped[int | None] = mapped_column(Integer)
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from contextlib import suppress
+
+import asyncpg
+
+from src.common.config import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER
+from src.common.logger import logger
+
+CHANGES_CHANNEL = "directory_changes"
+
+
+class ChangeNotifier:
+    """Ожидание новых изменений через Postgres LISTEN/NOTIFY
+
+    На процесс открывается одно отдельное соединение вне пула, которое
+    слушает канал и будит всех клиентов, ждущих ленту в режиме long-poll.
+    Соединение открывается при первом ожидании и переоткрывается после обрыва.
+
+    Уведомление несёт новую версию группы таблиц ("organizations:42", см.
+    data_versions), по ним процесс знает текущие версии данных без запросов
+    к БД. Пока подписки нет, версии неизвестны (None).
+
+    Версии выдаёт последовательность, и номера идут не в порядке коммитов,
+    а уведомления приходят именно в нём. Поэтому версия группы — номер из
+    последнего уведомления, а не наибольший: каждый номер приходит один
+    раз, и версия меняется с каждым коммитом. При подписке последний
+    выданный номер мог достаться незакоммиченной транзакции, поэтому
+    начальная версия берётся со знаком минус и не совпадёт с номером
+    будущего уведомления.
+    """
+
+    def __init__(self, channel: str = CHANGES_CHANNEL):
+        self.channel = channel
+        self._conn: asyncpg.Connection | None = None
+        self._lock = asyncio.Lock()
+        self._waiter: asyncio.Future | None = None
+        # Номер последнего уведомления: позволяет не пропустить уведомление,
+        # пришедшее между чтением ленты и началом ожидания
+        self.generation = 0
+        self.versions: dict[str, int] | None = None
+        self._pending: dict[str, int] = {}
+        self._retry_at = 0.0
+
+    async def subscribe(self) -> int:
+        """Подписывается на канал и возвращает текущий номер уведомления"""
+        await self._ensure_listening()
+        return self.generation
+
+    async def wait(self, timeout: float, generation: int) -> bool:
+        """Ждёт уведомления новее generation не дольше timeout секунд"""
+        await self._ensure_listening()
+        if self.generation != generation:
+            return True
+        if self._waiter is None or self._waiter.done():
+            self._waiter = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._waiter), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def data_version(self, names: tuple[str, ...]) -> tuple[int, ...] | None:
+        """Текущие версии данных; без подписки запускает её в фоне и возвращает None"""
+        if self.versions is None:
+            self._listen_in_background()
+            return None
+        return tuple(self.versions.get(name, 0) for name in names)
+
+    def _listen_in_background(self):
+        now = time.monotonic()
+        if now < self._retry_at or self._lock.locked():
+            return
+        # Не чаще раза в секунду, чтобы недоступная БД не получала
+        # попытку подключения на каждый запрос
+        self._retry_at = now + 1
+        asyncio.create_task(self._listen_quietly())
+
+    async def _listen_quietly(self):
+        try:
+            await self._ensure_listening()
+        except Exception as e:
+            logger.warning(f"Не удалось подписаться на канал {self.channel}: {e}")
+
+    async def stop(self):
+        if self._conn is not None:
+            with suppress(Exception):
+                await self._conn.close()
+            self._conn = None
+            self.versions = None
+
+    async def _ensure_listening(self):
+        async with self._lock:
+            if self._conn is not None and not self._conn.is_closed():
+                return
+            self._conn = await asyncpg.connect(
+                user=DB_USER,
+                password=DB_PASS,
+                database=DB_NAME,
+                host=DB_HOST,
+                port=DB_PORT,
+            )
+            self._conn.add_termination_listener(self._on_terminate)
+            self._pending = {}
+            try:
+                await self._conn.add_listener(self.channel, self._on_notify)
+                # Уведомления, пришедшие во время чтения, копятся в _pending
+                versions = {
+                    name: -version
+                    for name, version in await self._conn.fetch(
+                        "SELECT name, version FROM data_versions"
+                    )
+                }
+            except Exception:
+                await self._conn.close()
+                self._conn = None
+                raise
+            versions.update(self._pending)
+            self.versions = versions
+            logger.info(f"Подписка на канал {self.channel} установлена")
+
+    def _on_notify(self, connection, pid, channel, payload):
+        if payload:
+            name, _, version = payload.partition(":")
+            versions = self.versions if self.versions is not None else self._pending
+            versions[name] = int(version)
+        self.generation += 1
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _on_terminate(self, connection):
+        logger.warning(f"Соединение подписки на канал {self.channel} закрыто")
+        self._conn = None
+        # Пока подписки нет, уведомления теряются и версиям верить нельзя
+        self.versions = None
+        # Будим ожидающих, чтобы они перечитали ленту и переподписались
+        self._on_notify(connection, None, self.channel, None)
+
+
+change_notifier = ChangeNotifier()
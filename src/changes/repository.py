@@ -0,0 +1,170 @@
+from typing import AsyncIterator
+
+from sqlalchemy import (
+    BigInteger,
+    Row,
+    Text,
+    cast,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.activity.models import Activity, OrganizationActivity
+from src.building.models import Building
+from src.changes.models import ChangeTombstone
+from src.changes.schemas import ChangeCursor
+from src.common.repository import SQLAlchemyRepository
+from src.organization.models import Organization, OrganizationPhone
+
+
+def _json_object(**fields):
+    args = []
+    for key, value in fields.items():
+        args += [literal_column(f"'{key}'"), value]
+    return func.json_build_object(*args)
+
+
+def _organization_activity_ids():
+    return func.coalesce(
+        select(func.array_agg(OrganizationActivity.activity_id))
+        .where(OrganizationActivity.organization_id == Organization.id)
+        .scalar_subquery(),
+        literal_column("'{}'::integer[]"),
+    )
+
+
+# Сущность ленты -> (модель, поля события)
+UPSERT_SOURCES = {
+    "organization": (
+        Organization,
+        lambda: dict(
+            name=Organization.name,
+            building_id=Organization.building_id,
+            activity_ids=_organization_activity_ids(),
+            version=Organization.version,
+        ),
+    ),
+    "building": (
+        Building,
+        lambda: dict(
+            address=Building.address,
+            latitude=Building.latitude,
+            longitude=Building.longitude,
+            version=Building.version,
+        ),
+    ),
+    "activity": (
+        Activity,
+        lambda: dict(
+            name=Activity.name,
+            parent_id=Activity.parent_id,
+            version=Activity.version,
+        ),
+    ),
+    "phone": (
+        OrganizationPhone,
+        lambda: dict(
+            organization_id=OrganizationPhone.organization_id,
+            phone=OrganizationPhone.phone,
+        ),
+    ),
+}
+
+
+def _after_cursor(seq_col, entity_col, id_col, cursor: ChangeCursor, horizon: int):
+    conditions = [seq_col < horizon]
+    if cursor.entity is None:
+        conditions.append(seq_col > cursor.seq)
+    else:
+        # Первое условие даёт планировщику диапазон по индексу change_seq
+        conditions += [
+            seq_col >= cursor.seq,
+            or_(
+                seq_col > cursor.seq,
+                tuple_(entity_col, id_col) > tuple_(cursor.entity, cursor.id),
+            ),
+        ]
+    return conditions
+
+
+class ChangeRepository(SQLAlchemyRepository[ChangeTombstone]):
+    model = ChangeTombstone
+
+    async def bump_version(self, session: AsyncSession, name: str) -> int:
+        """Увеличивает версию данных name в транзакции сессии"""
+        return (await session.execute(select(func.bump_data_version(name)))).scalar_one()
+
+    async def get_horizon(self, session: AsyncSession) -> int:
+        """Граница ленты: все транзакции с меньшим номером уже завершены"""
+        stmt = select(
+            cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+        )
+        return (await session.execute(stmt)).scalar_one()
+
+    async def stream_changes(
+        self, session: AsyncSession, cursor: ChangeCursor, horizon: int, limit: int
+    ) -> AsyncIterator[Row]:
+        """События после позиции cursor в порядке (change_seq, entity, id)
+
+        Каждое событие собирается в JSON на стороне БД и читается через
+        серверный курсор, без материализации страницы в памяти.
+        """
+        parts = []
+        for entity, (model, fields) in UPSERT_SOURCES.items():
+            entity_col = literal(entity)
+            parts.append(
+                select(
+                    model.change_seq.label("change_seq"),
+                    entity_col.label("entity"),
+                    model.id.label("id"),
+                    _json_object(
+                        seq=model.change_seq,
+                        op=literal_column("'upsert'"),
+                        entity=entity_col,
+                        id=model.id,
+                        data=_json_object(**fields()),
+                    ).label("event"),
+                ).where(
+                    *_after_cursor(model.change_seq, entity_col, model.id, cursor, horizon)
+                )
+            )
+        parts.append(
+            select(
+                self.model.change_seq.label("change_seq"),
+                self.model.entity.label("entity"),
+                self.model.record_id.label("id"),
+                _json_object(
+                    seq=self.model.change_seq,
+                    op=literal_column("'delete'"),
+                    entity=self.model.entity,
+                    id=self.model.record_id,
+                ).label("event"),
+            ).where(
+                *_after_cursor(
+                    self.model.change_seq,
+                    self.model.entity,
+                    self.model.record_id,
+                    cursor,
+                    horizon,
+                )
+            )
+        )
+        events = union_all(*parts).subquery("events")
+        stmt = (
+            select(
+                events.c.change_seq,
+                events.c.entity,
+                events.c.id,
+                cast(events.c.event, Text).label("event"),
+            )
+            .order_by(events.c.change_seq, events.c.entity, events.c.id)
+            .limit(limit)
+        )
+        result = await session.stream(stmt)
+        async for row in result:
+            yield row
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from src.changes.dependencies import change_service
+from src.changes.service import ChangeService
+from src.common.verify_key import verify_api_key
+
+changes_router = APIRouter(
+    prefix="/changes",
+    tags=["changes"],
+    dependencies=[Depends(verify_api_key)],
+)
+
+
+@changes_router.get(
+    "",
+    response_class=StreamingResponse,
+    description="Лента изменений справочника в формате NDJSON. Каждая строка — "
+    'событие {"seq", "op": "upsert"|"delete", "entity", "id", "data"}, последняя '
+    'строка — {"op": "checkpoint", "since"} с позицией для следующего запроса. '
+    "Параметр wait включает long-poll: при отсутствии изменений запрос ждёт их "
+    "указанное число секунд",
+)
+async def get_changes(
+    since: str = Query("0", description="Позиция из предыдущего checkpoint"),
+    limit: int = Query(1000, ge=1, le=10000, description="Максимум событий"),
+    wait: float = Query(0, ge=0, le=60, description="Время ожидания, секунды"),
+    service: ChangeService = Depends(change_service),
+):
+    cursor = service.parse_cursor(since)
+    return StreamingResponse(
+        service.stream_changes(cursor, limit, wait),
+        media_type="application/x-ndjson",
+    )
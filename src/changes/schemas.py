@@ -0,0 +1,29 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ChangeCursor:
+    """Позиция в ленте изменений
+
+    Обычно это номер транзакции: клиент получит все изменения с большим
+    номером. Если страница оборвалась на лимите посреди одной транзакции,
+    позиция дополняется сущностью и id последнего отданного события.
+    """
+
+    seq: int
+    entity: str | None = None
+    id: int | None = None
+
+    @classmethod
+    def parse(cls, value: str) -> "ChangeCursor":
+        parts = value.split(":")
+        if len(parts) == 1:
+            return cls(seq=int(parts[0]))
+        if len(parts) == 3:
+            return cls(seq=int(parts[0]), entity=parts[1], id=int(parts[2]))
+        raise ValueError(value)
+
+    def __str__(self) -> str:
+        if self.entity is None:
+            return str(self.seq)
+        return f"{self.seq}:{self.entity}:{self.id}"
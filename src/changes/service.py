@@ -0,0 +1,63 @@
+import json
+import time
+from typing import AsyncIterator
+
+from src.changes.notifier import ChangeNotifier
+from src.changes.repository import ChangeRepository
+from src.changes.schemas import ChangeCursor
+from src.common.database import async_session_maker
+from src.common.exceptions import InvalidChangeCursorException
+
+
+class ChangeService:
+    def __init__(self, repository: ChangeRepository, notifier: ChangeNotifier):
+        self.repository: ChangeRepository = repository
+        self.notifier: ChangeNotifier = notifier
+
+    def parse_cursor(self, since: str) -> ChangeCursor:
+        try:
+            return ChangeCursor.parse(since)
+        except ValueError:
+            raise InvalidChangeCursorException(since)
+
+    async def stream_changes(
+        self, cursor: ChangeCursor, limit: int, wait: float
+    ) -> AsyncIterator[str]:
+        """Лента изменений в формате NDJSON
+
+        Отдаёт события после позиции cursor и завершается строкой
+        {"op": "checkpoint", "since": ...} с позицией для следующего запроса.
+        Если событий нет и wait > 0, ждёт уведомления о новых изменениях,
+        не удерживая соединение из пула.
+
+        Сессия открывается здесь, а не через зависимость роутера, потому
+        что тело ответа отдаётся уже после выхода из обработчика.
+        """
+        deadline = time.monotonic() + wait
+        count = 0
+        last = None
+        async with async_session_maker() as session:
+            while True:
+                generation = await self.notifier.subscribe() if wait > 0 else 0
+                horizon = await self.repository.get_horizon(session)
+                async for row in self.repository.stream_changes(
+                    session, cursor, horizon, limit
+                ):
+                    count += 1
+                    last = row
+                    yield row.event + "\n"
+                # Завершаем транзакцию и возвращаем соединение в пул
+                await session.rollback()
+
+                remaining = deadline - time.monotonic()
+                if count or remaining <= 0:
+                    break
+                await self.notifier.wait(remaining, generation)
+
+        if count == limit:
+            next_cursor = ChangeCursor(last.change_seq, last.entity, last.id)
+        elif horizon - 1 > cursor.seq:
+            next_cursor = ChangeCursor(horizon - 1)
+        else:
+            next_cursor = cursor
+        yield json.dumps({"op": "checkpoint", "since": str(next_cursor)}) + "\n"
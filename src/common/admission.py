@@ -0,0 +1,60 @@
+"""Отказ в обслуживании при перегрузке пула соединений (load shedding)
+
+Когда все соединения пула заняты медленными запросами, новые запросы ждут
+соединение до pool_timeout и копят задержку. Пул измеряет время ожидания
+соединения (сглаженное экспоненциально), и если пул занят целиком, а
+ожидание выше DB_ADMISSION_MAX_WAIT_MS, запрос API сразу получает 503 с
+Retry-After вместо места в очереди. Как только в пуле освобождается
+соединение, запросы снова принимаются. Проверяется пул той БД, в которую
+идёт запрос: основной — в get_async_session, шарда — в Shard.session.
+"""
+import math
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.common.config import DB_ADMISSION_MAX_WAIT_MS
+from src.common.exceptions import DatabaseOverloadedException
+from src.common.metrics import metrics
+
+# Вес последнего ожидания в сглаженном значении
+WAIT_SMOOTHING = 0.2
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, измеряющий время ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_ms = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = (time.perf_counter() - started) * 1000
+            self.wait_ms += WAIT_SMOOTHING * (waited - self.wait_ms)
+
+    @property
+    def saturated(self) -> bool:
+        """Свободных соединений нет и новое открыть нельзя"""
+        return self.checkedin() == 0 and self.overflow() >= self._max_overflow
+
+
+class AdmissionController:
+    def __init__(self, max_wait_ms: float = DB_ADMISSION_MAX_WAIT_MS):
+        self.max_wait_ms = max_wait_ms
+
+    def admit(self, pool):
+        """Пропускает запрос или отклоняет его с DatabaseOverloadedException"""
+        if self.max_wait_ms <= 0 or not isinstance(pool, TimedQueuePool):
+            return
+        metrics.set("db.pool.wait_ms", pool.wait_ms)
+        if pool.wait_ms < self.max_wait_ms or not pool.saturated:
+            return
+        metrics.inc("db.admission.rejected")
+        raise DatabaseOverloadedException(max(math.ceil(pool.wait_ms / 1000), 1))
+
+
+admission = AdmissionController()
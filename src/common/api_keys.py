@@ -0,0 +1,236 @@
+"""Хранилище ключей API и лимиты запросов по ключам
+
+Файл ключей (API_KEYS_FILE) — JSON-список записей вида
+
+    {"name": "partner-a", "key_hash": "<sha256>", "rate": 20, "burst": 40, "quota": 100000}
+
+rate — запросов в секунду (token bucket), burst — ёмкость корзины, quota —
+запросов за период API_QUOTA_PERIOD. Нулевое или отсутствующее значение
+снимает ограничение. Хеш ключа печатает `python -m src.common.api_keys <ключ>`.
+"""
+import hashlib
+import hmac
+import json
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+from src.common.config import (
+    API_KEY,
+    API_KEY_BURST,
+    API_KEY_QUOTA,
+    API_KEY_RATE,
+    API_KEYS_FILE,
+    API_KEYS_RELOAD_INTERVAL,
+    API_QUOTA_PERIOD,
+    API_RATE_LIMIT_BACKEND,
+    API_RATE_LIMIT_REDIS_URL,
+)
+from src.common.exceptions import QuotaExceededException, RateLimitExceededException
+from src.common.logger import logger
+
+
+def hash_api_key(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class ApiKey:
+    name: str
+    key_hash: str
+    rate: float = 0
+    burst: int = 0
+    quota: int = 0
+
+
+class ApiKeyStore:
+    """Ключи API в памяти процесса с перечитыванием файла при изменении
+
+    В памяти хранятся только хеши. Изменение файла проверяется по mtime не
+    чаще раза в reload_interval секунд прямо в запросе, отдельная фоновая
+    задача не нужна.
+    """
+
+    def __init__(
+        self,
+        path: str | None = API_KEYS_FILE,
+        fallback_key: str = API_KEY,
+        reload_interval: float = API_KEYS_RELOAD_INTERVAL,
+    ):
+        self.path = path
+        self.fallback_key = fallback_key
+        self.reload_interval = reload_interval
+        self._keys: dict[str, ApiKey] | None = None
+        self._mtime: float | None = None
+        self._next_check = 0.0
+
+    def load(self):
+        if not self.path:
+            key = ApiKey(
+                name="default",
+                key_hash=hash_api_key(self.fallback_key),
+                rate=API_KEY_RATE,
+                burst=API_KEY_BURST,
+                quota=API_KEY_QUOTA,
+            )
+            self._keys = {key.key_hash: key}
+            self._next_check = math.inf
+            return
+
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, encoding="utf-8") as keys_file:
+            records = json.load(keys_file)
+        self._keys = {
+            record["key_hash"]: ApiKey(**record) for record in records
+        }
+        self._mtime = mtime
+        self._next_check = time.monotonic() + self.reload_interval
+        logger.info(f"Загружено ключей API: {len(self._keys)}")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            if os.stat(self.path).st_mtime != self._mtime:
+                self.load()
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            # Битый файл не должен отключать уже загруженные ключи
+            logger.error(f"Не удалось перечитать файл ключей API: {e}")
+
+    def authenticate(self, key: str) -> ApiKey | None:
+        if self._keys is None:
+            self.load()
+        else:
+            self._maybe_reload()
+        digest = hash_api_key(key)
+        record = self._keys.get(digest)
+        # Поиск идёт по хешу, поэтому время ответа не зависит от совпадения
+        # префикса самого ключа; сравнение дополнительно постоянное по времени
+        if record is None or not hmac.compare_digest(record.key_hash, digest):
+            return None
+        return record
+
+
+class InMemoryRateLimiter:
+    """Token bucket и квота по ключу в памяти процесса
+
+    При нескольких воркерах лимит действует на каждый воркер отдельно,
+    для общего лимита используется RedisRateLimiter.
+    """
+
+    def __init__(self, quota_period: int = API_QUOTA_PERIOD):
+        self.quota_period = quota_period
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._quotas: dict[str, tuple[int, int]] = {}
+
+    async def acquire(self, key: ApiKey):
+        now = time.monotonic()
+        tokens = None
+        if key.rate > 0:
+            burst = key.burst or math.ceil(key.rate)
+            tokens, updated = self._buckets.get(key.name, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * key.rate)
+            if tokens < 1:
+                raise RateLimitExceededException(math.ceil((1 - tokens) / key.rate))
+
+        if key.quota > 0:
+            wall = time.time()
+            window = int(wall // self.quota_period)
+            used_window, used = self._quotas.get(key.name, (window, 0))
+            if used_window != window:
+                used = 0
+            if used >= key.quota:
+                raise QuotaExceededException(
+                    math.ceil((window + 1) * self.quota_period - wall)
+                )
+            self._quotas[key.name] = (window, used + 1)
+
+        if tokens is not None:
+            self._buckets[key.name] = (tokens - 1, now)
+
+
+class RedisRateLimiter:
+    """Общий для всех воркеров и инстансов лимит на Redis
+
+    Проверка корзины и квоты выполняется одним Lua-скриптом, то есть одним
+    обращением к Redis на запрос. Требует пакет redis.
+    """
+
+    SCRIPT = """
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local quota, period = tonumber(ARGV[4]), tonumber(ARGV[5])
+    local tokens
+    if rate > 0 then
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+        tokens = tonumber(bucket[1]) or burst
+        local ts = tonumber(bucket[2]) or now
+        tokens = math.min(burst, tokens + (now - ts) * rate)
+        if tokens < 1 then
+            return {'rate', tostring((1 - tokens) / rate)}
+        end
+    end
+    if quota > 0 then
+        local used = redis.call('INCR', KEYS[2])
+        if used == 1 then
+            redis.call('EXPIRE', KEYS[2], period)
+        end
+        if used > quota then
+            return {'quota', tostring(redis.call('TTL', KEYS[2]))}
+        end
+    end
+    if tokens then
+        redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'ts', now)
+        redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    end
+    return {'ok', '0'}
+    """
+
+    def __init__(
+        self, url: str = API_RATE_LIMIT_REDIS_URL, quota_period: int = API_QUOTA_PERIOD
+    ):
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError(
+                "Для API_RATE_LIMIT_BACKEND=redis требуется пакет redis"
+            )
+        self.quota_period = quota_period
+        self._redis = Redis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    async def acquire(self, key: ApiKey):
+        if key.rate <= 0 and key.quota <= 0:
+            return
+        window = int(time.time() // self.quota_period)
+        status, retry_after = await self._script(
+            keys=[f"ratelimit:{key.name}", f"quota:{key.name}:{window}"],
+            args=[
+                key.rate,
+                key.burst or math.ceil(key.rate),
+                time.time(),
+                key.quota,
+                self.quota_period,
+            ],
+        )
+        if status == b"rate":
+            raise RateLimitExceededException(math.ceil(float(retry_after)))
+        if status == b"quota":
+            raise QuotaExceededException(max(int(retry_after), 1))
+
+
+def create_rate_limiter():
+    if API_RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimiter()
+    return InMemoryRateLimiter()
+
+
+api_key_store = ApiKeyStore()
+rate_limiter = create_rate_limiter()
+
+
+if __name__ == "__main__":
+    print(hash_api_key(sys.argv[1]))
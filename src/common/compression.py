@@ -0,0 +1,132 @@
+"""Сжатие ответов с выбором кодировки по Accept-Encoding
+
+Поддерживаются zstd, br и gzip; при равном q выбирается первая из
+ENCODINGS. brotli и zstd требуют пакетов brotli и zstandard, без них
+остаётся gzip.
+"""
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.common.config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_ZSTD_LEVEL,
+)
+from src.common.metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/xml")
+
+
+def _create_encoders() -> dict:
+    encoders = {}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL)
+        encoders["zstd"] = compressor.compress
+    if brotli is not None:
+        encoders["br"] = lambda data: brotli.compress(
+            data, quality=COMPRESSION_BROTLI_QUALITY
+        )
+    encoders["gzip"] = lambda data: gzip.compress(
+        data, COMPRESSION_GZIP_LEVEL, mtime=0
+    )
+    return encoders
+
+
+ENCODERS = _create_encoders()
+ENCODINGS = tuple(ENCODERS)
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Кодировка с наибольшим q из поддерживаемых, None — без сжатия"""
+    best, best_q = None, 0.0
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if name not in ENCODERS:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if q > best_q or (
+            q == best_q and best and ENCODINGS.index(name) < ENCODINGS.index(best)
+        ):
+            best, best_q = name, q
+    return best
+
+
+class CompressionMiddleware:
+    """Сжатие ответов, тело которых приходит одним сообщением
+
+    Потоковые ответы (лента изменений) и тела меньше minimum_size
+    отправляются как есть: первым выгоднее отдать байты без задержки,
+    вторым сжатие почти ничего не даёт.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            headers = MutableHeaders(raw=start.setdefault("headers", []))
+            body = message.get("body", b"")
+            compressible = headers.get("content-type", "").startswith(
+                COMPRESSIBLE_TYPES
+            )
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            if (
+                not compressible
+                or message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            compressed = ENCODERS[encoding](body)
+            metrics.inc(f"http.compression.{encoding}.bytes_in", len(body))
+            metrics.inc(f"http.compression.{encoding}.bytes_out", len(compressed))
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,81 @@
+"""Условные GET-запросы по версиям данных
+
+ETag ответа — версии групп таблиц, из которых он собран (см. data_versions
+и ChangeNotifier.versions). Версии процесс получает уведомлениями, поэтому
+ответ 304 на совпавший If-None-Match отдаётся без обращения к БД. ETag
+слабый: тело может отличаться кодировкой сжатия и порядком полей, но не
+данными. Без подписки на уведомления и при шардировании (изменения других
+шардов сюда не приходят) ETag не выставляется. На реплике SQLite данные не
+меняются, пока работает воркер, и ETag — позиция реплики в ленте изменений.
+"""
+from fastapi import Depends, Request
+from starlette.datastructures import MutableHeaders
+
+from src.changes.notifier import change_notifier
+from src.common.config import DIRECTORY_BACKEND
+from src.common.database import shard_router
+from src.common.exceptions import NotModifiedException
+from src.common.metrics import metrics
+from src.replica.database import replica
+
+# Версии, от которых зависят ответы справочника
+ORGANIZATION_VERSIONS = ("organizations", "buildings", "activities", "organization_search")
+BUILDING_VERSIONS = ("buildings",)
+ACTIVITY_VERSIONS = ("activities",)
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Сравнение слабое: W/ у сторон не учитывается
+    return etag.removeprefix("W/") in (
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    )
+
+
+def conditional_get(versions: tuple[str, ...]):
+    """Зависимость GET-эндпоинта: ETag из versions и 304 при совпадении"""
+
+    async def check(request: Request):
+        if shard_router.sharded:
+            return
+        if DIRECTORY_BACKEND == "replica":
+            current = None if replica.version is None else (replica.version,)
+        else:
+            current = change_notifier.data_version(versions)
+        if current is None:
+            return
+        etag = 'W/"' + "-".join(map(str, current)) + '"'
+        request.state.etag = etag
+        if _matches(request.headers.get("if-none-match"), etag):
+            metrics.inc("http.not_modified")
+            raise NotModifiedException(etag)
+
+    return Depends(check)
+
+
+class ETagMiddleware:
+    """Добавляет ETag, вычисленный conditional_get, к успешным ответам
+
+    Заголовок ставится здесь, а не через Response в зависимости, потому
+    что эндпоинты с fields возвращают JSONResponse напрямую.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                etag = scope.get("state", {}).get("etag")
+                if etag is not None:
+                    MutableHeaders(raw=message.setdefault("headers", []))["ETag"] = etag
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
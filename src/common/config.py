@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+import json
 import os
 
 load_dotenv()
@@ -7,4 +8,157 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "directory")
 DB_USER = os.getenv("DB_USER", "user")
 DB_PASS = os.getenv("DB_PASS", "password")
-API_KEY = os.getenv("API_KEY", "secret-key")
\ No newline at end of file
+API_KEY = os.getenv("API_KEY", "secret-key")
+
+# Кэши запросов: скомпилированные SQLAlchemy-выражения на процесс и
+# подготовленные asyncpg-операторы на соединение. Подготовленные операторы
+# живут, пока живёт соединение, поэтому pool_recycle сбрасывает и их
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "500"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "30"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "25"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Сколько соединений пула открыть при запуске воркера; 0 — только проверка
+# соединения. Все воркеры открывают их одновременно, поэтому по умолчанию
+# немного: остальные соединения пул откроет по мере нагрузки
+DB_POOL_WARM_UP = int(os.getenv("DB_POOL_WARM_UP", "2"))
+# Не чаще чем раз в столько секунд проверка готовности повторяет неудачный
+# прогрев: частые пробы не должны открывать соединения к недоступной БД
+DB_WARM_UP_RETRY_SECONDS = float(os.getenv("DB_WARM_UP_RETRY_SECONDS", "5"))
+# statement_timeout запросов API в мс: общий и JSON {"шаблон пути": мс};
+# 0 — без ограничения. Фоновые задачи и CLI не ограничиваются
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+DB_STATEMENT_TIMEOUTS = json.loads(
+    os.getenv(
+        "DB_STATEMENT_TIMEOUTS",
+        '{"/api/organizations": 2000, "/api/organizations/nearest": 2000}',
+    )
+)
+# Запросы API отклоняются с 503, когда пул занят целиком, а сглаженное
+# время ожидания соединения выше порога (мс); 0 — без отказов
+DB_ADMISSION_MAX_WAIT_MS = float(os.getenv("DB_ADMISSION_MAX_WAIT_MS", "100"))
+# Запоминать метод репозитория, выполнивший запрос: по нему отчёт
+# обслуживания (src.common.maintenance) сопоставляет pg_stat_statements с кодом
+DB_QUERY_CALL_SITES = os.getenv("DB_QUERY_CALL_SITES", "true").lower() == "true"
+
+# Шарды по регионам: JSON-список {"name": ..., "url": ..., "regions": [...]}.
+# Основная БД (DB_*) обслуживает регионы, не закреплённые за шардами.
+# Идентификаторы шарда k лежат в [k * DB_SHARD_ID_SPAN, (k + 1) * DB_SHARD_ID_SPAN)
+DB_SHARDS = json.loads(os.getenv("DB_SHARDS", "[]"))
+DB_SHARD_ID_SPAN = int(os.getenv("DB_SHARD_ID_SPAN", "100000000"))
+
+# Режим приёма новых организаций: "sync" — запись в запросе, "queue" — через очередь
+ORGANIZATION_INGEST_MODE = os.getenv("ORGANIZATION_INGEST_MODE", "sync")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "0.05"))
+INGEST_QUEUE_MAXSIZE = int(os.getenv("INGEST_QUEUE_MAXSIZE", "100000"))
+# Как часто воркер проверяет задачи, принятые другими процессами, секунды
+INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "1"))
+INGEST_JOBS_RETENTION = int(os.getenv("INGEST_JOBS_RETENTION", "100000"))
+
+# Логирование: формат json (поток вывода с очередью) или text (цветной
+# синхронный вывод), выборка успешных запросов для журнала запросов (общая
+# доля и JSON {"шаблон пути": доля}) и пороги медленных запросов и SQL
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_REQUEST_SAMPLE_RATE = float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "0.01"))
+LOG_REQUEST_SAMPLE_RATES = json.loads(os.getenv("LOG_REQUEST_SAMPLE_RATES", "{}"))
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+LOG_SLOW_QUERY_MS = float(os.getenv("LOG_SLOW_QUERY_MS", "200"))
+
+# Параметры сервера приложений (gunicorn + uvicorn-воркеры)
+# Миграции в lifespan: при запуске `uvicorn src.main:app` они, как и
+# раньше, выполняются при старте. Под gunicorn их выполняет мастер один раз
+# (gunicorn.conf.py выставляет RUN_MIGRATIONS=false для воркеров), иначе
+# каждый воркер запускал бы их при каждом старте
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "true").lower() == "true"
+WEB_WORKERS = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+WEB_LOOP = os.getenv("WEB_LOOP", "uvloop")
+WEB_HTTP = os.getenv("WEB_HTTP", "httptools")
+WEB_LIMIT_CONCURRENCY = int(os.getenv("WEB_LIMIT_CONCURRENCY", "0")) or None
+WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", "2048"))
+WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+WEB_PRELOAD = os.getenv("WEB_PRELOAD", "false").lower() == "true"
+
+# Ключи API: JSON-файл с хешами ключей и лимитами; без файла используется API_KEY
+API_KEYS_FILE = os.getenv("API_KEYS_FILE")
+API_KEYS_RELOAD_INTERVAL = float(os.getenv("API_KEYS_RELOAD_INTERVAL", "5"))
+API_KEY_RATE = float(os.getenv("API_KEY_RATE", "0"))
+API_KEY_BURST = int(os.getenv("API_KEY_BURST", "0"))
+API_KEY_QUOTA = int(os.getenv("API_KEY_QUOTA", "0"))
+API_QUOTA_PERIOD = int(os.getenv("API_QUOTA_PERIOD", "86400"))
+API_RATE_LIMIT_BACKEND = os.getenv("API_RATE_LIMIT_BACKEND", "memory")
+API_RATE_LIMIT_REDIS_URL = os.getenv(
+    "API_RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"
+)
+
+# Объединение одинаковых одновременных чтений в один запрос к БД
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# Максимум номеров в одном запросе пакетного поиска владельцев
+PHONE_LOOKUP_MAX_BATCH = int(os.getenv("PHONE_LOOKUP_MAX_BATCH", "5000"))
+
+# Поиск дубликатов организаций
+DEDUP_SHARDS = int(os.getenv("DEDUP_SHARDS", "8"))
+DEDUP_NAME_THRESHOLD = float(os.getenv("DEDUP_NAME_THRESHOLD", "0.6"))
+DEDUP_GEO_NAME_THRESHOLD = float(os.getenv("DEDUP_GEO_NAME_THRESHOLD", "0.8"))
+DEDUP_CELL_DEGREES = float(os.getenv("DEDUP_CELL_DEGREES", "0.005"))
+
+# Сжатие ответов (zstd, br, gzip): минимальный размер тела и уровни сжатия
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Обслуживание таблиц (src.common.maintenance): фоновый ANALYZE после
+# массовых изменений и пороги советов по VACUUM
+MAINTENANCE_TASK = os.getenv("MAINTENANCE_TASK", "false").lower() == "true"
+MAINTENANCE_INTERVAL = float(os.getenv("MAINTENANCE_INTERVAL", "60"))
+MAINTENANCE_ANALYZE_FRACTION = float(os.getenv("MAINTENANCE_ANALYZE_FRACTION", "0.1"))
+MAINTENANCE_ANALYZE_MIN_ROWS = int(os.getenv("MAINTENANCE_ANALYZE_MIN_ROWS", "1000"))
+MAINTENANCE_VACUUM_DEAD_FRACTION = float(
+    os.getenv("MAINTENANCE_VACUUM_DEAD_FRACTION", "0.2")
+)
+
+# Денормализованная таблица поиска организаций: фоновое обновление в процессе
+# приложения и интервал опроса на случай пропущенных уведомлений
+ORGANIZATION_SEARCH_REFRESHER = (
+    os.getenv("ORGANIZATION_SEARCH_REFRESHER", "true").lower() == "true"
+)
+ORGANIZATION_SEARCH_REFRESH_INTERVAL = float(
+    os.getenv("ORGANIZATION_SEARCH_REFRESH_INTERVAL", "5")
+)
+# Как часто пересчитывать число организаций в поддеревьях видов
+# деятельности, по которому выбирается план поиска по поддереву (с);
+# 0 — без статистики, всегда поиск по индексу
+ORGANIZATION_TREE_STATS_INTERVAL = float(
+    os.getenv("ORGANIZATION_TREE_STATS_INTERVAL", "300")
+)
+
+# Иерархия видов деятельности: максимальное число уровней от корня до листа
+# и число переносов в одном запросе перестройки дерева
+ACTIVITY_MAX_DEPTH = int(os.getenv("ACTIVITY_MAX_DEPTH", "3"))
+ACTIVITY_RESTRUCTURE_MAX_MOVES = int(
+    os.getenv("ACTIVITY_RESTRUCTURE_MAX_MOVES", "1000")
+)
+
+# Пакетный эндпоинт POST /api/batch: число запросов в пакете и потолок
+# стоимости — сумма по запросам числа id × (1 + число связей в include)
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "50"))
+BATCH_MAX_COST = int(os.getenv("BATCH_MAX_COST", "2000"))
+
+# Снимки справочника для аналитики (src.snapshot.job): каталог снимков,
+# строк в одной пачке серверного курсора и группе строк Parquet, а также
+# БД для чтения — по умолчанию основная, лучше реплика
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_CHUNK_ROWS = int(os.getenv("SNAPSHOT_CHUNK_ROWS", "50000"))
+SNAPSHOT_DATABASE_URL = os.getenv("SNAPSHOT_DATABASE_URL")
+
+# Источник данных API: postgres или replica — локальная копия справочника
+# в SQLite только для чтения (src.replica) для точек без надёжной связи с
+# Postgres. Файл реплики собирает python -m src.replica.build
+DIRECTORY_BACKEND = os.getenv("DIRECTORY_BACKEND", "postgres")
+REPLICA_PATH = os.getenv("REPLICA_PATH", "directory.db")
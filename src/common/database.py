@@ -1,12 +1,52 @@
 import asyncio
 import subprocess
-from loguru import logger
+import sys
+import time
+import weakref
+from collections.abc import Iterable
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import AsyncGenerator
 
 import asyncpg
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
-from src.common.config import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER
+import greenlet
+from sqlalchemy import event, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
+from sqlalchemy.orm import DeclarativeBase, Session
+from starlette.requests import Request
+
+from src.common.admission import TimedQueuePool, admission
+from src.common.config import (
+    DB_HOST,
+    DB_NAME,
+    DB_PASS,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_QUERY_CALL_SITES,
+    DB_PORT,
+    DB_QUERY_CACHE_SIZE,
+    DB_SHARD_ID_SPAN,
+    DB_SHARDS,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_STATEMENT_TIMEOUT_MS,
+    DB_STATEMENT_TIMEOUTS,
+    DB_USER,
+    LOG_SLOW_QUERY_MS,
+)
+from src.common.logger import logger
+from src.common.metrics import metrics
+
+# statement_timeout транзакций текущего запроса API, мс; None — не задаётся
+statement_timeout: ContextVar[int | None] = ContextVar(
+    "statement_timeout", default=None
+)
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
@@ -15,26 +55,227 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(
-    DATABASE_URL,
-    pool_size=30,
-    max_overflow=25,
-    echo=False,
-    pool_timeout=30,
-    pool_recycle=1800,
-    pool_pre_ping=True,
-)
+# Скомпилированные выражения выполненных запросов, которые ещё живы: их
+# держит кэш компиляции, вытесненные из него освобождаются, поэтому размер
+# множества следует за заполнением кэшей всех движков
+_live_compiled: weakref.WeakSet = weakref.WeakSet()
 
-async_session_maker = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+
+def _count_compiled_cache(conn, cursor, statement, parameters, context, executemany):
+    """Статистика кэша скомпилированных выражений для /api/metrics"""
+    metrics.inc(f"db.compiled_cache.{context.cache_hit.name.lower()}")
+    hits = metrics.get("db.compiled_cache.cache_hit")
+    misses = metrics.get("db.compiled_cache.cache_miss")
+    if hits + misses:
+        metrics.set("db.compiled_cache.hit_ratio", hits / (hits + misses))
+    if context.compiled is not None:
+        _live_compiled.add(context.compiled)
+        metrics.set("db.compiled_cache.size", len(_live_compiled))
+
+
+def call_site() -> str | None:
+    """Метод репозитория (или первый код приложения), выполняющий запрос
+
+    Запрос асинхронной сессии выполняется в дочернем greenlet, а корутина,
+    которая его ждёт, приостановлена в родительском, поэтому стек
+    просматривается от кадра родителя.
+    """
+    current = greenlet.getcurrent()
+    frame = current.parent.gr_frame if current.parent is not None else sys._getframe()
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("src.") and module != __name__:
+            site = f"{module}:{frame.f_code.co_qualname}"
+            if module.endswith(".repository"):
+                return site
+            fallback = fallback or site
+        frame = frame.f_back
+    return fallback
+
+
+# Места вызова запросов воркера: текст запроса -> методы, которые его
+# выполняли. pg_stat_statements не учитывает комментарии в queryid и
+# хранит текст первого выполнения, поэтому место вызова в SQL не передаётся:
+# фоновое обслуживание сохраняет накопленное по отпечатку запроса
+# (см. src.common.maintenance)
+query_call_sites: dict[str, set[str]] = {}
+# Потолок числа разных текстов запросов между сохранениями
+QUERY_CALL_SITES_LIMIT = 10_000
+
+
+def _record_call_site(conn, cursor, statement, parameters, context, executemany):
+    site = call_site()
+    if site is None:
+        return
+    sites = query_call_sites.get(statement)
+    if sites is None:
+        if len(query_call_sites) >= QUERY_CALL_SITES_LIMIT:
+            return
+        sites = query_call_sites[statement] = set()
+    sites.add(site)
+
+
+def take_call_sites() -> dict[str, set[str]]:
+    """Накопленные места вызова; реестр воркера при этом очищается"""
+    sites = dict(query_call_sites)
+    query_call_sites.clear()
+    return sites
+
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    # Запросы на соединении идут по одному, поэтому хватает одного значения
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - conn.info["query_started"]) * 1000
+    if duration_ms >= LOG_SLOW_QUERY_MS:
+        logger.bind(
+            duration_ms=round(duration_ms, 2),
+            call_site=call_site(),
+            statement=statement[:1000],
+        ).warning("slow query")
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    """Ограничивает время запросов транзакции значением для маршрута
+
+    SET LOCAL действует до конца транзакции, и соединение возвращается в
+    пул без изменённых настроек, поэтому фоновые задачи на том же пуле не
+    ограничиваются. Отменённый по таймауту запрос освобождает соединение.
+    """
+    timeout = statement_timeout.get()
+    if timeout:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
+def create_engine(url: str) -> AsyncEngine:
+    url = make_url(url).update_query_dict(
+        {"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}
+    )
+    new_engine = create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        echo=False,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        query_cache_size=DB_QUERY_CACHE_SIZE,
+    )
+    event.listen(new_engine.sync_engine, "before_cursor_execute", _count_compiled_cache)
+    if LOG_SLOW_QUERY_MS > 0:
+        event.listen(
+            new_engine.sync_engine, "before_cursor_execute", _start_query_timer
+        )
+        event.listen(new_engine.sync_engine, "after_cursor_execute", _log_slow_query)
+    if DB_QUERY_CALL_SITES:
+        event.listen(new_engine.sync_engine, "before_cursor_execute", _record_call_site)
+    return new_engine
+
+
+def create_session_maker(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
+engine = create_engine(DATABASE_URL)
+async_session_maker = create_session_maker(engine)
+
+
+@dataclass
+class Shard:
+    name: str
+    index: int
+    # None — все регионы, не закреплённые за другими шардами
+    regions: frozenset[str] | None
+    engine: AsyncEngine
+    session_maker: async_sessionmaker[AsyncSession]
+
+    def session(self) -> AsyncSession:
+        """Сессия шарда для запроса API; при перегрузке его пула — 503"""
+        admission.admit(self.engine.pool)
+        return self.session_maker()
+
+
+class ShardRouter:
+    """Маршрутизация запросов справочника по шардам-регионам
+
+    Шард 0 — основная БД (DB_*), остальные задаются DB_SHARDS. Каждый шард —
+    полная схема со зданиями и организациями своих регионов и одинаковым
+    деревом видов деятельности; пишет в шард развёртывание его региона.
+    Чтение списков рассылается на шарды нужных регионов и склеивается
+    (см. OrganizationService), запись по id направляется в шард по
+    диапазону id, который выставляет `python -m src.common.shards prepare`.
+    Без DB_SHARDS маршрутизатор состоит из одной основной БД.
+    """
+
+    def __init__(self, shards: list[Shard], id_span: int):
+        self.shards = shards
+        self.id_span = id_span
+        self._claimed = frozenset().union(
+            *(shard.regions for shard in shards if shard.regions is not None)
+        )
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.shards) > 1
+
+    def for_regions(self, regions: Iterable[str] | None) -> list[Shard]:
+        """Шарды, хранящие хотя бы один из регионов; None — все шарды"""
+        if regions is None:
+            return list(self.shards)
+        regions = frozenset(regions)
+        return [
+            shard
+            for shard in self.shards
+            if (
+                shard.regions & regions
+                if shard.regions is not None
+                else regions - self._claimed
+            )
+        ]
+
+    def for_id(self, id: int) -> Shard:
+        index = id // self.id_span
+        return self.shards[index] if 0 <= index < len(self.shards) else self.shards[0]
+
+    async def dispose(self):
+        for shard in self.shards:
+            await shard.engine.dispose()
+
+
+def _create_shard_router() -> ShardRouter:
+    shards = [Shard("primary", 0, None, engine, async_session_maker)]
+    for index, config in enumerate(DB_SHARDS, start=1):
+        shard_engine = create_engine(config["url"])
+        shards.append(
+            Shard(
+                name=config["name"],
+                index=index,
+                regions=frozenset(config["regions"]),
+                engine=shard_engine,
+                session_maker=create_session_maker(shard_engine),
+            )
+        )
+    return ShardRouter(shards, DB_SHARD_ID_SPAN)
+
+
+shard_router = _create_shard_router()
 
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_async_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    admission.admit(engine.pool)
+    route = getattr(request.scope.get("route"), "path", None)
+    statement_timeout.set(DB_STATEMENT_TIMEOUTS.get(route, DB_STATEMENT_TIMEOUT_MS))
     async with async_session_maker() as session:
         try:
             yield session
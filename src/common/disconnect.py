@@ -0,0 +1,58 @@
+"""Отмена обработки запроса, когда клиент отключился
+
+Медленный запрос к БД держит соединение пула, даже если ответ уже некому
+отправить. Для GET и HEAD middleware слушает канал ASGI и при
+http.disconnect до конца ответа отменяет обработчик: отмена корутины
+прерывает ожидание asyncpg, и тот отменяет запрос на сервере. Запросы на
+изменение доводятся до конца, чтобы результат записи не зависел от
+клиента.
+"""
+import asyncio
+from contextlib import suppress
+
+from src.common.metrics import metrics
+
+CANCELLABLE_METHODS = ("GET", "HEAD")
+
+
+class CancelOnDisconnectMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in CANCELLABLE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        # Канал читает только наблюдатель, приложение получает сообщения
+        # из очереди, иначе они достались бы кому-то одному
+        messages: asyncio.Queue[dict] = asyncio.Queue()
+        response_complete = False
+
+        async def watch():
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        async def send_tracked(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                response_complete = True
+            await send(message)
+
+        handler = asyncio.ensure_future(self.app(scope, messages.get, send_tracked))
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await asyncio.wait((handler, watcher), return_when=asyncio.FIRST_COMPLETED)
+            if not handler.done() and not response_complete:
+                metrics.inc("http.cancelled_on_disconnect")
+                handler.cancel()
+                with suppress(asyncio.CancelledError):
+                    await handler
+                return
+            await handler
+        finally:
+            watcher.cancel()
+            handler.cancel()
@@ -43,6 +43,14 @@ class CircularDependencyException(HTTPException):
         )
 
 
+class ActivityDepthExceededException(HTTPException):
+    def __init__(self, max_depth: int):
+        super().__init__(
+            status_code=400,
+            detail=f"Превышена максимальная глубина иерархии видов деятельности: {max_depth}",
+        )
+
+
 class BuildingNotFoundException(HTTPException):
     def __init__(self, building_id: int):
         super().__init__(
@@ -134,3 +142,137 @@ class InvalidPhoneNumberException(HTTPException):
         super().__init__(
             status_code=400, detail=f"Некорректный формат номера телефона: {phone}"
         )
+
+
+class IngestJobNotFoundException(HTTPException):
+    def __init__(self, job_id: str):
+        super().__init__(
+            status_code=404, detail=f"Задача на создание организации {job_id} не найдена"
+        )
+
+
+class IngestQueueFullException(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Очередь создания организаций переполнена, повторите запрос позже",
+            headers={"Retry-After": "1"},
+        )
+
+
+class DatabaseOverloadedException(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail="Сервис перегружен, повторите запрос позже",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class VersionConflictException(HTTPException):
+    def __init__(self, version: int):
+        super().__init__(
+            status_code=409,
+            detail=f"Запись была изменена другим запросом (ожидалась версия {version})",
+        )
+
+
+class InvalidOrganizationDataException(HTTPException):
+    def __init__(self, message: str):
+        super().__init__(
+            status_code=400, detail=f"Некорректные данные организации: {message}"
+        )
+
+
+class BuildingInUseException(HTTPException):
+    def __init__(self, building_id: int):
+        super().__init__(
+            status_code=409,
+            detail=f"Здание с ID {building_id} нельзя удалить: в нём есть организации",
+        )
+
+
+class ActivityInUseException(HTTPException):
+    def __init__(self, activity_id: int):
+        super().__init__(
+            status_code=409,
+            detail=f"Вид деятельности с ID {activity_id} нельзя удалить: у него есть дочерние виды",
+        )
+
+
+class RateLimitExceededException(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=429,
+            detail="Превышен лимит запросов для ключа API",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class QuotaExceededException(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=429,
+            detail="Исчерпана квота запросов для ключа API",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class InvalidChangeCursorException(HTTPException):
+    def __init__(self, since: str):
+        super().__init__(
+            status_code=400, detail=f"Некорректная позиция ленты изменений: {since}"
+        )
+
+
+class DuplicateCandidateNotFoundException(HTTPException):
+    def __init__(self, candidate_id: int):
+        super().__init__(
+            status_code=404, detail=f"Пара-кандидат в дубликаты с ID {candidate_id} не найдена"
+        )
+
+
+class DuplicateCandidateResolvedException(HTTPException):
+    def __init__(self, candidate_id: int):
+        super().__init__(
+            status_code=409,
+            detail=f"Пара-кандидат в дубликаты с ID {candidate_id} уже обработана",
+        )
+
+
+class DuplicateOrganizationMissingException(HTTPException):
+    def __init__(self, org_id: int):
+        super().__init__(
+            status_code=409,
+            detail=f"Организация с ID {org_id} из пары-кандидата уже удалена",
+        )
+
+
+class InvalidMergeTargetException(HTTPException):
+    def __init__(self, org_id: int):
+        super().__init__(
+            status_code=400,
+            detail=f"Организация с ID {org_id} не входит в пару-кандидат",
+        )
+
+
+class InvalidFieldsException(HTTPException):
+    def __init__(self, unknown: list[str], allowed: list[str]):
+        super().__init__(
+            status_code=400,
+            detail=f"Неизвестные поля: {', '.join(unknown) or '(пусто)'}. "
+            f"Доступные поля: {', '.join(allowed)}",
+        )
+
+
+class NotModifiedException(HTTPException):
+    def __init__(self, etag: str):
+        super().__init__(status_code=304, headers={"ETag": etag})
+
+
+class BatchTooComplexException(HTTPException):
+    def __init__(self, cost: int, limit: int):
+        super().__init__(
+            status_code=400,
+            detail=f"Слишком сложный пакет запросов: стоимость {cost}, максимум {limit}",
+        )
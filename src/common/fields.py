@@ -0,0 +1,86 @@
+"""Выборочные поля ответа для списков (?fields=id,name)
+
+Каждое поле ответа описывает, какие колонки и связи нужны для его
+заполнения. По запрошенному набору строится запрос: если нужны только
+колонки — один узкий SELECT этих колонок без ORM-сущностей, иначе сущность
+с load_only и selectinload только нужных связей.
+"""
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import Result, Select
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+from src.common.exceptions import InvalidFieldsException
+
+
+@dataclass(frozen=True)
+class ResponseField:
+    columns: tuple = ()
+    relations: tuple = ()
+    # Значение поля из ORM-объекта; по умолчанию атрибут с именем поля
+    value: Callable[[Any], Any] | None = None
+
+
+class FieldSet:
+    def __init__(self, fields: dict[str, ResponseField], default_options: tuple):
+        self.fields = fields
+        self.default_options = default_options
+        # Выражения запоминаются по (базовое выражение, набор полей), чтобы
+        # ключ кэша компиляции не пересчитывался на каждый запрос
+        self.statement = lru_cache(maxsize=512)(self._statement)
+
+    def parse(self, raw: str | None) -> tuple[str, ...] | None:
+        """Разбирает параметр fields; id возвращается всегда"""
+        if raw is None:
+            return None
+        names = [name.strip() for name in raw.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise InvalidFieldsException(unknown, list(self.fields))
+        return tuple(dict.fromkeys(["id", *names]))
+
+    def _relations(self, fields: tuple[str, ...]) -> list:
+        return list(
+            dict.fromkeys(r for name in fields for r in self.fields[name].relations)
+        )
+
+    def _statement(self, stmt: Select, fields: tuple[str, ...] | None) -> Select:
+        if fields is None:
+            return stmt.options(*self.default_options)
+        columns = list(
+            dict.fromkeys(c for name in fields for c in self.fields[name].columns)
+        )
+        relations = self._relations(fields)
+        if not relations:
+            return stmt.with_only_columns(*columns)
+        return stmt.options(
+            load_only(*columns),
+            *(selectinload(relation) for relation in relations),
+            raiseload("*"),
+        )
+
+    def rows(self, result: Result, fields: tuple[str, ...] | None) -> list:
+        """ORM-объекты для полного ответа или словари с запрошенными полями"""
+        if fields is None:
+            return list(result.scalars().all())
+        if not self._relations(fields):
+            return [dict(row._mapping) for row in result]
+        return self.dicts(result.scalars().all(), fields)
+
+    def dicts(self, objects: list, fields: tuple[str, ...] | None = None) -> list[dict]:
+        """Словари с полями ответа из ORM-объектов, по умолчанию со всеми"""
+        names = fields or tuple(self.fields)
+        return [
+            {
+                name: (
+                    self.fields[name].value(obj)
+                    if self.fields[name].value
+                    else getattr(obj, name)
+                )
+                for name in names
+            }
+            for obj in objects
+        ]
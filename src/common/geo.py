@@ -0,0 +1,68 @@
+"""Географические регионы справочника
+
+Регион — префикс geohash точки здания длины REGION_PRECISION. При длине 1
+это 32 ячейки 45° x 45°: по регионам секционирована таблица
+organization_search и распределяются шарды. Та же формула реализована в
+SQL-функции geo_region (миграция f1c3e7a9b2d4), результаты должны совпадать.
+"""
+import math
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+REGION_PRECISION = 1
+
+
+def _bits(precision: int) -> tuple[int, int]:
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def _cell(value: float, low: float, high: float, bits: int) -> int:
+    index = math.floor((value - low) / (high - low) * (1 << bits))
+    return min(max(index, 0), (1 << bits) - 1)
+
+
+def _encode(lon_cell: int, lat_cell: int, lon_bits: int, lat_bits: int) -> str:
+    # Биты чередуются начиная с долготы, старшие первыми
+    code = 0
+    for i in range(lon_bits + lat_bits):
+        if i % 2 == 0:
+            bit = (lon_cell >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_cell >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+    chars = []
+    for shift in range(lon_bits + lat_bits - 5, -1, -5):
+        chars.append(GEOHASH_ALPHABET[(code >> shift) & 31])
+    return "".join(chars)
+
+
+def region_of(lat: float, lon: float, precision: int = REGION_PRECISION) -> str:
+    lon_bits, lat_bits = _bits(precision)
+    return _encode(
+        _cell(lon, -180, 180, lon_bits),
+        _cell(lat, -90, 90, lat_bits),
+        lon_bits,
+        lat_bits,
+    )
+
+
+def regions_for_bbox(
+    lat_min: float,
+    lat_max: float,
+    lon_min: float,
+    lon_max: float,
+    precision: int = REGION_PRECISION,
+) -> list[str]:
+    """Регионы, пересекающиеся с прямоугольником (границы включительно)"""
+    lon_bits, lat_bits = _bits(precision)
+    lon_cells = range(
+        _cell(lon_min, -180, 180, lon_bits), _cell(lon_max, -180, 180, lon_bits) + 1
+    )
+    lat_cells = range(
+        _cell(lat_min, -90, 90, lat_bits), _cell(lat_max, -90, 90, lat_bits) + 1
+    )
+    return [
+        _encode(lon_cell, lat_cell, lon_bits, lat_bits)
+        for lon_cell in lon_cells
+        for lat_cell in lat_cells
+    ]
@@ -0,0 +1,137 @@
+"""Живость и готовность воркера принимать трафик
+
+Воркер готов, когда lifespan завершил запуск и прогрел пулы соединений:
+на каждом шарде одновременно открываются DB_POOL_WARM_UP соединений, и на
+одном из них один раз выполняются горячие запросы репозиториев, так что
+asyncpg заранее подготавливает операторы, а дерево видов деятельности
+попадает в буферы БД. Первые запросы после деплоя не платят за
+подключение. Если при запуске БД недоступна, проверка готовности
+повторяет прогрев, но не чаще раза в DB_WARM_UP_RETRY_SECONDS.
+"""
+
+import asyncio
+import time
+from contextlib import AsyncExitStack
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from src.common.config import DB_POOL_WARM_UP, DB_WARM_UP_RETRY_SECONDS
+from src.common.database import Shard, shard_router
+from src.common.logger import logger
+from src.common.metrics import metrics
+
+
+def pool_state(shard: Shard) -> dict:
+    pool = shard.engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # overflow() отсчитывается от -size, пока пул не заполнен
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+class Readiness:
+    def __init__(
+        self,
+        connections: int = DB_POOL_WARM_UP,
+        retry_seconds: float = DB_WARM_UP_RETRY_SECONDS,
+    ):
+        self.connections = connections
+        self.retry_seconds = retry_seconds
+        self.repositories: tuple = ()
+        # Прогреваемые и отображаемые пулы; на реплике — только её пул
+        self.shards: list[Shard] = shard_router.shards
+        self.started = False
+        self.ready = False
+        self.reason = "запуск не завершён"
+        self.warm_up_ms: float | None = None
+        # Один прогрев за раз: lifespan и пробы готовности не запускают второй
+        self._lock = asyncio.Lock()
+        self._attempted_at = float("-inf")
+
+    async def warm_up(self, repositories=None):
+        """Прогревает пулы всех шардов и отмечает воркер готовым
+
+        repositories — репозитории с методом warm_up; переданные один раз
+        используются и при повторных попытках из проверки готовности.
+        """
+        if repositories is not None:
+            self.repositories = tuple(repositories)
+        self.started = True
+        async with self._lock:
+            self._attempted_at = time.monotonic()
+            started = time.perf_counter()
+            try:
+                await asyncio.gather(
+                    *(self._warm_up_shard(shard) for shard in self.shards)
+                )
+            except Exception as e:
+                self.reason = f"нет соединения с БД: {e}"
+                logger.warning(f"Воркер не готов: {self.reason}")
+                return
+            self.warm_up_ms = (time.perf_counter() - started) * 1000
+            metrics.set("db.pool.warm_up_ms", self.warm_up_ms)
+            logger.info(f"Пулы соединений прогреты за {self.warm_up_ms:.0f} мс")
+            self.ready = True
+            self.reason = None
+
+    async def retry(self):
+        """Повтор прогрева из проверки готовности
+
+        Пока прогрев идёт (в том числе из lifespan), проба его не ждёт и
+        второй не запускает; после неудачи следующая попытка — не раньше
+        чем через retry_seconds.
+        """
+        if not self.started or self.ready or self._lock.locked():
+            return
+        if time.monotonic() - self._attempted_at < self.retry_seconds:
+            return
+        await self.warm_up()
+
+    async def _warm_up_shard(self, shard: Shard):
+        count = min(self.connections, shard.engine.pool.size())
+        if count <= 0:
+            async with shard.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            return
+        # Соединения удерживаются до конца прогрева, иначе быстрые запросы
+        # вернут соединение в пул и следующие возьмут его же, а не новое
+        async with AsyncExitStack() as stack:
+            opened = await asyncio.gather(
+                *(
+                    stack.enter_async_context(shard.engine.connect())
+                    for _ in range(count)
+                ),
+                return_exceptions=True,
+            )
+            for result in opened:
+                if isinstance(result, BaseException):
+                    raise result
+            # Прогрев репозиториев читает, например, всё дерево видов
+            # деятельности, поэтому выполняется один раз, а не на каждом
+            # соединении; остальные только проверяются
+            await asyncio.gather(
+                self._warm_up_repositories(opened[0]),
+                *(conn.execute(text("SELECT 1")) for conn in opened[1:]),
+            )
+
+    async def _warm_up_repositories(self, conn: AsyncConnection):
+        async with AsyncSession(bind=conn) as session:
+            if not self.repositories:
+                await session.execute(text("SELECT 1"))
+            for repository in self.repositories:
+                await repository.warm_up(session)
+
+    def pools(self) -> dict[str, dict]:
+        return {shard.name: pool_state(shard) for shard in self.shards}
+
+    def shutdown(self):
+        self.started = False
+        self.ready = False
+        self.reason = "остановка"
+
+
+readiness = Readiness()
@@ -1,11 +1,105 @@
-from loguru import logger
+"""Настройка логгера
+
+LOG_FORMAT=json (по умолчанию) — записи в JSON по одной на строку, которые
+пишет в stderr отдельный поток: в event loop остаётся только создание
+записи и постановка в очередь. Если поток не успевает (например, при
+лавине ошибок во время недоступности БД), новые записи отбрасываются и
+считаются в метрике log.dropped, а запросы не ждут вывода.
+LOG_FORMAT=text — прежний цветной синхронный вывод для локальной работы.
+
+К каждой записи, сделанной при обработке запроса, добавляется request_id
+(см. src.common.request_log).
+"""
+import atexit
+import json
+import os
+import queue
 import sys
+import threading
+import traceback
+from contextvars import ContextVar
+
+from loguru import logger
+
+from src.common.config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE
+from src.common.metrics import metrics
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+def _serialize(record: dict) -> str:
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        **record["extra"],
+    }
+    exception = record["exception"]
+    if exception is not None:
+        entry["exception"] = "".join(
+            traceback.format_exception(
+                exception.type, exception.value, exception.traceback
+            )
+        )
+    return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class QueueSink:
+    """Sink loguru: запись в очередь, сериализация и вывод в отдельном потоке"""
+
+    def __init__(self, stream=sys.stderr, maxsize: int = LOG_QUEUE_SIZE):
+        self.stream = stream
+        self.maxsize = maxsize
+        self._start()
+        # Потоки не переживают fork (gunicorn с preload_app): воркер
+        # запускает свой поток вывода
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._queue: queue.Queue[dict | None] = queue.Queue(self.maxsize)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def __call__(self, message):
+        try:
+            self._queue.put_nowait(message.record)
+        except queue.Full:
+            metrics.inc("log.dropped")
+
+    def _run(self):
+        while (record := self._queue.get()) is not None:
+            try:
+                self.stream.write(_serialize(record) + "\n")
+                if self._queue.empty():
+                    self.stream.flush()
+            except Exception:
+                metrics.inc("log.dropped")
+
+    def close(self, timeout: float = 5):
+        """Дописывает накопленные записи перед завершением процесса"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+def _add_request_id(record: dict):
+    record["extra"].setdefault("request_id", request_id.get())
+
 
-# Настройка логгера
 logger.remove()  # Удаляем стандартный обработчик
-logger.add(
-    sys.stderr,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-    level="INFO",
-    colorize=True,
-)
+logger.configure(patcher=_add_request_id)
+if LOG_FORMAT == "text":
+    logger.add(
+        sys.stderr,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+        level=LOG_LEVEL,
+        colorize=True,
+    )
+else:
+    log_sink = QueueSink()
+    # Трассировка исключения форматируется в потоке вывода, а не loguru
+    # в вызывающем коде
+    logger.add(log_sink, format="{message}", level=LOG_LEVEL, backtrace=False, diagnose=False)
+    atexit.register(log_sink.close)
@@ -0,0 +1,367 @@
+"""Обслуживание таблиц справочника: статистика, ANALYZE и советы по VACUUM
+
+    python -m src.common.maintenance report    # таблицы, индексы, медленные запросы
+    python -m src.common.maintenance analyze   # ANALYZE таблиц с устаревшей статистикой
+    python -m src.common.maintenance vacuum    # VACUUM (ANALYZE) таблиц с мусором
+
+Отчёт читает pg_stat_user_tables, pg_stat_user_indexes и, если расширение
+установлено, pg_stat_statements. Метод репозитория, выполнивший запрос
+(DB_QUERY_CALL_SITES), запоминает сам воркер: комментарий в тексте не
+помог бы, pg_stat_statements не учитывает комментарии в queryid и хранит
+текст первого выполнения. Воркеры с фоновой задачей сохраняют места вызова
+в query_call_sites по отпечатку текста — тексту без комментариев, значений и
+длины списков IN, который одинаков у запроса приложения и у нормализованного
+текста pg_stat_statements; по нему отчёт сводит медленные запросы к коду.
+
+Фоновая задача (MAINTENANCE_TASK) раз в MAINTENANCE_INTERVAL секунд делает
+ANALYZE таблиц, в которых с прошлого анализа изменилось больше
+MAINTENANCE_ANALYZE_FRACTION строк: автоанализ после пакетной загрузки
+срабатывает с задержкой, а секционированную organization_search не
+анализирует вовсе. Проход выполняет один воркер, остальные пропускают его
+по advisory-блокировке. VACUUM только советуется: его выполняет autovacuum
+или команда vacuum.
+"""
+import argparse
+import asyncio
+import hashlib
+import re
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from src.common.config import (
+    MAINTENANCE_ANALYZE_FRACTION,
+    MAINTENANCE_ANALYZE_MIN_ROWS,
+    MAINTENANCE_INTERVAL,
+    MAINTENANCE_VACUUM_DEAD_FRACTION,
+)
+from src.common.database import engine, take_call_sites
+from src.common.logger import logger
+from src.common.metrics import metrics
+from src.common.models import QueryCallSite
+
+MAINTAINED_TABLES = (
+    "organizations",
+    "organization_activities",
+    "organization_phones",
+    "buildings",
+    "activities",
+    "organization_search",
+)
+# Ключ advisory-блокировки прохода фоновой задачи
+LOCK_KEY = 40_010
+
+# Секции учитываются в строке родительской таблицы
+TABLE_STATS = text("""
+    SELECT
+        coalesce(parent.relname, s.relname) AS name,
+        sum(s.n_live_tup)::bigint AS live,
+        sum(s.n_dead_tup)::bigint AS dead,
+        sum(s.n_mod_since_analyze)::bigint AS modified,
+        max(greatest(s.last_analyze, s.last_autoanalyze)) AS analyzed_at,
+        max(greatest(s.last_vacuum, s.last_autovacuum)) AS vacuumed_at,
+        sum(pg_total_relation_size(s.relid))::bigint AS size
+    FROM pg_stat_user_tables s
+    LEFT JOIN pg_inherits i ON i.inhrelid = s.relid
+    LEFT JOIN pg_class parent ON parent.oid = i.inhparent
+    WHERE coalesce(parent.relname, s.relname) = ANY(:tables)
+    GROUP BY 1
+    ORDER BY 1
+""")
+
+UNUSED_INDEXES = text("""
+    SELECT s.relname AS table_name, s.indexrelname AS name,
+           pg_relation_size(s.indexrelid) AS size
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary
+    ORDER BY size DESC
+""")
+
+STATEMENTS_INSTALLED = text(
+    "SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'"
+)
+
+SLOW_STATEMENTS = text("""
+    SELECT query, calls, total_exec_time, mean_exec_time, rows
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+    ORDER BY total_exec_time DESC
+    LIMIT :limit
+""")
+
+_call_sites = QueryCallSite.__table__
+
+_insert_call_sites = insert(_call_sites)
+SAVE_CALL_SITES = _insert_call_sites.on_conflict_do_update(
+    index_elements=[_call_sites.c.fingerprint, _call_sites.c.call_site],
+    set_={"query": _insert_call_sites.excluded.query, "seen_at": func.now()},
+)
+FIND_CALL_SITES = (
+    select(
+        _call_sites.c.fingerprint,
+        func.string_agg(_call_sites.c.call_site, ", ").label("call_sites"),
+    )
+    .where(_call_sites.c.fingerprint.in_(bindparam("fingerprints", expanding=True)))
+    .group_by(_call_sites.c.fingerprint)
+)
+
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*", re.DOTALL)
+# Константы, которые pg_stat_statements заменяет на $n, и сами параметры
+_CONSTANT = re.compile(
+    r"'(?:[^']|'')*'|\$\d+|\b\d+(?:\.\d+)?\b|\b(?:true|false)\b", re.IGNORECASE
+)
+_IN_LIST = re.compile(r"\(\?(?:, \?)*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Отпечаток текста запроса, общий для приложения и pg_stat_statements"""
+    statement = _SPACES.sub(" ", _COMMENT.sub(" ", statement))
+    statement = _IN_LIST.sub("(...)", _CONSTANT.sub("?", statement))
+    return hashlib.md5(statement.strip().encode()).hexdigest()
+
+
+@dataclass
+class TableStats:
+    name: str
+    live: int
+    dead: int
+    modified: int
+    analyzed_at: datetime | None
+    vacuumed_at: datetime | None
+    size: int
+
+    @property
+    def dead_fraction(self) -> float:
+        return self.dead / max(self.live + self.dead, 1)
+
+
+@dataclass
+class QueryStats:
+    call_site: str
+    calls: int
+    total_ms: float
+    mean_ms: float
+    rows: int
+    query: str
+
+
+class MaintenanceAdvisor:
+    def __init__(
+        self,
+        interval: float = MAINTENANCE_INTERVAL,
+        analyze_fraction: float = MAINTENANCE_ANALYZE_FRACTION,
+        analyze_min_rows: int = MAINTENANCE_ANALYZE_MIN_ROWS,
+        vacuum_dead_fraction: float = MAINTENANCE_VACUUM_DEAD_FRACTION,
+    ):
+        self.interval = interval
+        self.analyze_fraction = analyze_fraction
+        self.analyze_min_rows = analyze_min_rows
+        self.vacuum_dead_fraction = vacuum_dead_fraction
+        self._worker: asyncio.Task | None = None
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Фоновое обслуживание таблиц запущено")
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+        logger.info("Фоновое обслуживание таблиц остановлено")
+
+    async def table_stats(self, conn) -> list[TableStats]:
+        rows = await conn.execute(TABLE_STATS, {"tables": list(MAINTAINED_TABLES)})
+        return [TableStats(**row._mapping) for row in rows]
+
+    async def unused_indexes(self, conn) -> list:
+        return (await conn.execute(UNUSED_INDEXES)).all()
+
+    async def slow_queries(self, conn, limit: int = 20) -> list[QueryStats] | None:
+        """Самые затратные запросы по суммарному времени; None — нет pg_stat_statements"""
+        if (await conn.execute(STATEMENTS_INSTALLED)).scalar() is None:
+            return None
+        rows = [
+            (fingerprint(row.query), row)
+            for row in await conn.execute(SLOW_STATEMENTS, {"limit": limit})
+        ]
+        sites = dict(
+            (
+                await conn.execute(
+                    FIND_CALL_SITES, {"fingerprints": [key for key, _ in rows]}
+                )
+            ).all()
+        )
+        return [
+            QueryStats(
+                call_site=sites.get(key, "-"),
+                calls=row.calls,
+                total_ms=row.total_exec_time,
+                mean_ms=row.mean_exec_time,
+                rows=row.rows,
+                query=row.query,
+            )
+            for key, row in rows
+        ]
+
+    async def save_call_sites(self, conn) -> int:
+        """Сохраняет места вызова запросов, накопленные воркером"""
+        rows = {}
+        for statement, sites in take_call_sites().items():
+            key = fingerprint(statement)
+            for site in sites:
+                rows[key, site] = {
+                    "fingerprint": key,
+                    "call_site": site[:255],
+                    "query": statement[:1000],
+                }
+        if not rows:
+            return 0
+        # Одинаковый порядок строк у всех воркеров исключает взаимоблокировки
+        await conn.execute(SAVE_CALL_SITES, [rows[key] for key in sorted(rows)])
+        return len(rows)
+
+    def needs_analyze(self, stats: TableStats) -> bool:
+        return stats.modified >= max(
+            self.analyze_min_rows, self.analyze_fraction * stats.live
+        )
+
+    def needs_vacuum(self, stats: TableStats) -> bool:
+        return (
+            stats.dead >= self.analyze_min_rows
+            and stats.dead_fraction >= self.vacuum_dead_fraction
+        )
+
+    async def analyze_stale(self) -> list[str]:
+        """ANALYZE таблиц с устаревшей статистикой, если проход не занят другим"""
+        async with engine.begin() as conn:
+            locked = (
+                await conn.execute(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": LOCK_KEY}
+                )
+            ).scalar_one()
+            if not locked:
+                return []
+            analyzed = []
+            for stats in await self.table_stats(conn):
+                metrics.set(f"db.tables.{stats.name}.dead_fraction", stats.dead_fraction)
+                metrics.set(f"db.tables.{stats.name}.modified", stats.modified)
+                if self.needs_vacuum(stats):
+                    logger.warning(
+                        f"{stats.name}: мёртвых строк {stats.dead_fraction:.0%}, "
+                        f"нужен VACUUM"
+                    )
+                if self.needs_analyze(stats):
+                    await conn.execute(text(f"ANALYZE {stats.name}"))
+                    analyzed.append(stats.name)
+        if analyzed:
+            metrics.inc("db.tables.analyze", len(analyzed))
+            logger.info(f"ANALYZE после изменений: {', '.join(analyzed)}")
+        return analyzed
+
+    async def vacuum(self) -> list[str]:
+        """VACUUM (ANALYZE) таблиц с долей мёртвых строк выше порога"""
+        async with engine.connect() as conn:
+            # VACUUM не выполняется внутри транзакции
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            tables = [
+                stats.name
+                for stats in await self.table_stats(conn)
+                if self.needs_vacuum(stats)
+            ]
+            for table in tables:
+                await conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+        return tables
+
+    async def _run(self):
+        while True:
+            try:
+                async with engine.begin() as conn:
+                    await self.save_call_sites(conn)
+                await self.analyze_stale()
+            except Exception as e:
+                logger.error(f"Ошибка обслуживания таблиц: {e}")
+            await asyncio.sleep(self.interval)
+
+
+maintenance_advisor = MaintenanceAdvisor()
+
+
+def _size(value: int) -> str:
+    for unit in ("Б", "КБ", "МБ", "ГБ"):
+        if value < 1024:
+            return f"{value:.0f} {unit}"
+        value /= 1024
+    return f"{value:.0f} ТБ"
+
+
+async def report(advisor: MaintenanceAdvisor, limit: int):
+    async with engine.connect() as conn:
+        print("Таблицы:")
+        for stats in await advisor.table_stats(conn):
+            advice = [
+                action
+                for action, needed in (
+                    ("ANALYZE", advisor.needs_analyze(stats)),
+                    ("VACUUM", advisor.needs_vacuum(stats)),
+                )
+                if needed
+            ]
+            analyzed_at = (
+                f"{stats.analyzed_at:%Y-%m-%d %H:%M}" if stats.analyzed_at else "-"
+            )
+            print(
+                f"  {stats.name:<24} строк {stats.live:>10} "
+                f"мёртвых {stats.dead_fraction:>5.0%} "
+                f"изменено {stats.modified:>8} {_size(stats.size):>8} "
+                f"анализ {analyzed_at:<16}  {' '.join(advice)}"
+            )
+
+        print("Неиспользуемые индексы (idx_scan = 0 с последнего сброса статистики):")
+        for index in await advisor.unused_indexes(conn):
+            print(f"  {index.table_name}.{index.name} {_size(index.size)}")
+
+        queries = await advisor.slow_queries(conn, limit)
+        if queries is None:
+            print(
+                "pg_stat_statements не установлено: нужны "
+                "shared_preload_libraries=pg_stat_statements и "
+                "CREATE EXTENSION pg_stat_statements"
+            )
+            return
+        print("Самые затратные запросы:")
+        for query in queries:
+            print(
+                f"  {query.total_ms:>10.0f} мс  {query.calls:>8} вызовов  "
+                f"{query.mean_ms:>8.2f} мс/вызов  {query.call_site}"
+            )
+            print(f"      {query.query[:160]}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Обслуживание таблиц справочника")
+    parser.add_argument("command", choices=("report", "analyze", "vacuum"))
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    try:
+        if args.command == "report":
+            await report(maintenance_advisor, args.limit)
+        elif args.command == "analyze":
+            print(f"ANALYZE: {', '.join(await maintenance_advisor.analyze_stale()) or '-'}")
+        else:
+            print(f"VACUUM: {', '.join(await maintenance_advisor.vacuum()) or '-'}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,27 @@
+from collections import defaultdict
+
+
+class Metrics:
+    """Счётчики процесса для эндпоинта /api/metrics
+
+    Значения копятся в памяти воркера; при нескольких воркерах каждый
+    отдаёт свои счётчики.
+    """
+
+    def __init__(self):
+        self._counters: defaultdict[str, float] = defaultdict(float)
+
+    def inc(self, name: str, value: float = 1):
+        self._counters[name] += value
+
+    def set(self, name: str, value: float):
+        self._counters[name] = value
+
+    def get(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict[str, float]:
+        return dict(sorted(self._counters.items()))
+
+
+metrics = Metrics()
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+from src.common.database import Base
+
+
+class QueryCallSite(Base):
+    """Метод приложения, выполнявший запрос, по отпечатку его текста
+
+    Отпечаток одинаков для текста, отправленного приложением, и
+    нормализованного текста pg_stat_statements (см. src.common.maintenance).
+    """
+
+    __tablename__ = "query_call_sites"
+
+    fingerprint: Mapped[str] = mapped_column(String(32), primary_key=True)
+    call_site: Mapped[str] = mapped_column(String(255), primary_key=True)
+    query: Mapped[str] = mapped_column(Text, nullable=False)
+    seen_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
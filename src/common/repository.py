@@ -4,7 +4,7 @@ from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped
 
-from src.common.exceptions import ItemNotExist
+from src.common.exceptions import ItemNotExist, VersionConflictException
 
 
 class HasId(Protocol):
@@ -34,13 +34,15 @@ class AbstractRepository(ABC, Generic[T]):
 
     @abstractmethod
     async def update_one(
-        self, session: AsyncSession, id: int, data: dict
+        self, session: AsyncSession, id: int, data: dict, version: int | None = None
     ) -> Optional[T]:
         """Обновление одной записи"""
         raise NotImplementedError
 
     @abstractmethod
-    async def delete_one(self, session: AsyncSession, id: int) -> None:
+    async def delete_one(
+        self, session: AsyncSession, id: int, version: int | None = None
+    ) -> None:
         """Удаление одной записи"""
         raise NotImplementedError
 
@@ -60,8 +62,17 @@ class SQLAlchemyRepository(AbstractRepository[T]):
     async def find_one(self, session: AsyncSession, id: int):
         """Поиск одной записи по id"""
         stmt = select(self.model).where(self.model.id == id)
-        res = await session.execute(stmt)
-        return res.scalar_one()
+        return await self._find_existing(session, stmt, {})
+
+    async def _find_existing(self, session: AsyncSession, stmt, params: dict):
+        """Единственная запись запроса; ItemNotExist, если её нет
+
+        Сервисы переводят ItemNotExist в 404 своей сущности
+        """
+        item = (await session.execute(stmt, params)).scalar_one_or_none()
+        if item is None:
+            raise ItemNotExist
+        return item
 
     async def find_all(self, session: AsyncSession):
         """Получение всех записей"""
@@ -69,21 +80,31 @@ class SQLAlchemyRepository(AbstractRepository[T]):
         res = await session.execute(stmt)
         return res.scalars().all()
 
-    async def update_one(self, session: AsyncSession, id: int, data: dict):
-        """Обновление одной записи"""
-        stmt = (
-            update(self.model)
-            .where(self.model.id == id)
-            .values(**data)
-            .returning(self.model)
-        )
+    async def update_one(
+        self, session: AsyncSession, id: int, data: dict, version: int | None = None
+    ):
+        """Обновление одной записи
+
+        Обновляются только переданные поля, версия записи увеличивается.
+        Если передана ожидаемая версия, запись обновляется только при её
+        совпадении (оптимистическая блокировка). Возвращает None, если
+        запись не найдена или версия уже изменилась.
+        """
+        stmt = update(self.model).where(self.model.id == id)
+        if version is not None:
+            stmt = stmt.where(self.model.version == version)
+        stmt = stmt.values(**data, version=self.model.version + 1).returning(self.model)
         res = await session.execute(stmt)
         await session.commit()
         return res.scalar_one_or_none()
 
-    async def delete_one(self, session: AsyncSession, id: int):
+    async def delete_one(
+        self, session: AsyncSession, id: int, version: int | None = None
+    ):
         """Удаление одной записи"""
         stmt = delete(self.model).where(self.model.id == id)
+        if version is not None:
+            stmt = stmt.where(self.model.version == version)
         res = await session.execute(stmt)
         await session.commit()
         if res.rowcount == 0:
@@ -91,7 +112,11 @@ class SQLAlchemyRepository(AbstractRepository[T]):
 
     async def update_all(self, session: AsyncSession, data: dict):
         """Обновление всех записей"""
-        stmt = update(self.model).values(**data).returning(self.model)
+        stmt = (
+            update(self.model)
+            .values(**data, version=self.model.version + 1)
+            .returning(self.model)
+        )
         res = await session.execute(stmt)
         await session.commit()
         return res.scalars().all()
@@ -101,3 +126,28 @@ class SQLAlchemyRepository(AbstractRepository[T]):
         stmt = select(self.model).where(self.model.id == item_id)
         res = await session.execute(stmt)
         return res.scalar_one_or_none()
+
+    async def raise_missing_or_conflict(
+        self,
+        session: AsyncSession,
+        item_id: int,
+        version: int | None,
+        not_found: type[Exception],
+    ):
+        """Различает отсутствие записи и конфликт версий после неудачной записи
+
+        Без ожидаемой версии запись не проходит, только если строки нет.
+        not_found — исключение 404 сущности, принимает id записи
+        """
+        if version is None or await self.find_one_or_none(session, item_id) is None:
+            raise not_found(item_id)
+        raise VersionConflictException(version)
+
+    async def warm_up(self, session: AsyncSession):
+        """Выполняет горячие запросы репозитория при запуске воркера
+
+        Вызывается один раз на шард (см. src.common.health): запросы
+        компилируются и попадают в кэш компиляции воркера, а соединение
+        подготавливает их. Параметры подобраны так, что запросы ничего или
+        почти ничего не возвращают.
+        """
@@ -0,0 +1,101 @@
+"""Идентификатор запроса и журнал запросов
+
+Идентификатор берётся из заголовка X-Request-ID (или создаётся), попадает
+во все записи лога, сделанные при обработке запроса, и возвращается в
+ответе. Запись о запросе пишется всегда для ошибок (статус >= 400) и
+запросов дольше LOG_SLOW_REQUEST_MS, а успешные попадают в журнал с долей
+LOG_REQUEST_SAMPLE_RATES[шаблон пути] или LOG_REQUEST_SAMPLE_RATE.
+"""
+import asyncio
+import random
+import re
+import time
+import uuid
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.common.config import (
+    LOG_REQUEST_SAMPLE_RATE,
+    LOG_REQUEST_SAMPLE_RATES,
+    LOG_SLOW_REQUEST_MS,
+)
+from src.common.logger import logger, request_id
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Чужой идентификатор принимается, только если он не испортит лог
+VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+# Статус запроса, обработка которого отменена после отключения клиента
+CLIENT_CLOSED_REQUEST = 499
+
+
+class RequestLogMiddleware:
+    def __init__(
+        self,
+        app,
+        sample_rate: float = LOG_REQUEST_SAMPLE_RATE,
+        sample_rates: dict[str, float] = LOG_REQUEST_SAMPLE_RATES,
+        slow_ms: float = LOG_SLOW_REQUEST_MS,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.sample_rates = sample_rates
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        rid = (
+            incoming
+            if incoming and VALID_REQUEST_ID.fullmatch(incoming)
+            else uuid.uuid4().hex
+        )
+        token = request_id.set(rid)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(raw=message.setdefault("headers", []))[
+                    REQUEST_ID_HEADER
+                ] = rid
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_with_id)
+        except asyncio.CancelledError:
+            status = CLIENT_CLOSED_REQUEST
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._log(scope, status, (time.perf_counter() - started) * 1000, error)
+            request_id.reset(token)
+
+    def _log(
+        self, scope, status: int, duration_ms: float, error: Exception | None = None
+    ):
+        # Шаблон пути известен после маршрутизации, до неё — сам путь
+        route = getattr(scope.get("route"), "path", scope["path"])
+        slow = duration_ms >= self.slow_ms
+        if status < 400 and not slow:
+            rate = self.sample_rates.get(route, self.sample_rate)
+            if rate <= 0 or random.random() >= rate:
+                return
+        record = logger.opt(exception=error).bind(
+            method=scope["method"],
+            route=route,
+            status=status,
+            duration_ms=round(duration_ms, 2),
+        )
+        if status >= 500:
+            record.error("request")
+        elif slow:
+            record.warning("slow request")
+        else:
+            record.info("request")
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from src.common.health import readiness
+from src.common.metrics import metrics
+from src.common.verify_key import verify_api_key
+
+system_router = APIRouter(tags=["system"])
+
+
+@system_router.get(
+    "/metrics",
+    response_model=dict[str, float],
+    description="Счётчики процесса: объединение запросов, кэши и т.п.",
+    dependencies=[Depends(verify_api_key)],
+)
+async def get_metrics():
+    return metrics.snapshot()
+
+
+@system_router.get(
+    "/health/live",
+    description="Живость процесса: event loop отвечает; БД не проверяется",
+)
+async def get_liveness():
+    return {"status": "alive"}
+
+
+@system_router.get(
+    "/health/ready",
+    description="Готовность воркера: запуск завершён и пулы соединений с БД прогреты",
+)
+async def get_readiness():
+    await readiness.retry()
+    content = {"status": "ready", "pools": readiness.pools()}
+    if not readiness.ready:
+        content.update(status="not ready", reason=readiness.reason)
+        return JSONResponse(status_code=503, content=content)
+    content["warm_up_ms"] = round(readiness.warm_up_ms, 1)
+    return content
@@ -0,0 +1,75 @@
+"""Обслуживание шардов справочника (см. ShardRouter)
+
+    python -m src.common.shards migrate   # alembic upgrade head на каждом шарде
+    python -m src.common.shards prepare   # диапазоны id зданий и организаций
+
+prepare ограничивает последовательности id шарда k диапазоном
+[k * DB_SHARD_ID_SPAN, (k + 1) * DB_SHARD_ID_SPAN), чтобы по id можно было
+найти шард без обращения к базам. Запускается после migrate и повторно
+при добавлении шарда; уже выданные id в диапазоне не затрагиваются.
+"""
+import argparse
+import asyncio
+import subprocess
+
+from sqlalchemy import text
+
+from src.common.database import Shard, shard_router
+from src.common.logger import logger
+
+SHARDED_TABLES = ("buildings", "organizations")
+
+
+def migrate(shard: Shard):
+    command = ["alembic"]
+    if shard.index != 0:
+        url = shard.engine.url.render_as_string(hide_password=False)
+        command += ["-x", f"url={url}"]
+    subprocess.run(command + ["upgrade", "head"], check=True)
+    logger.info(f"Шард {shard.name}: миграции применены")
+
+
+async def prepare(shard: Shard):
+    low = max(shard.index * shard_router.id_span, 1)
+    high = (shard.index + 1) * shard_router.id_span - 1
+    async with shard.engine.begin() as conn:
+        for table in SHARDED_TABLES:
+            sequence, current = (
+                await conn.execute(
+                    text(
+                        f"SELECT pg_get_serial_sequence('{table}', 'id'), "
+                        f"coalesce(max(id), 0) FROM {table}"
+                    )
+                )
+            ).one()
+            if current > high:
+                raise RuntimeError(
+                    f"Шард {shard.name}: id {current} в {table} за пределами "
+                    f"диапазона [{low}, {high}]"
+                )
+            start = max(current + 1, low)
+            await conn.execute(
+                text(
+                    f"ALTER SEQUENCE {sequence} "
+                    f"MINVALUE {low} MAXVALUE {high} RESTART WITH {start}"
+                )
+            )
+            logger.info(f"Шард {shard.name}: {table}.id с {start} до {high}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Обслуживание шардов справочника")
+    parser.add_argument("command", choices=("migrate", "prepare"))
+    args = parser.parse_args()
+    try:
+        for shard in shard_router.shards:
+            if args.command == "migrate":
+                migrate(shard)
+            else:
+                await prepare(shard)
+    finally:
+        await shard_router.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from src.common.config import SINGLE_FLIGHT_ENABLED
+from src.common.metrics import metrics
+
+R = TypeVar("R")
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных запросов (single-flight)
+
+    Первый вызов с данным ключом выполняет запрос к БД, остальные вызовы с
+    тем же ключом, пришедшие до его завершения, ждут тот же результат.
+    Если первый запрос отменён (клиент отключился), ожидающие выполняют
+    запрос сами. Счётчики: singleflight.<name>.leader и .shared.
+
+    Результат ведущего вызова получают запросы с другими сессиями, поэтому
+    fn должна возвращать данные, не привязанные к сессии (схемы ответа или
+    строки), а не объекты ORM.
+    """
+
+    def __init__(self, name: str, enabled: bool = SINGLE_FLIGHT_ENABLED):
+        self.name = name
+        self.enabled = enabled
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[R]]) -> R:
+        if not self.enabled:
+            return await fn()
+
+        future = self._calls.get(key)
+        if future is not None:
+            metrics.inc(f"singleflight.{self.name}.shared")
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                return await fn()
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        metrics.inc(f"singleflight.{self.name}.leader")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+            # Помечаем исключение полученным, если ожидающих не было
+            if future.done() and not future.cancelled():
+                future.exception()
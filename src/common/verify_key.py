@@ -1,8 +1,10 @@
 from fastapi import Header, HTTPException
-from src.common.config import API_KEY
+from src.common.api_keys import ApiKey, api_key_store, rate_limiter
 
 
-def verify_api_key(api_key: str = Header(...)):
-    if api_key != API_KEY:
+async def verify_api_key(api_key: str = Header(...)) -> ApiKey:
+    key = api_key_store.authenticate(api_key)
+    if key is None:
         raise HTTPException(status_code=401, detail="Invalid API key")
-    return api_key
+    await rate_limiter.acquire(key)
+    return key
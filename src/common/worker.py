@@ -0,0 +1,17 @@
+from uvicorn.workers import UvicornWorker
+
+from src.common.config import WEB_HTTP, WEB_LIMIT_CONCURRENCY, WEB_LOOP
+
+
+class TunedUvicornWorker(UvicornWorker):
+    """Uvicorn-воркер для gunicorn с выбором event loop и HTTP-парсера
+
+    Стандартный UvicornWorker не даёт задать loop, http и limit_concurrency
+    из конфигурации gunicorn, поэтому они берутся из переменных окружения.
+    """
+
+    CONFIG_KWARGS = {
+        "loop": WEB_LOOP,
+        "http": WEB_HTTP,
+        "limit_concurrency": WEB_LIMIT_CONCURRENCY,
+    }
@@ -0,0 +1,10 @@
+from src.dedup.repository import DuplicateRepository
+from src.dedup.service import DuplicateService
+from src.organization.repository import OrganizationRepository
+
+
+def duplicate_service() -> DuplicateService:
+    return DuplicateService(
+        repository=DuplicateRepository(),
+        organization_repository=OrganizationRepository(),
+    )
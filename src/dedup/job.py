@@ -0,0 +1,137 @@
+"""Офлайн-поиск дубликатов организаций
+
+    python -m src.dedup.job --shards 8
+
+Кандидаты ищутся только внутри блоков, а не по всем парам:
+
+- building — организации в одном здании, порог DEDUP_NAME_THRESHOLD;
+- geo — организации в разных зданиях одной ячейки сетки со стороной
+  DEDUP_CELL_DEGREES градусов (аналог ячейки geohash), порог
+  DEDUP_GEO_NAME_THRESHOLD. Сетка строится дважды, второй раз со сдвигом на
+  половину ячейки, чтобы соседи на границе ячеек попали в общий блок.
+
+Похожие названия отбирает оператор % из pg_trgm по GIN-индексу названий с
+порогом прохода в pg_trgm.similarity_threshold, а similarity() считается
+только для отобранных пар, а не для каждой пары блока. Блоки делятся на
+шарды по остатку от ключа блока, шарды выполняются параллельно в отдельных
+соединениях. Найденные пары пишутся в organization_duplicate_candidates;
+уже известные пары пропускаются, так что повторный запуск безопасен.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from src.common.config import (
+    DEDUP_CELL_DEGREES,
+    DEDUP_GEO_NAME_THRESHOLD,
+    DEDUP_NAME_THRESHOLD,
+    DEDUP_SHARDS,
+)
+from src.common.database import engine
+from src.common.logger import logger
+
+BLOCKS_TABLE = "organization_dedup_blocks"
+
+BUILD_BLOCKS = f"""
+    CREATE UNLOGGED TABLE {BLOCKS_TABLE} AS
+    SELECT
+        o.id,
+        o.name,
+        o.building_id,
+        b.latitude,
+        b.longitude,
+        floor(b.latitude / :cell)::bigint * 1000003
+            + floor(b.longitude / :cell)::bigint AS cell,
+        floor(b.latitude / :cell + 0.5)::bigint * 1000003
+            + floor(b.longitude / :cell + 0.5)::bigint AS shifted_cell
+    FROM organizations o
+    JOIN buildings b ON b.id = o.building_id
+"""
+
+# Колонка ключа блока -> дополнительное условие пары, имя порога и причина
+PASSES = {
+    "building_id": ("TRUE", "name_threshold", "building"),
+    "cell": ("a.building_id <> b.building_id", "geo_threshold", "geo"),
+    "shifted_cell": ("a.building_id <> b.building_id", "geo_threshold", "geo"),
+}
+
+FIND_PAIRS = """
+    INSERT INTO organization_duplicate_candidates
+        (left_id, right_id, score, reason, status)
+    SELECT a.id, b.id, similarity(a.name, b.name), :reason, 'pending'
+    FROM {blocks} a
+    JOIN {blocks} b ON b.name % a.name AND b.{key} = a.{key} AND b.id > a.id
+    WHERE mod(abs(a.{key}), :shards) = :shard
+      AND {condition}
+    ON CONFLICT (left_id, right_id) DO NOTHING
+"""
+# Порог оператора % на время транзакции шарда
+SET_THRESHOLD = "SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"
+
+
+async def build_blocks(cell: float):
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {BLOCKS_TABLE}"))
+        await conn.execute(text(BUILD_BLOCKS), {"cell": cell})
+        for key in PASSES:
+            await conn.execute(
+                text(f"CREATE INDEX ON {BLOCKS_TABLE} ({key}, id)")
+            )
+        await conn.execute(
+            text(f"CREATE INDEX ON {BLOCKS_TABLE} USING gin (name gin_trgm_ops)")
+        )
+        await conn.execute(text(f"ANALYZE {BLOCKS_TABLE}"))
+
+
+async def run_shard(key: str, shard: int, params: dict) -> int:
+    condition, threshold, reason = PASSES[key]
+    stmt = text(FIND_PAIRS.format(blocks=BLOCKS_TABLE, key=key, condition=condition))
+    async with engine.begin() as conn:
+        await conn.execute(text(SET_THRESHOLD), {"threshold": str(params[threshold])})
+        res = await conn.execute(stmt, {**params, "reason": reason, "shard": shard})
+        return res.rowcount
+
+
+async def run(shards: int, name_threshold: float, geo_threshold: float, cell: float):
+    started = time.perf_counter()
+    await build_blocks(cell)
+    logger.info(f"Блоки построены за {time.perf_counter() - started:.1f} с")
+
+    params = {
+        "shards": shards,
+        "name_threshold": name_threshold,
+        "geo_threshold": geo_threshold,
+    }
+    try:
+        for key in PASSES:
+            pass_started = time.perf_counter()
+            found = await asyncio.gather(
+                *(run_shard(key, shard, params) for shard in range(shards))
+            )
+            logger.info(
+                f"Проход {key}: новых пар {sum(found)} "
+                f"за {time.perf_counter() - pass_started:.1f} с"
+            )
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {BLOCKS_TABLE}"))
+    logger.info(f"Поиск дубликатов завершён за {time.perf_counter() - started:.1f} с")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Поиск дубликатов организаций")
+    parser.add_argument("--shards", type=int, default=DEDUP_SHARDS)
+    parser.add_argument("--threshold", type=float, default=DEDUP_NAME_THRESHOLD)
+    parser.add_argument("--geo-threshold", type=float, default=DEDUP_GEO_NAME_THRESHOLD)
+    parser.add_argument("--cell", type=float, default=DEDUP_CELL_DEGREES)
+    args = parser.parse_args()
+    try:
+        await run(args.shards, args.threshold, args.geo_threshold, args.cell)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
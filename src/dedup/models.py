@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    DateTime,
+    Float,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+from src.common.database import Base
+
+CANDIDATE_PENDING = "pending"
+CANDIDATE_MERGED = "merged"
+CANDIDATE_REJECTED = "rejected"
+CANDIDATE_OBSOLETE = "obsolete"
+
+
+class DuplicateCandidate(Base):
+    """Пара организаций, похожих на дубликаты, на ручную проверку
+
+    left_id всегда меньше right_id. Ссылки на организации без внешних
+    ключей: после слияния строка остаётся в истории со статусом merged.
+    """
+
+    __tablename__ = "organization_duplicate_candidates"
+    __table_args__ = (UniqueConstraint("left_id", "right_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    left_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    right_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+    reason: Mapped[str] = mapped_column(String(16), nullable=False)
+    status: Mapped[str] = mapped_column(
+        String(16), nullable=False, default=CANDIDATE_PENDING, index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
@@ -0,0 +1,128 @@
+from sqlalchemy import case, delete, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.activity.models import OrganizationActivity
+from src.common.repository import SQLAlchemyRepository
+from src.dedup.models import (
+    CANDIDATE_MERGED,
+    CANDIDATE_OBSOLETE,
+    CANDIDATE_PENDING,
+    DuplicateCandidate,
+)
+from src.organization.models import Organization, OrganizationPhone
+
+
+class DuplicateRepository(SQLAlchemyRepository[DuplicateCandidate]):
+    model = DuplicateCandidate
+
+    async def find_all(
+        self,
+        session: AsyncSession,
+        status: str = CANDIDATE_PENDING,
+        limit: int = 10,
+        offset: int = 0,
+    ):
+        stmt = (
+            select(self.model)
+            .where(self.model.status == status)
+            .order_by(self.model.score.desc(), self.model.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return (await session.execute(stmt)).scalars().all()
+
+    async def find_one_for_update(self, session: AsyncSession, id: int):
+        stmt = select(self.model).where(self.model.id == id).with_for_update()
+        return (await session.execute(stmt)).scalar_one_or_none()
+
+    async def lock_organizations(self, session: AsyncSession, ids: list[int]) -> set[int]:
+        """Блокирует организации пары до коммита, возвращает существующие id"""
+        stmt = select(Organization.id).where(Organization.id.in_(ids)).with_for_update()
+        return set((await session.execute(stmt)).scalars().all())
+
+    async def set_status(self, session: AsyncSession, id: int, status: str):
+        stmt = update(self.model).where(self.model.id == id).values(status=status)
+        await session.execute(stmt)
+        await session.commit()
+
+    async def merge(
+        self, session: AsyncSession, candidate_id: int, keep_id: int, drop_id: int
+    ):
+        """Слияние организации drop_id в keep_id одним оператором
+
+        Телефоны переносятся, кроме номеров, которые уже есть у keep_id;
+        связи с видами деятельности объединяются; drop_id удаляется.
+        Пара помечается слитой, остальные ожидающие пары с drop_id —
+        неактуальными. Коммит фиксирует и блокировку пары из
+        find_one_for_update, так что всё происходит в одной транзакции.
+        """
+        target_digits = select(OrganizationPhone.phone_digits).where(
+            OrganizationPhone.organization_id == keep_id
+        )
+        moved_phones = (
+            update(OrganizationPhone)
+            .where(
+                OrganizationPhone.organization_id == drop_id,
+                OrganizationPhone.phone_digits.not_in(target_digits),
+            )
+            .values(organization_id=keep_id)
+            .cte("moved_phones")
+        )
+        dropped_phones = (
+            delete(OrganizationPhone)
+            .where(
+                OrganizationPhone.organization_id == drop_id,
+                OrganizationPhone.phone_digits.in_(target_digits),
+            )
+            .cte("dropped_phones")
+        )
+        copied_links = (
+            pg_insert(OrganizationActivity)
+            .from_select(
+                ["organization_id", "activity_id"],
+                select(literal(keep_id), OrganizationActivity.activity_id).where(
+                    OrganizationActivity.organization_id == drop_id
+                ),
+            )
+            .on_conflict_do_nothing()
+            .cte("copied_links")
+        )
+        dropped_links = (
+            delete(OrganizationActivity)
+            .where(OrganizationActivity.organization_id == drop_id)
+            .cte("dropped_links")
+        )
+        removed = (
+            delete(Organization)
+            .where(Organization.id == drop_id)
+            .cte("removed_organization")
+        )
+        bumped = (
+            update(Organization)
+            .where(Organization.id == keep_id)
+            .values(version=Organization.version + 1)
+            .cte("bumped_organization")
+        )
+        resolved = (
+            update(self.model)
+            .where(
+                or_(
+                    self.model.id == candidate_id,
+                    (self.model.status == CANDIDATE_PENDING)
+                    & or_(self.model.left_id == drop_id, self.model.right_id == drop_id),
+                )
+            )
+            .values(
+                status=case(
+                    (self.model.id == candidate_id, CANDIDATE_MERGED),
+                    else_=CANDIDATE_OBSOLETE,
+                )
+            )
+            .returning(self.model.id)
+            .cte("resolved")
+        )
+        stmt = select(resolved.c.id).add_cte(
+            moved_phones, dropped_phones, copied_links, dropped_links, removed, bumped
+        )
+        await session.execute(stmt)
+        await session.commit()
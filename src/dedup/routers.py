@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.common.database import get_async_session
+from src.common.exceptions import (
+    DuplicateCandidateNotFoundException,
+    DuplicateCandidateResolvedException,
+    DuplicateOrganizationMissingException,
+    InvalidMergeTargetException,
+)
+from src.common.logger import logger
+from src.common.verify_key import verify_api_key
+from src.dedup.dependencies import duplicate_service
+from src.dedup.models import CANDIDATE_PENDING
+from src.dedup.schemas import DuplicateCandidateSchema, MergeRequestSchema
+from src.dedup.service import DuplicateService
+from src.organization.schemas import OrganizationResponseSchema
+
+duplicate_router = APIRouter(
+    prefix="/duplicates",
+    tags=["duplicates"],
+    dependencies=[Depends(verify_api_key)],
+)
+
+
+@duplicate_router.get(
+    "",
+    response_model=list[DuplicateCandidateSchema],
+    description="Получить пары организаций-кандидатов в дубликаты, по убыванию похожести",
+)
+async def get_duplicates(
+    status: str = Query(CANDIDATE_PENDING, description="Статус пары"),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    service: DuplicateService = Depends(duplicate_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.get_candidates(session, status, limit, offset)
+    except Exception as e:
+        logger.error(f"Ошибка при получении кандидатов в дубликаты: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при получении кандидатов в дубликаты",
+        )
+
+
+@duplicate_router.post(
+    "/{candidate_id}/merge",
+    response_model=OrganizationResponseSchema,
+    description="Слить пару организаций в одну транзакцию: телефоны и виды "
+    "деятельности переносятся в сохраняемую организацию (по умолчанию с меньшим ID)",
+)
+async def merge_duplicate(
+    candidate_id: int,
+    data: MergeRequestSchema,
+    service: DuplicateService = Depends(duplicate_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.merge_candidate(session, candidate_id, data.keep_id)
+    except (
+        DuplicateCandidateNotFoundException,
+        DuplicateCandidateResolvedException,
+        DuplicateOrganizationMissingException,
+        InvalidMergeTargetException,
+    ) as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при слиянии дубликатов {candidate_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при слиянии дубликатов",
+        )
+
+
+@duplicate_router.post(
+    "/{candidate_id}/reject",
+    response_model=DuplicateCandidateSchema,
+    description="Отметить пару как не являющуюся дубликатом",
+)
+async def reject_duplicate(
+    candidate_id: int,
+    service: DuplicateService = Depends(duplicate_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.reject_candidate(session, candidate_id)
+    except (
+        DuplicateCandidateNotFoundException,
+        DuplicateCandidateResolvedException,
+    ) as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при отклонении пары {candidate_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при отклонении пары",
+        )
@@ -0,0 +1,14 @@
+from src.common.schema import BaseSchema
+
+
+class DuplicateCandidateSchema(BaseSchema):
+    id: int
+    left_id: int
+    right_id: int
+    score: float
+    reason: str
+    status: str
+
+
+class MergeRequestSchema(BaseSchema):
+    keep_id: int | None = None
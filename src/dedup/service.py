@@ -0,0 +1,63 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.common.exceptions import (
+    DuplicateCandidateNotFoundException,
+    DuplicateCandidateResolvedException,
+    DuplicateOrganizationMissingException,
+    InvalidMergeTargetException,
+)
+from src.dedup.models import CANDIDATE_OBSOLETE, CANDIDATE_PENDING, CANDIDATE_REJECTED
+from src.dedup.repository import DuplicateRepository
+from src.organization.repository import OrganizationRepository
+
+
+class DuplicateService:
+    def __init__(
+        self,
+        repository: DuplicateRepository,
+        organization_repository: OrganizationRepository,
+    ):
+        self.repository: DuplicateRepository = repository
+        self.organization_repository: OrganizationRepository = organization_repository
+
+    async def get_candidates(
+        self, session: AsyncSession, status: str, limit: int, offset: int
+    ):
+        return await self.repository.find_all(session, status, limit, offset)
+
+    async def merge_candidate(
+        self, session: AsyncSession, candidate_id: int, keep_id: int | None = None
+    ):
+        candidate = await self._lock_pending(session, candidate_id)
+        if keep_id is None:
+            keep_id = candidate.left_id
+        if keep_id not in (candidate.left_id, candidate.right_id):
+            await session.rollback()
+            raise InvalidMergeTargetException(keep_id)
+        drop_id = (
+            candidate.right_id if keep_id == candidate.left_id else candidate.left_id
+        )
+        # Организацию из пары могли удалить после поиска дубликатов; пара
+        # тогда неактуальна. Блокировка не даёт удалить их до слияния
+        existing = await self.repository.lock_organizations(session, [keep_id, drop_id])
+        for org_id in (keep_id, drop_id):
+            if org_id not in existing:
+                await self.repository.set_status(session, candidate_id, CANDIDATE_OBSOLETE)
+                raise DuplicateOrganizationMissingException(org_id)
+        await self.repository.merge(session, candidate_id, keep_id, drop_id)
+        return await self.organization_repository.find_one(session, keep_id)
+
+    async def reject_candidate(self, session: AsyncSession, candidate_id: int):
+        candidate = await self._lock_pending(session, candidate_id)
+        await self.repository.set_status(session, candidate_id, CANDIDATE_REJECTED)
+        candidate.status = CANDIDATE_REJECTED
+        return candidate
+
+    async def _lock_pending(self, session: AsyncSession, candidate_id: int):
+        """Блокирует пару до конца транзакции, чтобы её не обработали дважды"""
+        candidate = await self.repository.find_one_for_update(session, candidate_id)
+        if candidate is None:
+            raise DuplicateCandidateNotFoundException(candidate_id)
+        if candidate.status != CANDIDATE_PENDING:
+            await session.rollback()
+            raise DuplicateCandidateResolvedException(candidate_id)
+        return candidate
@@ -1,16 +1,110 @@
 import subprocess
 
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from sqlalchemy.orm import configure_mappers
 
-from src.routres import all_routers
+from src.activity.dependencies import activity_repository
+from src.building.dependencies import building_repository
+from src.changes.notifier import change_notifier
+from src.common.api_keys import api_key_store
+from src.common.compression import CompressionMiddleware
+from src.common.conditional import ETagMiddleware
+from src.common.config import (
+    DIRECTORY_BACKEND,
+    MAINTENANCE_TASK,
+    ORGANIZATION_INGEST_MODE,
+    ORGANIZATION_SEARCH_REFRESHER,
+    RUN_MIGRATIONS,
+)
+from src.common.database import get_async_session, shard_router
+from src.common.disconnect import CancelOnDisconnectMiddleware
+from src.common.health import readiness
+from src.common.logger import logger
+from src.common.request_log import RequestLogMiddleware
+from src.organization.dependencies import organization_repository
+from src.organization.ingest import ingest_queue
+from src.organization.planner import activity_tree_planner
+from src.organization.search import search_refresher
+from src.replica.database import get_replica_session, replica
+from src.replica.middleware import ReplicaReadOnlyMiddleware
+
+
+def configure(app: FastAPI):
+    """Подключает роутеры и настраивает маперы; повторный вызов ничего не делает
+
+    Работа вынесена из импорта модуля и выполняется до первого запроса:
+    воркер делает её в lifespan, а с WEB_PRELOAD — мастер gunicorn один
+    раз до fork (см. gunicorn.conf.py), и воркеры получают готовые
+    маршруты и маперы.
+    """
+    if getattr(app.state, "configured", False):
+        return
+    from src.routres import all_routers
+
+    # Роутеры подключаются к приложению напрямую: каждое include_router
+    # заново строит все маршруты, и промежуточный роутер /api удваивал
+    # эту работу
+    for router in all_routers:
+        app.include_router(
+            router, prefix="/api", responses={404: {"description": "Page not found"}}
+        )
+    configure_mappers()
+    app.state.configured = True
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    subprocess.run("alembic upgrade head", shell=True, check=True)
+    configure(app)
+    if RUN_MIGRATIONS:
+        subprocess.run("alembic upgrade head", shell=True, check=True)
+    api_key_store.load()
+    # Версии данных для условных GET приходят уведомлениями, подписка
+    # нужна до первых запросов; при ошибке повторяется в запросах
+    try:
+        await change_notifier.subscribe()
+    except Exception as e:
+        logger.warning(f"Нет подписки на изменения, ETag не выставляются: {e}")
+    if ORGANIZATION_INGEST_MODE == "queue":
+        await ingest_queue.start()
+    if ORGANIZATION_SEARCH_REFRESHER:
+        await search_refresher.start()
+    await activity_tree_planner.start()
+    if MAINTENANCE_TASK:
+        # Модуль обслуживания нужен только с фоновой задачей
+        from src.common.maintenance import maintenance_advisor
+
+        await maintenance_advisor.start()
+    await readiness.warm_up(
+        [organization_repository(), activity_repository(), building_repository()]
+    )
     yield
+    readiness.shutdown()
+    if MAINTENANCE_TASK:
+        await maintenance_advisor.stop()
+    await ingest_queue.stop()
+    await search_refresher.stop()
+    await activity_tree_planner.stop()
+    await change_notifier.stop()
+    # Закрываем соединения пула, чтобы не оставлять сессии на стороне БД
+    await shard_router.dispose()
+
+
+@asynccontextmanager
+async def replica_lifespan(app: FastAPI):
+    """Запуск на реплике SQLite: без Postgres, миграций и фоновых задач"""
+    configure(app)
+    api_key_store.load()
+    replica.version = await replica.position()
+    readiness.shards = [replica.shard]
+    await readiness.warm_up(
+        [organization_repository(), activity_repository(), building_repository()]
+    )
+    logger.info(f"Справочник читается из реплики {replica.path}, позиция {replica.version}")
+    yield
+    readiness.shutdown()
+    await replica.dispose()
 
 
 app = FastAPI(
@@ -18,14 +112,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    lifespan=lifespan,
+    lifespan=replica_lifespan if DIRECTORY_BACKEND == "replica" else lifespan,
 )
-api = APIRouter(
-    prefix="/api",
-    responses={404: {"description": "Page not found"}},
-)
-
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -39,8 +127,10 @@ app.add_middleware(
         "Authorization",
     ],
 )
-
-for router in all_routers:
-    api.include_router(router)
-
-app.include_router(api)
+app.add_middleware(ETagMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RequestLogMiddleware)
+app.add_middleware(CancelOnDisconnectMiddleware)
+if DIRECTORY_BACKEND == "replica":
+    app.add_middleware(ReplicaReadOnlyMiddleware)
+    app.dependency_overrides[get_async_session] = get_replica_session
@@ -1,6 +1,21 @@
+from src.common.config import DIRECTORY_BACKEND
+from src.organization.ingest import OrganizationIngestQueue, ingest_queue
 from src.organization.repository import OrganizationRepository
 from src.organization.service import OrganizationService
 
 
+def organization_repository() -> OrganizationRepository:
+    if DIRECTORY_BACKEND == "replica":
+        # Реплика нужна только в этом режиме, как и aiosqlite для неё
+        from src.replica.repository import ReplicaOrganizationRepository
+
+        return ReplicaOrganizationRepository()
+    return OrganizationRepository()
+
+
 def organization_service() -> OrganizationService:
-    return OrganizationService(repository=OrganizationRepository())
\ No newline at end of file
+    return OrganizationService(repository=organization_repository())
+
+
+def organization_ingest_queue() -> OrganizationIngestQueue:
+    return ingest_queue
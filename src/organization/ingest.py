@@ -0,0 +1,221 @@
+import asyncio
+import uuid
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.common.config import (
+    INGEST_BATCH_SIZE,
+    INGEST_FLUSH_INTERVAL,
+    INGEST_JOBS_RETENTION,
+    INGEST_POLL_INTERVAL,
+    INGEST_QUEUE_MAXSIZE,
+)
+from src.common.database import async_session_maker
+from src.common.exceptions import IngestQueueFullException
+from src.common.logger import logger
+from src.organization.models import OrganizationIngestJob
+from src.organization.repository import OrganizationRepository
+from src.organization.schemas import (
+    OrganizationCreateSchema,
+    OrganizationIngestJobSchema,
+)
+
+JOB_PENDING = "pending"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Завершённые задачи сверх INGEST_JOBS_RETENTION удаляются не чаще раза
+# в столько секунд, когда воркеру нечего записывать
+PURGE_INTERVAL = 60
+
+_jobs = OrganizationIngestJob.__table__
+
+INSERT_JOB = insert(_jobs)
+FIND_JOB = select(
+    _jobs.c.id.label("job_id"), _jobs.c.status, _jobs.c.organization_id, _jobs.c.error
+).where(_jobs.c.id == bindparam("job_id"))
+# Пачка ожидающих задач в порядке поступления; строки, которые уже забрал
+# воркер другого процесса, пропускаются
+CLAIM_JOBS = (
+    select(_jobs.c.id, _jobs.c.payload)
+    .where(_jobs.c.status == JOB_PENDING)
+    .order_by(_jobs.c.created_at)
+    .limit(bindparam("limit"))
+    .with_for_update(skip_locked=True)
+)
+FINISH_JOB = (
+    update(_jobs)
+    .where(_jobs.c.id == bindparam("job_id"))
+    .values(
+        status=bindparam("job_status"),
+        organization_id=bindparam("org_id"),
+        error=bindparam("job_error"),
+        updated_at=func.now(),
+    )
+)
+COUNT_PENDING = select(func.count()).where(_jobs.c.status == JOB_PENDING)
+PURGE_FINISHED = delete(_jobs).where(
+    _jobs.c.id.in_(
+        select(_jobs.c.id)
+        .where(_jobs.c.status != JOB_PENDING)
+        .order_by(_jobs.c.updated_at.desc())
+        .offset(bindparam("retention"))
+    )
+)
+
+
+class OrganizationIngestQueue:
+    """Очередь отложенной записи организаций (write-behind)
+
+    Запрос только валидируется и записывается строкой в
+    organization_ingest_jobs; 202 отдаётся после коммита этой строки, так
+    что принятая задача переживает перезапуск процесса, а её статус виден
+    с любого воркера. Фоновые воркеры всех процессов забирают ожидающие
+    задачи пачками через FOR UPDATE SKIP LOCKED и в той же транзакции
+    создают организации многострочными INSERT и отмечают задачи
+    выполненными: каждая задача записывается ровно один раз, а задачи
+    остановленного процесса подбирают остальные.
+    """
+
+    def __init__(
+        self,
+        repository: OrganizationRepository,
+        batch_size: int = INGEST_BATCH_SIZE,
+        flush_interval: float = INGEST_FLUSH_INTERVAL,
+        maxsize: int = INGEST_QUEUE_MAXSIZE,
+        retention: int = INGEST_JOBS_RETENTION,
+        poll_interval: float = INGEST_POLL_INTERVAL,
+    ):
+        self.repository: OrganizationRepository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maxsize = maxsize
+        self.retention = retention
+        self.poll_interval = poll_interval
+        # Число ожидающих задач; обновляет воркер после каждой пачки, чтобы
+        # проверка переполнения в submit не ходила в БД
+        self._backlog = 0
+        self._purged_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._worker: asyncio.Task | None = None
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._stopping = False
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Очередь создания организаций запущена")
+
+    async def stop(self):
+        """Дописывает текущую пачку и останавливает воркер
+
+        Незаписанные задачи остаются в БД, их заберут другие процессы или
+        этот после перезапуска.
+        """
+        if self._worker is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._worker
+        self._worker = None
+        logger.info("Очередь создания организаций остановлена")
+
+    async def submit(
+        self, session: AsyncSession, data: OrganizationCreateSchema
+    ) -> OrganizationIngestJobSchema:
+        if self._backlog >= self.maxsize:
+            raise IngestQueueFullException()
+        job_id = uuid.uuid4().hex
+        await session.execute(
+            INSERT_JOB,
+            {"id": job_id, "status": JOB_PENDING, "payload": data.model_dump(mode="json")},
+        )
+        await session.commit()
+        self._backlog += 1
+        self._wakeup.set()
+        return OrganizationIngestJobSchema(job_id=job_id, status=JOB_PENDING)
+
+    async def get_job(
+        self, session: AsyncSession, job_id: str
+    ) -> OrganizationIngestJobSchema | None:
+        row = (await session.execute(FIND_JOB, {"job_id": job_id})).first()
+        return None if row is None else OrganizationIngestJobSchema(**row._mapping)
+
+    async def pending(self, session: AsyncSession) -> int:
+        """Число ожидающих задач всех процессов"""
+        self._backlog = await session.scalar(COUNT_PENDING)
+        return self._backlog
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                # Даём задачам накопиться, чтобы пачка была полнее
+                await asyncio.sleep(self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                claimed = await self._flush()
+                while claimed == self.batch_size and not self._stopping:
+                    claimed = await self._flush()
+                async with async_session_maker() as session:
+                    if not await self.pending(session):
+                        await self._purge(session)
+            except Exception as e:
+                logger.error(f"Ошибка записи задач на создание организаций: {e}")
+
+    async def _flush(self) -> int:
+        """Записывает пачку ожидающих задач, возвращает её размер"""
+        async with async_session_maker() as session:
+            jobs = (await session.execute(CLAIM_JOBS, {"limit": self.batch_size})).all()
+            if not jobs:
+                return 0
+            results = None
+            if len(jobs) > 1:
+                try:
+                    async with session.begin_nested():
+                        org_ids = await self.repository.insert_many(
+                            session, [job.payload for job in jobs]
+                        )
+                    results = [
+                        _result(job.id, JOB_DONE, org_id=org_id)
+                        for job, org_id in zip(jobs, org_ids)
+                    ]
+                except Exception as e:
+                    # Одна некорректная запись не должна ронять всю пачку:
+                    # повторяем поштучно, чтобы пометить только её
+                    logger.warning(
+                        f"Пачка из {len(jobs)} организаций не записана, повтор поштучно: {e}"
+                    )
+            if results is None:
+                results = [await self._insert_one(session, job) for job in jobs]
+            await session.execute(FINISH_JOB, results)
+            await session.commit()
+        return len(jobs)
+
+    async def _insert_one(self, session: AsyncSession, job) -> dict:
+        try:
+            async with session.begin_nested():
+                [org_id] = await self.repository.insert_many(session, [job.payload])
+        except Exception as e:
+            logger.warning(f"Не удалось создать организацию ({job.id}): {e}")
+            return _result(job.id, JOB_FAILED, error=str(getattr(e, "orig", e)))
+        return _result(job.id, JOB_DONE, org_id=org_id)
+
+    async def _purge(self, session: AsyncSession):
+        now = asyncio.get_running_loop().time()
+        if now - self._purged_at < PURGE_INTERVAL:
+            return
+        self._purged_at = now
+        await session.execute(PURGE_FINISHED, {"retention": self.retention})
+        await session.commit()
+
+
+def _result(job_id: str, status: str, org_id: int | None = None, error: str | None = None):
+    return {"job_id": job_id, "job_status": status, "org_id": org_id, "job_error": error}
+
+
+ingest_queue = OrganizationIngestQueue(repository=OrganizationRepository())
@@ -1,14 +1,56 @@
-from sqlalchemy import String, Integer, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Computed,
+    DateTime,
+    FetchedValue,
+    ForeignKey,
+    Index,
+    Float,
+    Integer,
+    SmallInteger,
+    String,
+    Text,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.common.database import Base
+from src.common.geo import REGION_PRECISION
 
 
 class Organization(Base):
     __tablename__ = "organizations"
+    __table_args__ = (
+        Index(
+            "ix_organizations_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
-    building_id: Mapped[int] = mapped_column(ForeignKey("buildings.id"))
+    building_id: Mapped[int] = mapped_column(ForeignKey("buildings.id"), index=True)
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default="1"
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
+    )
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        index=True,
+        server_default="1",
+        server_onupdate=FetchedValue(),
+    )
 
     building: Mapped["Building"] = relationship(back_populates="organizations")
     phones: Mapped[list["OrganizationPhone"]] = relationship(
@@ -25,6 +67,140 @@ class OrganizationPhone(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     phone: Mapped[str] = mapped_column(String(20), nullable=False)
-    organization_id: Mapped[int] = mapped_column(ForeignKey("organizations.id"))
+    # Номер без разделителей; сортировка "C", чтобы поиск по префиксу шёл
+    # диапазоном по индексу независимо от локали БД
+    phone_digits: Mapped[str] = mapped_column(
+        String(20, collation="C"),
+        Computed(r"regexp_replace(phone, '\D', '', 'g')", persisted=True),
+        index=True,
+    )
+    organization_id: Mapped[int] = mapped_column(
+        ForeignKey("organizations.id"), index=True
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        server_onupdate=FetchedValue(),
+    )
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        index=True,
+        server_default="1",
+        server_onupdate=FetchedValue(),
+    )
 
     organization: Mapped["Organization"] = relationship(back_populates="phones")
+
+
+class OrganizationSearch(Base):
+    """Денормализованный документ организации для чтения списков
+
+    Одна строка на организацию: здание с координатами, id видов деятельности
+    вместе со всеми предками и цифры телефонов. Списки фильтруются по этой
+    таблице без соединений со справочниками. Заполняется из представления
+    organization_search_source, см. src.organization.search.
+
+    Таблица секционирована по региону здания (src.common.geo), поэтому
+    географические запросы с условием на region читают только свои секции.
+    """
+
+    __tablename__ = "organization_search"
+    __table_args__ = (
+        Index(
+            "ix_organization_search_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_organization_search_activity_ids",
+            "activity_ids",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_organization_search_phone_digits",
+            "phone_digits",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_organization_search_location",
+            text("point(longitude, latitude)"),
+            postgresql_using="gist",
+        ),
+        {"postgresql_partition_by": "LIST (region)"},
+    )
+
+    region: Mapped[str] = mapped_column(String(REGION_PRECISION), primary_key=True)
+    id: Mapped[int] = mapped_column(
+        ForeignKey("organizations.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    building_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    address: Mapped[str] = mapped_column(String(255), nullable=False)
+    latitude: Mapped[float] = mapped_column(Float, nullable=False)
+    longitude: Mapped[float] = mapped_column(Float, nullable=False)
+    activity_ids: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
+    phone_digits: Mapped[list[str]] = mapped_column(
+        ARRAY(String(20, collation="C")), nullable=False
+    )
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class OrganizationSearchState(Base):
+    """Позиция обновления organization_search в ленте изменений"""
+
+    __tablename__ = "organization_search_state"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    watermark: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class OrganizationIngestJob(Base):
+    """Задача на создание организации в режиме очереди (src.organization.ingest)
+
+    Задачи хранятся в БД, чтобы статус был виден с любого воркера, а
+    принятая задача не терялась при перезапуске процесса.
+    """
+
+    __tablename__ = "organization_ingest_jobs"
+    __table_args__ = (
+        Index(
+            "ix_organization_ingest_jobs_pending",
+            "created_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    organization_id: Mapped[int | None] = mapped_column(Integer)
+    error: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), index=True
+    )
+
+
+class ActivityTreeStats(Base):
+    """Число организаций в поддеревьях видов деятельности (src.organization.planner)
+
+    Одна строка с двумя массивами: её пересчитывает один воркер, остальные
+    только читают.
+    """
+
+    __tablename__ = "activity_tree_stats"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    activity_ids: Mapped[list[int] | None] = mapped_column(ARRAY(Integer))
+    organizations: Mapped[list[int] | None] = mapped_column(ARRAY(Integer))
+    total: Mapped[int] = mapped_column(Integer, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
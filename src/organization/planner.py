@@ -0,0 +1,156 @@
+"""Выбор плана поиска организаций по поддереву вида деятельности
+
+Поиск по поддереву — это проверка activity_ids @> ARRAY[id] в
+organization_search. Подготовленный оператор после нескольких вызовов
+получает общий (generic) план, одинаковый для листа и для корня:
+
+- индекс: GIN-индекс по activity_ids собирает битовую карту всех
+  документов поддерева и только потом отдаёт первые строки. Для листа это
+  десятки строк, для корня с большим поддеревом — заметная доля таблицы,
+  даже если нужна страница из 10 организаций;
+- скан: последовательный просмотр с проверкой массива останавливается на
+  limit + offset найденных. Для большого поддерева это несколько страниц
+  таблицы, для редкого вида деятельности — вся таблица.
+
+Поэтому план выбирается в приложении по числу организаций n в поддереве из
+N всего. Скан просматривает около (limit + offset) · N / n документов,
+индекс — около n записей битовой карты; скан выбирается, когда
+n² > (limit + offset) · N. Число организаций в поддеревьях пересчитывает
+фоновая задача раз в ORGANIZATION_TREE_STATS_INTERVAL секунд: подсчёт
+читает весь organization_search, поэтому его выполняет один воркер под
+advisory-блокировкой и записывает в activity_tree_stats, а остальные
+читают готовую строку. Пока статистики нет, используется индекс. Выбор
+считают метрики organizations.activity_tree.<план>.
+"""
+import asyncio
+import time
+from contextlib import suppress
+
+from sqlalchemy import bindparam, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.common.config import ORGANIZATION_TREE_STATS_INTERVAL
+from src.common.database import async_session_maker
+from src.common.logger import logger
+from src.common.metrics import metrics
+from src.organization.models import ActivityTreeStats, OrganizationSearch
+
+INDEX = "index"
+SCAN = "scan"
+
+# Ключ advisory-блокировки пересчёта статистики
+LOCK_KEY = 40_030
+STATS_ID = 1
+
+# activity_ids документа — вид деятельности организации и все его предки,
+# так что число документов с id в массиве и есть размер поддерева.
+# Результат — два массива в одной строке, без разбора строки на вид
+_activity_id = func.unnest(OrganizationSearch.activity_ids).label("activity_id")
+_counts = (
+    select(_activity_id, func.count().label("organizations"))
+    .group_by(_activity_id)
+    .subquery()
+)
+SUBTREE_COUNTS = select(
+    literal(STATS_ID),
+    func.array_agg(_counts.c.activity_id),
+    func.array_agg(_counts.c.organizations),
+    select(func.count()).select_from(OrganizationSearch).scalar_subquery(),
+)
+_save_stats = insert(ActivityTreeStats).from_select(
+    ["id", "activity_ids", "organizations", "total"], SUBTREE_COUNTS
+)
+SAVE_STATS = _save_stats.on_conflict_do_update(
+    index_elements=[ActivityTreeStats.id],
+    set_={
+        "activity_ids": _save_stats.excluded.activity_ids,
+        "organizations": _save_stats.excluded.organizations,
+        "total": _save_stats.excluded.total,
+        "refreshed_at": func.now(),
+    },
+)
+LOAD_STATS = select(
+    ActivityTreeStats.activity_ids,
+    ActivityTreeStats.organizations,
+    ActivityTreeStats.total,
+).where(ActivityTreeStats.id == STATS_ID)
+STATS_FRESH = select(
+    ActivityTreeStats.refreshed_at
+    > func.now() - func.make_interval(0, 0, 0, 0, 0, 0, bindparam("interval"))
+).where(ActivityTreeStats.id == STATS_ID)
+TRY_LOCK = text("SELECT pg_try_advisory_xact_lock(:key)")
+
+
+class ActivityTreePlanner:
+    def __init__(self, interval: float = ORGANIZATION_TREE_STATS_INTERVAL):
+        self.interval = interval
+        self._subtrees: dict[int, int] | None = None
+        self._total = 0
+        self._worker: asyncio.Task | None = None
+
+    async def refresh(self, session: AsyncSession, force: bool = False):
+        """Пересчитывает общую статистику, если она устарела, и читает её
+
+        Пересчёт выполняет воркер, взявший блокировку; force — пересчитать,
+        даже если статистика моложе interval.
+        """
+        if await session.scalar(TRY_LOCK, {"key": LOCK_KEY}):
+            fresh = await session.scalar(STATS_FRESH, {"interval": self.interval})
+            if force or not fresh:
+                started = time.perf_counter()
+                await session.execute(SAVE_STATS)
+                metrics.set(
+                    "organizations.activity_tree.stats_ms",
+                    (time.perf_counter() - started) * 1000,
+                )
+        # Коммит снимает блокировку
+        await session.commit()
+        row = (await session.execute(LOAD_STATS)).first()
+        if row is None:
+            return
+        ids, counts, self._total = row
+        self._subtrees = dict(zip(ids or (), counts or ()))
+
+    def estimate(self, activity_id: int) -> int | None:
+        """Число организаций в поддереве или None, если статистики ещё нет"""
+        if self._subtrees is None:
+            return None
+        return self._subtrees.get(activity_id, 0)
+
+    def choose(self, activity_id: int, limit: int | None, offset: int | None) -> str:
+        subtree = self.estimate(activity_id)
+        if subtree is None or limit is None:
+            # Без limit нужен весь результат, и битовая карта не лишняя
+            plan = INDEX
+        elif subtree * subtree > (limit + (offset or 0)) * self._total:
+            plan = SCAN
+        else:
+            plan = INDEX
+        metrics.inc(f"organizations.activity_tree.{plan}")
+        return plan
+
+    async def start(self):
+        if self._worker is not None or self.interval <= 0:
+            return
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with async_session_maker() as session:
+                    await self.refresh(session)
+            except Exception as e:
+                logger.error(f"Ошибка пересчёта статистики поддеревьев: {e}")
+            await asyncio.sleep(self.interval)
+
+
+activity_tree_planner = ActivityTreePlanner()
@@ -1,72 +1,495 @@
-from sqlalchemy import select, and_
+from sqlalchemy import (
+    Float,
+    String,
+    Integer,
+    Table,
+    all_,
+    and_,
+    any_,
+    bindparam,
+    delete,
+    exists,
+    func,
+    insert,
+    column,
+    literal_column,
+    select,
+    table,
+    true,
+    union,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, array, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from src.activity.models import OrganizationActivity, Activity
+from src.activity.tree import activity_subtree
+from src.common.exceptions import ItemNotExist
+from src.common.fields import FieldSet, ResponseField
+from src.common.geo import regions_for_bbox
 from src.common.repository import SQLAlchemyRepository
-from src.organization.models import Organization, OrganizationPhone
+from src.organization.models import (
+    Organization,
+    OrganizationPhone,
+    OrganizationSearch,
+)
+from src.organization.planner import SCAN, activity_tree_planner
 from src.organization.schemas import OrganizationCreateSchema
 from src.building.models import Building
+from src.changes.models import ChangeTombstone
 
 
-class OrganizationRepository(SQLAlchemyRepository):
-    model = Organization
+def _replace_children(upd, table: Table, column: str, values: list, type_) -> list:
+    """CTE замены дочерних строк организации разностью множеств
 
-    async def find_one(self, session: AsyncSession, id: int):
-        stmt = (
-            select(self.model)
-            .where(self.model.id == id)
-            .options(
-                selectinload(self.model.building),
-                selectinload(self.model.activities),
-                selectinload(self.model.phones),
+    Удаляются строки, значений которых нет в новом наборе, и вставляются
+    значения, которых ещё нет. Совпадающие строки не трогаются.
+    """
+    target = table.c[column]
+    values_param = bindparam(
+        f"{table.name}_values", list(dict.fromkeys(values)), type_=ARRAY(type_)
+    )
+    removed = delete(table).where(
+        table.c.organization_id.in_(select(upd.c.id)),
+        target != all_(values_param),
+    )
+    incoming = (
+        func.unnest(values_param)
+        .table_valued("value")
+        .render_derived(name=f"{table.name}_incoming")
+    )
+    added = insert(table).from_select(
+        ["organization_id", column],
+        select(upd.c.id, incoming.c.value)
+        .select_from(upd)
+        .join(incoming, true())
+        .where(
+            ~exists().where(
+                table.c.organization_id == upd.c.id,
+                target == incoming.c.value,
             )
-        )
-        res = await session.execute(stmt)
-        return res.scalar_one()
+        ),
+    )
+    return [
+        removed.cte(f"{table.name}_removed"),
+        added.cte(f"{table.name}_added"),
+    ]
 
-    async def find_all(self, session: AsyncSession, limit: int = 10, offset: int = 0):
-        stmt = (
-            select(self.model)
-            .options(
-                selectinload(self.model.building),
-                selectinload(self.model.activities),
-                selectinload(self.model.phones),
+
+def _search_point():
+    return func.point(OrganizationSearch.longitude, OrganizationSearch.latitude)
+
+
+# Представление из миграции e5b2c8d4a1f6: документ organization_search,
+# собранный из исходных таблиц
+SEARCH_COLUMNS = [
+    "id",
+    "name",
+    "building_id",
+    "address",
+    "latitude",
+    "longitude",
+    "activity_ids",
+    "phone_digits",
+    "change_seq",
+    "region",
+]
+organization_search_source = table(
+    "organization_search_source", *(column(name) for name in SEARCH_COLUMNS)
+)
+
+
+# Горячие запросы строятся один раз при импорте: ключ кэша компиляции
+# такого выражения вычисляется один раз, а значения передаются параметрами.
+# Построение select(...).options(...) на каждый вызов стоило сотни микросекунд
+WITH_RELATIONS = (
+    selectinload(Organization.building),
+    selectinload(Organization.activities),
+    selectinload(Organization.phones),
+)
+_LIMIT = bindparam("limit", type_=Integer)
+_OFFSET = bindparam("offset", type_=Integer)
+
+
+def _page(stmt):
+    """Страница списка в порядке id; опции загрузки добавляет ORGANIZATION_FIELDS
+
+    Без ORDER BY порядок строк не определён, и страницы по offset могли
+    повторять одни строки и пропускать другие; по id же сливаются страницы
+    шардов (OrganizationService). Поиск по поддереву в плане скана идёт по
+    индексу id секций organization_search и останавливается на странице.
+    """
+    return stmt.order_by(Organization.id).limit(_LIMIT).offset(_OFFSET)
+
+
+_BOX = func.box(
+    func.point(bindparam("lon_min", type_=Float), bindparam("lat_min", type_=Float)),
+    func.point(bindparam("lon_max", type_=Float), bindparam("lat_max", type_=Float)),
+)
+# Регионы, пересекающиеся с _BOX: отсекают лишние секции organization_search.
+# Список раскрывается в IN ($1, $2, ...), который Postgres использует для
+# отсечения секций и при готовом (generic) плане
+_in_regions = OrganizationSearch.region.in_(bindparam("regions", expanding=True))
+_searched = select(Organization).join(
+    OrganizationSearch, OrganizationSearch.id == Organization.id
+)
+_in_activity_tree = OrganizationSearch.activity_ids.contains(
+    array([bindparam("activity_id", type_=Integer)])
+)
+# Та же проверка в форме, которую GIN-индекс не использует: план
+# последовательного скана для больших поддеревьев (src.organization.planner)
+_in_activity_tree_scan = bindparam("activity_id", type_=Integer) == any_(
+    OrganizationSearch.activity_ids
+)
+_distance = _search_point().op("<->", return_type=Float)(
+    func.point(bindparam("lon", type_=Float), bindparam("lat", type_=Float))
+)
+
+FIND_ONE = (
+    select(Organization)
+    .where(Organization.id == bindparam("id", type_=Integer))
+    .options(*WITH_RELATIONS)
+)
+# После записи в той же сессии: объект из identity map перезаписывается
+# данными из БД вместе с уже загруженными связями
+FIND_ONE_FRESH = FIND_ONE.execution_options(populate_existing=True)
+# Списки с фильтром читают organization_search: здание, имя по триграммному
+# индексу и цифры телефонов лежат в одной строке документа. На исходных
+# таблицах остаются FIND_ALL (фильтра нет, соединение с документом было бы
+# лишней работой) и FIND_BY_PHONE_PREFIX (см. find_by_phone)
+FIND_ALL = _page(select(Organization))
+FIND_BY_BUILDING = _page(
+    _searched.where(
+        OrganizationSearch.building_id == bindparam("building_id", type_=Integer)
+    )
+)
+FIND_BY_NAME = _page(
+    _searched.where(OrganizationSearch.name.ilike(bindparam("pattern", type_=String)))
+)
+FIND_BY_PHONE = _page(
+    _searched.where(
+        OrganizationSearch.phone_digits.contains(
+            array([bindparam("digits", type_=String)])
+        )
+    )
+)
+FIND_BY_PHONE_PREFIX = _page(
+    select(Organization).where(
+        Organization.id.in_(
+            select(OrganizationPhone.organization_id).where(
+                OrganizationPhone.phone_digits >= bindparam("lower", type_=String),
+                OrganizationPhone.phone_digits < bindparam("upper", type_=String),
             )
-            .limit(limit)
-            .offset(offset)
         )
-        res = await session.execute(stmt)
-        return res.scalars().all()
+    )
+)
+FIND_OWNERS_BY_PHONES = (
+    select(OrganizationPhone.phone_digits, Organization.id, Organization.name)
+    .join(Organization, Organization.id == OrganizationPhone.organization_id)
+    .where(
+        OrganizationPhone.phone_digits == any_(bindparam("digits", type_=ARRAY(String)))
+    )
+)
+# Строки для пакетного эндпоинта (src.batch): колонки и массивы связей
+# одним запросом по ANY($1), без ORM-объектов и selectinload
+FIND_ROWS = select(
+    Organization.id,
+    Organization.name,
+    Organization.building_id,
+    Organization.version,
+    func.coalesce(
+        select(func.array_agg(OrganizationActivity.activity_id))
+        .where(OrganizationActivity.organization_id == Organization.id)
+        .scalar_subquery(),
+        literal_column("'{}'::integer[]"),
+    ).label("activity_ids"),
+    func.coalesce(
+        select(func.array_agg(OrganizationPhone.phone))
+        .where(OrganizationPhone.organization_id == Organization.id)
+        .scalar_subquery(),
+        literal_column("'{}'::varchar[]"),
+    ).label("phones"),
+).where(Organization.id == any_(bindparam("ids", type_=ARRAY(Integer))))
+FIND_BY_ACTIVITY_TREE = _page(_searched.where(_in_activity_tree))
+FIND_BY_ACTIVITY_TREE_SCAN = _page(_searched.where(_in_activity_tree_scan))
+FIND_IN_BOX = _page(_searched.where(_in_regions, _search_point().op("<@")(_BOX)))
+FIND_NEAREST = (
+    select(Organization, _distance.label("distance"))
+    .join(OrganizationSearch, OrganizationSearch.id == Organization.id)
+    .where(_in_activity_tree)
+    .order_by(_distance)
+    .limit(_LIMIT)
+    .options(*WITH_RELATIONS)
+)
+FIND_NEAREST_WITHIN = FIND_NEAREST.where(
+    _in_regions,
+    _search_point().op("<@")(_BOX),
+    _distance <= bindparam("max_distance", type_=Float),
+)
 
-    async def find_by_building(
-        self, session: AsyncSession, building_id: int, limit: int = 10, offset: int = 0
+ORGANIZATION_FIELDS = FieldSet(
+    {
+        "id": ResponseField(columns=(Organization.id,)),
+        "name": ResponseField(columns=(Organization.name,)),
+        "building_id": ResponseField(columns=(Organization.building_id,)),
+        "version": ResponseField(columns=(Organization.version,)),
+        "building_address": ResponseField(
+            columns=(Organization.building_id,),
+            relations=(Organization.building,),
+            value=lambda org: org.building.address,
+        ),
+        "phones": ResponseField(
+            relations=(Organization.phones,),
+            value=lambda org: [{"phone": phone.phone} for phone in org.phones],
+        ),
+        "activity_ids": ResponseField(
+            relations=(Organization.activities,),
+            value=lambda org: [activity.id for activity in org.activities],
+        ),
+        "activity_names": ResponseField(
+            relations=(Organization.activities,),
+            value=lambda org: [activity.name for activity in org.activities],
+        ),
+    },
+    default_options=WITH_RELATIONS,
+)
+
+
+def _box_params(lat_min: float, lat_max: float, lon_min: float, lon_max: float):
+    return {
+        "lat_min": lat_min,
+        "lat_max": lat_max,
+        "lon_min": lon_min,
+        "lon_max": lon_max,
+        "regions": regions_for_bbox(lat_min, lat_max, lon_min, lon_max),
+    }
+
+
+class OrganizationRepository(SQLAlchemyRepository):
+    model = Organization
+    fields = ORGANIZATION_FIELDS
+    tree_planner = activity_tree_planner
+
+    async def create_one(self, session: AsyncSession, data: dict) -> Organization:
+        org_id = (await self.create_many(session, [data]))[0]
+        return await self.find_one(session, org_id)
+
+    async def create_many(self, session: AsyncSession, items: list[dict]) -> list[int]:
+        """Создание пачки организаций с телефонами и видами деятельности
+
+        Вся пачка фиксируется одним коммитом. Возвращает id в порядке
+        входных данных.
+        """
+        org_ids = await self.insert_many(session, items)
+        await session.commit()
+        return org_ids
+
+    async def insert_many(self, session: AsyncSession, items: list[dict]) -> list[int]:
+        """Запись пачки организаций в текущей транзакции, без коммита
+
+        Каждая таблица заполняется одним многострочным INSERT.
+        """
+        stmt = insert(self.model).returning(self.model.id, sort_by_parameter_order=True)
+        res = await session.execute(
+            stmt,
+            [{"name": i["name"], "building_id": i["building_id"]} for i in items],
+        )
+        org_ids = list(res.scalars().all())
+
+        phones = [
+            {"organization_id": org_id, "phone": phone["phone"]}
+            for org_id, item in zip(org_ids, items)
+            for phone in item.get("phones", [])
+        ]
+        links = [
+            {"organization_id": org_id, "activity_id": activity_id}
+            for org_id, item in zip(org_ids, items)
+            for activity_id in dict.fromkeys(item.get("activity_ids", []))
+        ]
+        if phones:
+            await session.execute(insert(OrganizationPhone), phones)
+        if links:
+            await session.execute(insert(OrganizationActivity), links)
+        await self.refresh_search(session, org_ids)
+        return org_ids
+
+    async def update_one(
+        self, session: AsyncSession, id: int, data: dict, version: int | None = None
     ):
-        stmt = (
-            select(self.model)
-            .where(self.model.building_id == building_id)
-            .options(
-                selectinload(self.model.building),
-                selectinload(self.model.activities),
-                selectinload(self.model.phones),
-            )
-            .limit(limit)
-            .offset(offset)
+        """Частичное обновление организации за один запрос к БД
+
+        Меняются только переданные поля. Телефоны и виды деятельности, если
+        переданы, заменяются разностью множеств. Всё выполняется одним
+        оператором с data-modifying CTE, который срабатывает только при
+        совпадении версии.
+        """
+        data = dict(data)
+        phones = data.pop("phones", None)
+        activity_ids = data.pop("activity_ids", None)
+
+        upd = update(self.model).where(self.model.id == id)
+        if version is not None:
+            upd = upd.where(self.model.version == version)
+        upd = (
+            upd.values(**data, version=self.model.version + 1)
+            .returning(self.model.id)
+            .cte("updated")
         )
-        return (await session.execute(stmt)).scalars().all()
+        children = []
+        if phones is not None:
+            children += _replace_children(
+                upd,
+                OrganizationPhone.__table__,
+                "phone",
+                [phone["phone"] for phone in phones],
+                String,
+            )
+        if activity_ids is not None:
+            children += _replace_children(
+                upd,
+                OrganizationActivity.__table__,
+                "activity_id",
+                activity_ids,
+                Integer,
+            )
 
-    async def find_by_activity(self, session: AsyncSession, activity_id: int):
-        """Поиск организаций по деятельности"""
-        stmt = (
-            select(self.model)
-            .join(OrganizationActivity)
-            .where(OrganizationActivity.activity_id == activity_id)
-            .options(
-                selectinload(self.model.building),
-                selectinload(self.model.activities),
-                selectinload(self.model.phones),
+        res = await session.execute(select(upd.c.id).add_cte(*children))
+        org_id = res.scalar_one_or_none()
+        if org_id is None:
+            await session.commit()
+            return None
+        await self.refresh_search(session, [org_id])
+        await session.commit()
+        return await self._find_existing(session, FIND_ONE_FRESH, {"id": org_id})
+
+    async def refresh_search(self, session: AsyncSession, ids) -> int:
+        """Пересобирает документы organization_search для организаций ids
+
+        ids — список или подзапрос. Запись идёт в транзакции сессии, поэтому
+        изменения самой организации видны в поиске сразу после коммита.
+        Строки удалённых организаций удаляет внешний ключ ON DELETE CASCADE.
+        """
+        if isinstance(ids, list):
+            ids = select(
+                func.unnest(bindparam("search_ids", ids, type_=ARRAY(Integer)))
             )
+        documents = (
+            select(organization_search_source)
+            .where(organization_search_source.c.id.in_(ids))
+            .cte("documents")
         )
-        return (await session.execute(stmt)).scalars().all()
+        # Организация, переехавшая в здание другого региона, переходит в
+        # другую секцию: старая строка удаляется тем же оператором
+        moved = (
+            delete(OrganizationSearch)
+            .where(
+                OrganizationSearch.id == documents.c.id,
+                OrganizationSearch.region != documents.c.region,
+            )
+            .cte("moved")
+        )
+        stmt = (
+            pg_insert(OrganizationSearch)
+            .from_select(SEARCH_COLUMNS, select(documents))
+            .add_cte(moved)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OrganizationSearch.region, OrganizationSearch.id],
+            set_={
+                name: stmt.excluded[name]
+                for name in SEARCH_COLUMNS
+                if name not in ("id", "region")
+            },
+            # Документ, собранный по более старому снимку, не перетирает
+            # записанный параллельной транзакцией; его дочитает следующий проход
+            where=OrganizationSearch.change_seq <= stmt.excluded.change_seq,
+        )
+        return (await session.execute(stmt)).rowcount
+
+    def changed_organizations(self, since: int, until: int):
+        """id организаций, документ которых затронут изменениями из [since, until)
+
+        Подзапрос для обновления organization_search и инкрементального
+        снимка (src.snapshot.job).
+        """
+
+        def changed(model):
+            return and_(model.change_seq >= since, model.change_seq < until)
+
+        # Смена родителя вида деятельности меняет предков у всего поддерева
+        activities = activity_subtree(changed(Activity))
+        return union(
+            select(Organization.id).where(changed(Organization)),
+            select(Organization.id)
+            .join(Building, Organization.building_id == Building.id)
+            .where(changed(Building)),
+            select(OrganizationPhone.organization_id).where(changed(OrganizationPhone)),
+            # Удалённые телефоны остаются только в записях об удалении
+            select(ChangeTombstone.organization_id).where(
+                ChangeTombstone.entity == "phone", changed(ChangeTombstone)
+            ),
+            select(OrganizationActivity.organization_id).where(
+                OrganizationActivity.activity_id.in_(select(activities.c.id))
+            ),
+        )
+
+    async def refresh_search_changes(
+        self, session: AsyncSession, since: int, until: int
+    ) -> int:
+        return await self.refresh_search(
+            session, self.changed_organizations(since, until)
+        )
+
+    async def delete_one(
+        self, session: AsyncSession, id: int, version: int | None = None
+    ):
+        """Удаление организации вместе с телефонами и связями одним запросом"""
+        removed = delete(self.model).where(self.model.id == id)
+        if version is not None:
+            removed = removed.where(self.model.version == version)
+        removed = removed.returning(self.model.id).cte("removed")
+        children = [
+            delete(table)
+            .where(table.c.organization_id.in_(select(removed.c.id)))
+            .cte(f"removed_{table.name}")
+            for table in (OrganizationPhone.__table__, OrganizationActivity.__table__)
+        ]
+        res = await session.execute(select(removed.c.id).add_cte(*children))
+        deleted_id = res.scalar_one_or_none()
+        await session.commit()
+        if deleted_id is None:
+            raise ItemNotExist
+
+    async def find_one(self, session: AsyncSession, id: int):
+        return await self._find_existing(session, FIND_ONE, {"id": id})
+
+    async def _find_page(
+        self, session: AsyncSession, stmt, params: dict, fields: tuple | None
+    ):
+        """Страница списка: все поля с ORM-объектами или только fields"""
+        res = await session.execute(ORGANIZATION_FIELDS.statement(stmt, fields), params)
+        return ORGANIZATION_FIELDS.rows(res, fields)
+
+    async def find_all(
+        self,
+        session: AsyncSession,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple | None = None,
+    ):
+        params = {"limit": limit, "offset": offset}
+        return await self._find_page(session, FIND_ALL, params, fields)
+
+    async def find_by_building(
+        self,
+        session: AsyncSession,
+        building_id: int,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple | None = None,
+    ):
+        params = {"building_id": building_id, "limit": limit, "offset": offset}
+        return await self._find_page(session, FIND_BY_BUILDING, params, fields)
 
     async def find_by_radius(
         self,
@@ -76,64 +499,123 @@ class OrganizationRepository(SQLAlchemyRepository):
         radius: float,
         limit: int = 10,
         offset: int = 0,
+        fields: tuple | None = None,
     ):
-        stmt = (
-            select(self.model)
-            .join(Building, self.model.building_id == Building.id)
-            .where(
-                and_(
-                    Building.latitude >= lat - radius,
-                    Building.latitude <= lat + radius,
-                    Building.longitude >= lon - radius,
-                    Building.longitude <= lon + radius,
-                )
-            )
-            .options(
-                selectinload(self.model.building),
-                selectinload(self.model.activities),
-                selectinload(self.model.phones),
-            )
-            .limit(limit)
-            .offset(offset)
+        return await self.find_by_bbox(
+            session,
+            lat - radius,
+            lat + radius,
+            lon - radius,
+            lon + radius,
+            limit,
+            offset,
+            fields,
         )
-        return (await session.execute(stmt)).scalars().all()
 
     async def find_by_name(
-        self, session: AsyncSession, name: str, limit: int = 10, offset: int = 0
+        self,
+        session: AsyncSession,
+        name: str,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple | None = None,
     ):
-        stmt = (
-            select(self.model)
-            .where(self.model.name.ilike(f"%{name}%"))
-            .options(
-                selectinload(self.model.building),
-                selectinload(self.model.activities),
-                selectinload(self.model.phones),
-            )
-            .limit(limit)
-            .offset(offset)
-        )
-        return (await session.execute(stmt)).scalars().all()
+        params = {"pattern": f"%{name}%", "limit": limit, "offset": offset}
+        return await self._find_page(session, FIND_BY_NAME, params, fields)
+
+    async def find_by_phone(
+        self,
+        session: AsyncSession,
+        digits: str,
+        prefix: bool = False,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple | None = None,
+    ):
+        """Поиск организаций по цифрам номера телефона, точно или по префиксу
+
+        Точный номер ищется по GIN-индексу phone_digits в organization_search.
+        Префикс остаётся на organization_phones: GIN-индекс массива диапазоны
+        не умеет, а тот же запрос без organization_search выполняет реплика
+        (src.replica.repository).
+        """
+        params = {"limit": limit, "offset": offset}
+        if prefix:
+            # Префикс как диапазон [digits, digits с увеличенной последней
+            # цифрой): в сортировке "C" после "9" идёт ":", так что это
+            # обычный range scan по индексу organization_phones.phone_digits
+            upper = digits[:-1] + chr(ord(digits[-1]) + 1)
+            params.update(lower=digits, upper=upper)
+            stmt = FIND_BY_PHONE_PREFIX
+        else:
+            params.update(digits=digits)
+            stmt = FIND_BY_PHONE
+        return await self._find_page(session, stmt, params, fields)
+
+    async def find_rows(self, session: AsyncSession, ids: list[int]) -> dict[int, dict]:
+        """Организации ids словарями с activity_ids и phones: id -> строка"""
+        res = await session.execute(FIND_ROWS, {"ids": ids})
+        return {row.id: dict(row._mapping) for row in res}
+
+    async def find_owners_by_phones(self, session: AsyncSession, digits: list[str]):
+        """Владельцы номеров для пакетного поиска: одна выборка по ANY($1)"""
+        return (await session.execute(FIND_OWNERS_BY_PHONES, {"digits": digits})).all()
 
     async def find_by_activity_tree(
-        self, session: AsyncSession, activity_id: int, limit: int = 10, offset: int = 0
+        self,
+        session: AsyncSession,
+        activity_id: int,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple | None = None,
     ):
-        cte = select(Activity.id).where(Activity.id == activity_id).cte(recursive=True)
-        cte = cte.union_all(
-            select(Activity.id).join(cte, Activity.parent_id == cte.c.id)
-        )
-        stmt = (
-            select(self.model)
-            .join(OrganizationActivity)
-            .where(OrganizationActivity.activity_id.in_(select(cte.c.id)))
-            .options(
-                selectinload(self.model.building),
-                selectinload(self.model.activities),
-                selectinload(self.model.phones),
+        """Организации с видом деятельности из поддерева activity_id
+
+        План — поиск по GIN-индексу или скан с остановкой на странице —
+        выбирается по оценке размера поддерева, см. src.organization.planner.
+        """
+        params = {"activity_id": activity_id, "limit": limit, "offset": offset}
+        if self.tree_planner.choose(activity_id, limit, offset) == SCAN:
+            stmt = FIND_BY_ACTIVITY_TREE_SCAN
+        else:
+            stmt = FIND_BY_ACTIVITY_TREE
+        return await self._find_page(session, stmt, params, fields)
+
+    async def find_nearest_by_activity_tree(
+        self,
+        session: AsyncSession,
+        activity_id: int,
+        lat: float,
+        lon: float,
+        limit: int = 10,
+        max_distance: float | None = None,
+    ):
+        """Ближайшие к точке организации с видом деятельности из поддерева
+
+        Документы organization_search перебираются KNN-сканом GiST-индекса
+        по point(longitude, latitude) от ближнего к дальнему с проверкой
+        вхождения вида деятельности в массив предков, и скан останавливается
+        на limit-й найденной. Поддерево целиком не материализуется.
+        max_distance превращается в прямоугольник, который индекс тоже
+        использует, так что для редких видов деятельности скан не уходит
+        дальше радиуса. Расстояние, как и радиус в остальных фильтрах,
+        в градусах.
+        """
+        params = {"activity_id": activity_id, "lat": lat, "lon": lon, "limit": limit}
+        if max_distance is None:
+            stmt = FIND_NEAREST
+        else:
+            params.update(
+                max_distance=max_distance,
+                **_box_params(
+                    lat - max_distance,
+                    lat + max_distance,
+                    lon - max_distance,
+                    lon + max_distance,
+                ),
             )
-            .limit(limit)
-            .offset(offset)
-        )
-        return (await session.execute(stmt)).scalars().all()
+            stmt = FIND_NEAREST_WITHIN
+        return (await session.execute(stmt, params)).all()
 
     async def find_by_bbox(
         self,
@@ -144,24 +626,23 @@ class OrganizationRepository(SQLAlchemyRepository):
         lon_max: float,
         limit: int = 10,
         offset: int = 0,
+        fields: tuple | None = None,
     ):
-        stmt = (
-            select(self.model)
-            .join(Building, self.model.building_id == Building.id)
-            .where(
-                and_(
-                    Building.latitude >= lat_min,
-                    Building.latitude <= lat_max,
-                    Building.longitude >= lon_min,
-                    Building.longitude <= lon_max,
-                )
-            )
-            .options(
-                selectinload(self.model.building),
-                selectinload(self.model.activities),
-                selectinload(self.model.phones),
-            )
-            .limit(limit)
-            .offset(offset)
+        params = {
+            **_box_params(lat_min, lat_max, lon_min, lon_max),
+            "limit": limit,
+            "offset": offset,
+        }
+        return await self._find_page(session, FIND_IN_BOX, params, fields)
+
+    async def warm_up(self, session: AsyncSession):
+        await session.execute(FIND_ONE, {"id": 0})
+        await self.find_all(session, limit=1)
+        await self.find_by_building(session, 0, limit=1)
+        await self.find_by_name(session, "", limit=1)
+        await self.find_by_activity_tree(session, 0, limit=1)
+        await session.execute(
+            FIND_BY_ACTIVITY_TREE_SCAN, {"activity_id": 0, "limit": 1, "offset": 0}
         )
-        return (await session.execute(stmt)).scalars().all()
+        await self.find_nearest_by_activity_tree(session, 0, 0, 0, limit=1)
+        await self.find_by_bbox(session, 0, 0, 0, 0, limit=1)
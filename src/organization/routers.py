@@ -1,17 +1,30 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.common.config import ORGANIZATION_INGEST_MODE
+
+from src.common.conditional import ORGANIZATION_VERSIONS, conditional_get
 from src.common.verify_key import verify_api_key
 from src.common.logger import logger
 from src.organization.schemas import (
     OrganizationResponseSchema,
+    OrganizationNearestSchema,
     OrganizationCreateSchema,
     OrganizationFilterSchema,
+    OrganizationUpdateSchema,
+    PhoneLookupRequestSchema,
+    PhoneLookupResultSchema,
+    OrganizationIngestJobSchema,
 )
+from src.organization.ingest import OrganizationIngestQueue
 from src.organization.service import OrganizationService
-from src.organization.dependencies import organization_service
+from src.organization.dependencies import (
+    organization_service,
+    organization_ingest_queue,
+)
 from src.common.exceptions import (
     OrganizationNotFoundException,
     BuildingNotFoundException,
@@ -21,6 +34,11 @@ from src.common.exceptions import (
     InvalidBoundingBoxException,
     DuplicateOrganizationNameException,
     InvalidPhoneNumberException,
+    IngestJobNotFoundException,
+    IngestQueueFullException,
+    InvalidOrganizationDataException,
+    VersionConflictException,
+    InvalidFieldsException,
 )
 from src.common.database import get_async_session
 
@@ -35,7 +53,9 @@ organization_router = APIRouter(
 @organization_router.get(
     "",
     response_model=list[OrganizationResponseSchema],
-    description="Получить список организаций с фильтрами по зданию, деятельности, названию или географии",
+    description="Получить список организаций с фильтрами по зданию, деятельности, названию или географии. "
+    "С параметром fields возвращаются только перечисленные поля",
+    dependencies=[conditional_get(ORGANIZATION_VERSIONS)],
 )
 async def get_organizations(
     filters: Annotated[OrganizationFilterSchema, Depends()],
@@ -43,11 +63,15 @@ async def get_organizations(
     session: AsyncSession = Depends(get_async_session),
 ):
     try:
-        return await service.get_filtered_organizations(session, filters)
+        # Сервис отдаёт готовые словари полей ответа (все или из fields)
+        organizations = await service.get_filtered_organizations(session, filters)
+        return JSONResponse(content=organizations)
     except (
         InvalidCoordinatesException,
         InvalidRadiusException,
         InvalidBoundingBoxException,
+        InvalidPhoneNumberException,
+        InvalidFieldsException,
     ) as e:
         raise
     except Exception as e:
@@ -58,23 +82,65 @@ async def get_organizations(
         )
 
 
+@organization_router.get(
+    "/nearest",
+    response_model=list[OrganizationNearestSchema],
+    description="Ближайшие к точке организации с видом деятельности или его "
+    "подкатегориями, по возрастанию расстояния (в градусах)",
+    dependencies=[conditional_get(ORGANIZATION_VERSIONS)],
+)
+async def get_nearest_organizations(
+    activity_id: Annotated[
+        int, Query(description="Вид деятельности (включает подкатегории)")
+    ],
+    lat: Annotated[float, Query(ge=-90, le=90, description="Широта точки")],
+    lon: Annotated[float, Query(ge=-180, le=180, description="Долгота точки")],
+    limit: Annotated[
+        int, Query(ge=1, le=100, description="Количество организаций")
+    ] = 10,
+    max_distance: Annotated[
+        float | None,
+        Query(gt=0, description="Максимальное расстояние в градусах"),
+    ] = None,
+    service: OrganizationService = Depends(organization_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.get_nearest_organizations(
+            session, activity_id, lat, lon, limit, max_distance
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при поиске ближайших организаций: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при поиске ближайших организаций",
+        )
+
+
 @organization_router.post(
     "",
     response_model=OrganizationResponseSchema,
-    description="Создать новую организацию",
+    responses={202: {"model": OrganizationIngestJobSchema}},
+    description="Создать новую организацию. В режиме очереди запрос принимается "
+    "с кодом 202, а статус записи доступен по идентификатору задачи",
 )
 async def create_organization(
     data: OrganizationCreateSchema,
     service: OrganizationService = Depends(organization_service),
     session: AsyncSession = Depends(get_async_session),
+    ingest: OrganizationIngestQueue = Depends(organization_ingest_queue),
 ):
     try:
+        if ORGANIZATION_INGEST_MODE == "queue":
+            job = await ingest.submit(session, data)
+            return JSONResponse(status_code=202, content=job.model_dump())
         return await service.create_organization(session, data)
     except (
         BuildingNotFoundException,
         ActivityNotFoundException,
         DuplicateOrganizationNameException,
         InvalidPhoneNumberException,
+        IngestQueueFullException,
     ) as e:
         raise
     except Exception as e:
@@ -84,10 +150,48 @@ async def create_organization(
         )
 
 
+@organization_router.post(
+    "/phone-lookup",
+    response_model=list[PhoneLookupResultSchema],
+    description="Пакетный поиск организаций-владельцев по номерам телефонов. "
+    "Номера сравниваются по цифрам, формат записи не важен",
+)
+async def lookup_phones(
+    data: PhoneLookupRequestSchema,
+    service: OrganizationService = Depends(organization_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.lookup_phones(session, data.phones)
+    except Exception as e:
+        logger.error(f"Ошибка при поиске владельцев номеров: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при поиске владельцев номеров",
+        )
+
+
+@organization_router.get(
+    "/jobs/{job_id}",
+    response_model=OrganizationIngestJobSchema,
+    description="Получить статус задачи на создание организации",
+)
+async def get_organization_job(
+    job_id: str,
+    session: AsyncSession = Depends(get_async_session),
+    ingest: OrganizationIngestQueue = Depends(organization_ingest_queue),
+):
+    job = await ingest.get_job(session, job_id)
+    if job is None:
+        raise IngestJobNotFoundException(job_id)
+    return job
+
+
 @organization_router.get(
     "/{org_id}",
     response_model=OrganizationResponseSchema,
     description="Получить подробную информацию об организации по её идентификатору",
+    dependencies=[conditional_get(ORGANIZATION_VERSIONS)],
 )
 async def get_organization(
     org_id: int,
@@ -106,3 +210,56 @@ async def get_organization(
             status_code=500,
             detail="Внутренняя ошибка сервера при получении информации об организации",
         )
+
+
+@organization_router.patch(
+    "/{org_id}",
+    response_model=OrganizationResponseSchema,
+    description="Частично обновить организацию. Телефоны и виды деятельности "
+    "заменяются переданными наборами. Если передана версия, обновление "
+    "выполняется только при её совпадении",
+)
+async def update_organization(
+    org_id: int,
+    data: OrganizationUpdateSchema,
+    service: OrganizationService = Depends(organization_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        return await service.update_organization(session, org_id, data)
+    except (
+        OrganizationNotFoundException,
+        InvalidOrganizationDataException,
+        VersionConflictException,
+    ) as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при обновлении организации {org_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при обновлении организации",
+        )
+
+
+@organization_router.delete(
+    "/{org_id}",
+    status_code=204,
+    description="Удалить организацию вместе с телефонами и связями",
+)
+async def delete_organization(
+    org_id: int,
+    version: int | None = Query(None, description="Ожидаемая версия записи"),
+    service: OrganizationService = Depends(organization_service),
+    session: AsyncSession = Depends(get_async_session),
+):
+    try:
+        await service.delete_organization(session, org_id, version)
+        return Response(status_code=204)
+    except (OrganizationNotFoundException, VersionConflictException) as e:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка при удалении организации {org_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Внутренняя ошибка сервера при удалении организации",
+        )
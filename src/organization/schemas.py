@@ -6,9 +6,15 @@ from fastapi import Query
 from src.common.schema import BaseSchema
 from pydantic import field_validator, model_validator, Field
 
+from src.common.config import PHONE_LOOKUP_MAX_BATCH
 from src.organization.models import OrganizationPhone
 
 
+def normalize_phone(value: str) -> str:
+    """Каноническая форма номера: только цифры, как в organization_phones.phone_digits"""
+    return "".join(ch for ch in value if ch.isdigit())
+
+
 @dataclass
 class OrganizationFilterSchema:
     building_id: Annotated[
@@ -24,6 +30,14 @@ class OrganizationFilterSchema:
         str | None,
         Query(description="Поиск по названию организации (частичное совпадение)"),
     ] = None
+    phone: Annotated[
+        str | None,
+        Query(description="Поиск по номеру телефона (точное совпадение цифр)"),
+    ] = None
+    phone_prefix: Annotated[
+        str | None,
+        Query(description="Поиск по началу номера телефона (цифры)"),
+    ] = None
     lat: Annotated[
         float | None, Query(ge=-90, le=90, description="Широта для фильтра по радиусу")
     ] = None
@@ -69,6 +83,13 @@ class OrganizationFilterSchema:
     offset: Annotated[
         int, Query(ge=0, description="Количество записей для пропуска")
     ] = 0
+    fields: Annotated[
+        str | None,
+        Query(
+            description="Поля ответа через запятую, например id,name. "
+            "Загружаются только нужные колонки и связи"
+        ),
+    ] = None
 
 
 class OrganizationPhoneSchema(BaseSchema):
@@ -118,6 +139,7 @@ class OrganizationResponseSchema(BaseSchema):
     building_address: str
     activity_ids: list[int]
     activity_names: list[str]
+    version: int
 
     @model_validator(mode="before")
     @classmethod
@@ -139,8 +161,34 @@ class OrganizationResponseSchema(BaseSchema):
         return result
 
 
+class OrganizationNearestSchema(OrganizationResponseSchema):
+    distance: float
+
+
 class OrganizationUpdateSchema(BaseSchema):
     name: str | None = None
     phones: list[OrganizationPhoneSchema] | None = None
     building_id: int | None = None
     activity_ids: list[int] | None = None
+    version: int | None = None
+
+
+class OrganizationIngestJobSchema(BaseSchema):
+    job_id: str
+    status: str
+    organization_id: int | None = None
+    error: str | None = None
+
+
+class PhoneLookupRequestSchema(BaseSchema):
+    phones: list[str] = Field(min_length=1, max_length=PHONE_LOOKUP_MAX_BATCH)
+
+
+class PhoneOwnerSchema(BaseSchema):
+    id: int
+    name: str
+
+
+class PhoneLookupResultSchema(BaseSchema):
+    phone: str
+    organizations: list[PhoneOwnerSchema]
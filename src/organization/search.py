@@ -0,0 +1,131 @@
+"""Фоновое обновление таблицы organization_search
+
+Изменения самой организации записываются в organization_search в той же
+транзакции (OrganizationRepository.refresh_search). Изменения зданий, видов
+деятельности и всего, что прошло мимо репозитория организаций, дочитывает
+OrganizationSearchRefresher по ленте изменений: он просыпается по
+уведомлению directory_changes и пересобирает документы организаций, чей
+change_seq или change_seq связанных строк попал в [watermark, horizon).
+
+Позиция хранится в organization_search_state, строка блокируется на время
+прохода с SKIP LOCKED, так что при нескольких воркерах проход выполняет
+один из них. Полная пересборка: `python -m src.organization.search`.
+"""
+import asyncio
+from contextlib import suppress
+
+from sqlalchemy import select, update
+
+from src.changes.notifier import change_notifier
+from src.changes.repository import ChangeRepository
+from src.common.config import ORGANIZATION_SEARCH_REFRESH_INTERVAL
+from src.common.database import async_session_maker, engine
+from src.common.logger import logger
+from src.organization.models import Organization, OrganizationSearchState
+from src.organization.repository import OrganizationRepository
+
+STATE_ID = 1
+# Версия данных organization_search для условных GET (см. data_versions)
+SEARCH_VERSION = "organization_search"
+
+
+class OrganizationSearchRefresher:
+    def __init__(
+        self,
+        repository: OrganizationRepository,
+        changes: ChangeRepository,
+        interval: float = ORGANIZATION_SEARCH_REFRESH_INTERVAL,
+    ):
+        self.repository: OrganizationRepository = repository
+        self.changes: ChangeRepository = changes
+        self.interval = interval
+        self._worker: asyncio.Task | None = None
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Обновление organization_search запущено")
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+        logger.info("Обновление organization_search остановлено")
+
+    async def refresh(self) -> int:
+        """Один проход: пересобирает документы после сохранённой позиции
+
+        Возвращает число записанных документов.
+        """
+        async with async_session_maker() as session:
+            # Границу берём до блокировки строки состояния, пока у
+            # транзакции нет своего номера
+            horizon = await self.changes.get_horizon(session)
+            watermark = (
+                await session.execute(
+                    select(OrganizationSearchState.watermark)
+                    .where(OrganizationSearchState.id == STATE_ID)
+                    .with_for_update(skip_locked=True)
+                )
+            ).scalar_one_or_none()
+            if watermark is None or watermark >= horizon:
+                await session.rollback()
+                return 0
+            count = await self.repository.refresh_search_changes(
+                session, watermark, horizon
+            )
+            await session.execute(
+                update(OrganizationSearchState)
+                .where(OrganizationSearchState.id == STATE_ID)
+                .values(watermark=horizon)
+            )
+            if count:
+                await self.changes.bump_version(session, SEARCH_VERSION)
+            await session.commit()
+        if count:
+            logger.debug(f"organization_search: обновлено документов {count}")
+        return count
+
+    async def rebuild(self) -> int:
+        """Пересобирает документы всех организаций"""
+        async with async_session_maker() as session:
+            count = await self.repository.refresh_search(
+                session, select(Organization.id)
+            )
+            await self.changes.bump_version(session, SEARCH_VERSION)
+            await session.commit()
+        return count
+
+    async def _run(self):
+        while True:
+            # Номер уведомления запоминается до прохода: уведомление,
+            # пришедшее во время прохода, сразу запустит следующий
+            generation = change_notifier.generation
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка обновления organization_search: {e}")
+            try:
+                await change_notifier.wait(self.interval, generation)
+            except Exception as e:
+                logger.error(f"Нет подписки на изменения, опрос по интервалу: {e}")
+                await asyncio.sleep(self.interval)
+
+
+search_refresher = OrganizationSearchRefresher(
+    repository=OrganizationRepository(), changes=ChangeRepository()
+)
+
+
+async def main():
+    count = await search_refresher.rebuild()
+    print(f"organization_search: пересобрано документов {count}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
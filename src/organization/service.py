@@ -1,10 +1,33 @@
+import asyncio
+import heapq
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import astuple, replace
+from itertools import islice
+
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.common.database import Shard, shard_router
+from src.common.exceptions import (
+    ItemNotExist,
+    InvalidOrganizationDataException,
+    InvalidPhoneNumberException,
+    OrganizationNotFoundException,
+)
+from src.common.geo import regions_for_bbox
+from src.common.singleflight import SingleFlight
 from src.organization.repository import OrganizationRepository
-from src.organization.schemas import OrganizationCreateSchema, OrganizationUpdateSchema
-from src.organization.routers import OrganizationFilterSchema
+from src.organization.schemas import (
+    OrganizationCreateSchema,
+    OrganizationFilterSchema,
+    OrganizationUpdateSchema,
+    normalize_phone,
+)
 
 
 class OrganizationService:
+    _filtered_flight = SingleFlight("organizations")
+
     def __init__(self, repository: OrganizationRepository):
         self.repository: OrganizationRepository = repository
 
@@ -15,23 +38,210 @@ class OrganizationService:
         data_dict["phones"] = [phone.model_dump() for phone in data.phones]
         return await self.repository.create_one(session, data_dict)
 
+    async def lookup_phones(self, session: AsyncSession, phones: list[str]):
+        """Пакетный поиск владельцев номеров, порядок ответа совпадает с запросом"""
+        # Пары (номер из запроса, цифры) списком: повторы в запросе
+        # получают по своему элементу ответа
+        digits = [(phone, normalize_phone(phone)) for phone in phones]
+        rows = await self.repository.find_owners_by_phones(
+            session, list({d for _, d in digits if d})
+        )
+        owners: defaultdict[str, dict[int, dict]] = defaultdict(dict)
+        for row in rows:
+            owners[row.phone_digits][row.id] = {"id": row.id, "name": row.name}
+        return [
+            {"phone": phone, "organizations": list(owners[d].values()) if d else []}
+            for phone, d in digits
+        ]
+
+    async def update_organization(
+        self, session: AsyncSession, org_id: int, data: OrganizationUpdateSchema
+    ):
+        changes = data.model_dump(exclude_unset=True, exclude={"version"})
+
+        for field, value in changes.items():
+            if value is None:
+                raise InvalidOrganizationDataException(
+                    f"поле {field} не может быть пустым"
+                )
+        if "name" in changes and len(changes["name"].strip()) == 0:
+            raise InvalidOrganizationDataException("Название не может быть пустым")
+
+        try:
+            organization = await self.repository.update_one(
+                session, org_id, changes, data.version
+            )
+        except IntegrityError:
+            await session.rollback()
+            raise InvalidOrganizationDataException(
+                "здание или вид деятельности не существует"
+            )
+        if organization is None:
+            await self.repository.raise_missing_or_conflict(
+                session, org_id, data.version, OrganizationNotFoundException
+            )
+        return organization
+
+    async def delete_organization(
+        self, session: AsyncSession, org_id: int, version: int | None = None
+    ):
+        try:
+            await self.repository.delete_one(session, org_id, version)
+        except ItemNotExist:
+            await self.repository.raise_missing_or_conflict(
+                session, org_id, version, OrganizationNotFoundException
+            )
+
+    @asynccontextmanager
+    async def _shard_session(self, session: AsyncSession, shard: Shard):
+        """Сессия запроса для основной БД, отдельная — для остальных шардов"""
+        if shard.index == 0:
+            yield session
+            return
+        async with shard.session() as shard_session:
+            yield shard_session
+
     async def get_organization(self, session: AsyncSession, org_id: int):
-        return await self.repository.find_one(session, org_id)
+        async with self._shard_session(session, shard_router.for_id(org_id)) as s:
+            try:
+                return await self.repository.find_one(s, org_id)
+            except ItemNotExist:
+                raise OrganizationNotFoundException(org_id)
+
+    async def get_nearest_organizations(
+        self,
+        session: AsyncSession,
+        activity_id: int,
+        lat: float,
+        lon: float,
+        limit: int,
+        max_distance: float | None = None,
+    ):
+        regions = None
+        if max_distance is not None:
+            regions = regions_for_bbox(
+                lat - max_distance,
+                lat + max_distance,
+                lon - max_distance,
+                lon + max_distance,
+            )
+
+        async def query(shard: Shard):
+            async with self._shard_session(session, shard) as s:
+                return await self.repository.find_nearest_by_activity_tree(
+                    s, activity_id, lat, lon, limit, max_distance
+                )
+
+        # Ответ каждого шарда уже упорядочен по расстоянию, поэтому
+        # достаточно слить их и взять первые limit
+        pages = await asyncio.gather(
+            *(query(shard) for shard in shard_router.for_regions(regions))
+        )
+        rows = islice(heapq.merge(*pages, key=lambda row: row[1]), limit)
+        organizations = []
+        for organization, distance in rows:
+            organization.distance = distance
+            organizations.append(organization)
+        return organizations
 
     async def get_filtered_organizations(
         self, session: AsyncSession, filters: OrganizationFilterSchema
     ):
+        return await self._filtered_flight.do(
+            astuple(filters),
+            lambda: self._get_filtered_page(session, filters),
+        )
+
+    async def _get_filtered_page(
+        self, session: AsyncSession, filters: OrganizationFilterSchema
+    ):
+        organizations = await self._get_filtered_organizations(session, filters)
+        if filters.fields is not None:
+            return organizations
+        # Страницу получают и ожидающие запросы со своими сессиями, поэтому
+        # отдаются словари полей ответа, а не объекты сессии ведущего запроса
+        return self.repository.fields.dicts(organizations)
+
+    async def _get_filtered_organizations(
+        self, session: AsyncSession, filters: OrganizationFilterSchema
+    ):
+        """Список организаций по фильтру, при шардировании — со всех нужных шардов
+
+        Страница на шардах не согласована, поэтому каждый шард отдаёт первые
+        offset + limit строк по id, ответы сливаются по id и режутся до
+        страницы — так же, как страница одной БД. Шарды отбираются по
+        регионам прямоугольника или по диапазону id здания; без геофильтра
+        опрашиваются все.
+        """
+        if not shard_router.sharded:
+            return await self._find_filtered(session, filters)
+
+        if filters.building_id is not None:
+            shards = [shard_router.for_id(filters.building_id)]
+        else:
+            shards = shard_router.for_regions(self._filter_regions(filters))
+        window = replace(filters, limit=filters.offset + filters.limit, offset=0)
+
+        async def query(shard: Shard):
+            async with self._shard_session(session, shard) as s:
+                return await self._find_filtered(s, window)
+
+        pages = await asyncio.gather(*(query(shard) for shard in shards))
+        rows = heapq.merge(*pages, key=_organization_id)
+        return list(islice(rows, filters.offset, filters.offset + filters.limit))
+
+    @staticmethod
+    def _filter_regions(filters: OrganizationFilterSchema) -> list[str] | None:
+        if (
+            filters.lat is not None
+            and filters.lon is not None
+            and filters.radius is not None
+        ):
+            return regions_for_bbox(
+                filters.lat - filters.radius,
+                filters.lat + filters.radius,
+                filters.lon - filters.radius,
+                filters.lon + filters.radius,
+            )
+        if (
+            filters.lat_min is not None
+            and filters.lat_max is not None
+            and filters.lon_min is not None
+            and filters.lon_max is not None
+        ):
+            return regions_for_bbox(
+                filters.lat_min, filters.lat_max, filters.lon_min, filters.lon_max
+            )
+        return None
+
+    async def _find_filtered(
+        self, session: AsyncSession, filters: OrganizationFilterSchema
+    ):
+        fields = self.repository.fields.parse(filters.fields)
         if filters.building_id is not None:
             return await self.repository.find_by_building(
-                session, filters.building_id, filters.limit, filters.offset
+                session, filters.building_id, filters.limit, filters.offset, fields
             )
         if filters.activity_id is not None:
             return await self.repository.find_by_activity_tree(
-                session, filters.activity_id, filters.limit, filters.offset
+                session, filters.activity_id, filters.limit, filters.offset, fields
+            )
+        if filters.phone is not None or filters.phone_prefix is not None:
+            raw = filters.phone if filters.phone is not None else filters.phone_prefix
+            digits = normalize_phone(raw)
+            if not digits:
+                raise InvalidPhoneNumberException(raw)
+            return await self.repository.find_by_phone(
+                session,
+                digits,
+                filters.phone is None,
+                filters.limit,
+                filters.offset,
+                fields,
             )
         if filters.search is not None:
             return await self.repository.find_by_name(
-                session, filters.search, filters.limit, filters.offset
+                session, filters.search, filters.limit, filters.offset, fields
             )
         if (
             filters.lat is not None
@@ -45,6 +255,7 @@ class OrganizationService:
                 filters.radius,
                 filters.limit,
                 filters.offset,
+                fields,
             )
         if (
             filters.lat_min is not None
@@ -60,5 +271,13 @@ class OrganizationService:
                 filters.lon_max,
                 filters.limit,
                 filters.offset,
+                fields,
             )
-        return await self.repository.find_all(session, filters.limit, filters.offset)
+        return await self.repository.find_all(
+            session, filters.limit, filters.offset, fields
+        )
+
+
+def _organization_id(item) -> int:
+    """Ключ слияния страниц: ORM-объект или словарь полей (id есть всегда)"""
+    return item["id"] if isinstance(item, dict) else item.id
@@ -0,0 +1,124 @@
+"""Сборка файла реплики SQLite из Postgres
+
+    python -m src.replica.build --path directory.db
+
+Таблицы справочника читаются в одной транзакции REPEATABLE READ, то есть
+из одного снимка БД, пачками через серверный курсор (как в
+src.snapshot.job) и пишутся в SQLite. Затем строятся индексы, таблица
+замыкания дерева видов деятельности, R*Tree и FTS5 (см.
+src.replica.database). Реплика собирается во временном файле рядом и
+переименовывается, когда готова целиком, так что читатели видят либо
+прежний файл, либо новый. Позиция снимка — граница ленты изменений.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import Table, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.activity.models import Activity, OrganizationActivity
+from src.building.models import Building
+from src.changes.repository import ChangeRepository
+from src.common.config import REPLICA_PATH, SNAPSHOT_CHUNK_ROWS, SNAPSHOT_DATABASE_URL
+from src.common.database import create_engine, engine
+from src.common.logger import logger
+from src.organization.models import Organization, OrganizationPhone
+from src.replica.database import DERIVED, SCHEMA
+from src.snapshot.job import stream_chunks
+
+TABLES = (
+    Building.__table__,
+    Activity.__table__,
+    Organization.__table__,
+    OrganizationPhone.__table__,
+    OrganizationActivity.__table__,
+)
+# Формат, в котором тип DateTime SQLAlchemy хранит время в SQLite
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).strftime(DATETIME_FORMAT)
+    return value
+
+
+async def copy_table(
+    conn: AsyncConnection, db: sqlite3.Connection, table: Table, chunk: int
+) -> int:
+    """Копирует таблицу в реплику пачками, возвращает число строк"""
+    names = [c.name for c in table.columns]
+    insert = (
+        f"INSERT INTO {table.name} ({', '.join(names)}) "
+        f"VALUES ({', '.join('?' * len(names))})"
+    )
+    rows = 0
+    async for batch in stream_chunks(conn, select(*table.columns), chunk):
+        db.executemany(insert, [tuple(map(_value, row)) for row in batch])
+        rows += len(batch)
+    return rows
+
+
+async def build(conn: AsyncConnection, path: Path, chunk: int) -> int:
+    """Собирает реплику в path, возвращает её позицию в ленте изменений"""
+    position = await ChangeRepository().get_horizon(conn)
+    partial = path.with_name(f".{path.name}")
+    partial.unlink(missing_ok=True)
+    db = sqlite3.connect(partial)
+    try:
+        # Временный файл при сбое всё равно выбрасывается
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        db.create_function("unicode_lower", 1, str.lower, deterministic=True)
+        db.executescript(SCHEMA)
+        for table in TABLES:
+            started = time.perf_counter()
+            rows = await copy_table(conn, db, table, chunk)
+            logger.info(
+                f"Реплика: {table.name} — {rows} строк "
+                f"за {time.perf_counter() - started:.1f} с"
+            )
+        started = time.perf_counter()
+        db.executescript(DERIVED)
+        db.execute(
+            "INSERT INTO replica_info (key, value) VALUES ('position', ?)",
+            (str(position),),
+        )
+        db.commit()
+        logger.info(f"Реплика: индексы за {time.perf_counter() - started:.1f} с")
+    finally:
+        db.close()
+    os.replace(partial, path)
+    return position
+
+
+async def run(path: Path, chunk: int, url: str | None):
+    source_engine = create_engine(url) if url else engine
+    try:
+        async with source_engine.connect() as conn:
+            await conn.execution_options(
+                isolation_level="REPEATABLE READ", postgresql_readonly=True
+            )
+            async with conn.begin():
+                position = await build(conn, path, chunk)
+        logger.info(f"Реплика готова: {path}, позиция {position}")
+    finally:
+        await source_engine.dispose()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Сборка реплики справочника в SQLite")
+    parser.add_argument("--path", type=Path, default=Path(REPLICA_PATH))
+    parser.add_argument("--chunk", type=int, default=SNAPSHOT_CHUNK_ROWS)
+    parser.add_argument("--url", default=SNAPSHOT_DATABASE_URL, help="БД для чтения")
+    args = parser.parse_args()
+    await run(args.path, args.chunk, args.url)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
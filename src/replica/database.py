@@ -0,0 +1,185 @@
+"""Локальная реплика справочника в SQLite
+
+Файл реплики содержит таблицы справочника с теми же именами и колонками,
+что и в Postgres, поэтому модели и большая часть запросов репозиториев
+работают без изменений. Вместо индексов Postgres в реплике:
+
+- activity_closure — таблица замыкания дерева видов деятельности (предок,
+  потомок, расстояние), поиск по поддереву — один join без рекурсии;
+- building_geo — R*Tree по координатам зданий для прямоугольников и радиуса;
+- organization_names — FTS5 с триграммным токенизатором по названиям в
+  нижнем регистре, который ускоряет LIKE '%...%' так же, как pg_trgm — ILIKE.
+
+Реплика открывается только для чтения и подменяется новой сборкой с
+перезапуском воркеров. Нужен пакет aiosqlite.
+"""
+from typing import AsyncGenerator
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.common.config import DB_POOL_SIZE, REPLICA_PATH
+from src.common.database import Shard, create_session_maker
+
+SCHEMA = """
+CREATE TABLE buildings (
+    id INTEGER PRIMARY KEY,
+    address TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    change_seq INTEGER NOT NULL
+);
+CREATE TABLE activities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    parent_id INTEGER,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    change_seq INTEGER NOT NULL
+);
+CREATE TABLE organizations (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    building_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    change_seq INTEGER NOT NULL
+);
+CREATE TABLE organization_phones (
+    id INTEGER PRIMARY KEY,
+    organization_id INTEGER NOT NULL,
+    phone TEXT NOT NULL,
+    phone_digits TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    change_seq INTEGER NOT NULL
+);
+CREATE TABLE organization_activities (
+    organization_id INTEGER NOT NULL,
+    activity_id INTEGER NOT NULL,
+    PRIMARY KEY (organization_id, activity_id)
+) WITHOUT ROWID;
+CREATE TABLE replica_info (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Индексы и производные таблицы строятся после загрузки данных;
+# unicode_lower регистрирует сборка (lower() SQLite не знает кириллицы)
+DERIVED = """
+CREATE INDEX ix_organizations_building_id ON organizations (building_id);
+CREATE INDEX ix_activities_parent_id ON activities (parent_id);
+CREATE INDEX ix_organization_phones_organization_id ON organization_phones (organization_id);
+CREATE INDEX ix_organization_phones_phone_digits ON organization_phones (phone_digits);
+CREATE INDEX ix_organization_activities_activity_id
+    ON organization_activities (activity_id, organization_id);
+
+CREATE TABLE activity_closure (
+    ancestor_id INTEGER NOT NULL,
+    descendant_id INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+) WITHOUT ROWID;
+INSERT INTO activity_closure
+WITH RECURSIVE closure (ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM activities
+    UNION ALL
+    SELECT c.ancestor_id, a.id, c.depth + 1
+    FROM closure c
+    JOIN activities a ON a.parent_id = c.descendant_id
+)
+SELECT ancestor_id, descendant_id, depth FROM closure;
+
+CREATE VIRTUAL TABLE building_geo USING rtree (
+    id, min_lat, max_lat, min_lon, max_lon
+);
+INSERT INTO building_geo
+SELECT id, latitude, latitude, longitude, longitude FROM buildings;
+
+CREATE VIRTUAL TABLE organization_names USING fts5 (name, tokenize='trigram');
+INSERT INTO organization_names (rowid, name)
+SELECT id, unicode_lower(name) FROM organizations;
+
+ANALYZE;
+"""
+
+# Производные таблицы для запросов репозиториев реплики
+_metadata = MetaData()
+activity_closure = Table(
+    "activity_closure",
+    _metadata,
+    Column("ancestor_id", Integer, primary_key=True),
+    Column("descendant_id", Integer, primary_key=True),
+    Column("depth", Integer),
+)
+building_geo = Table(
+    "building_geo",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float),
+    Column("max_lat", Float),
+    Column("min_lon", Float),
+    Column("max_lon", Float),
+)
+organization_names = Table(
+    "organization_names",
+    _metadata,
+    Column("rowid", Integer, primary_key=True),
+    Column("name"),
+)
+
+
+class Replica:
+    """Движок и сессии реплики; движок создаётся при первом обращении"""
+
+    def __init__(self, path: str = REPLICA_PATH):
+        self.path = path
+        # Позиция открытой реплики, читается при запуске (см. position)
+        self.version: int | None = None
+        self._shard: Shard | None = None
+
+    @property
+    def shard(self) -> Shard:
+        if self._shard is None:
+            engine = self._create_engine()
+            self._shard = Shard("replica", 0, None, engine, create_session_maker(engine))
+        return self._shard
+
+    def _create_engine(self) -> AsyncEngine:
+        try:
+            import aiosqlite  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Для DIRECTORY_BACKEND=replica требуется пакет aiosqlite")
+        # По умолчанию aiosqlite открывает файл на каждый запрос (NullPool);
+        # в пуле соединения сохраняют кэш страниц между запросами
+        return create_async_engine(
+            f"sqlite+aiosqlite:///file:{self.path}?mode=ro&uri=true",
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=0,
+        )
+
+    async def position(self) -> int:
+        """Граница ленты изменений, на которой снята реплика"""
+        async with self.shard.engine.connect() as conn:
+            value = await conn.scalar(
+                text("SELECT value FROM replica_info WHERE key = 'position'")
+            )
+        return int(value)
+
+    async def dispose(self):
+        if self._shard is not None:
+            await self._shard.engine.dispose()
+            self._shard = None
+
+
+replica = Replica()
+
+
+async def get_replica_session() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия реплики вместо get_async_session в режиме DIRECTORY_BACKEND=replica"""
+    async with replica.shard.session_maker() as session:
+        yield session
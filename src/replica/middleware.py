@@ -0,0 +1,35 @@
+"""Отказ в изменяющих запросах, когда API обслуживается репликой"""
+import json
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# POST-эндпоинты, которые только читают
+READ_ONLY_POSTS = ("/api/batch", "/api/organizations/phone-lookup")
+
+
+class ReplicaReadOnlyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in READ_METHODS
+            or (scope["method"] == "POST" and scope["path"] in READ_ONLY_POSTS)
+        ):
+            await self.app(scope, receive, send)
+            return
+        body = json.dumps(
+            {"detail": "Справочник доступен только для чтения: API работает на реплике"},
+            ensure_ascii=False,
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 405,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"allow", b", ".join(m.encode() for m in READ_METHODS)),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
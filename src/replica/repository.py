@@ -0,0 +1,317 @@
+"""Репозитории справочника поверх реплики SQLite
+
+Наследуют репозитории Postgres и переопределяют только запросы, которые
+опираются на возможности Postgres: organization_search с GIN- и
+GiST-индексами, массивы и ANY($1), ILIKE с pg_trgm. Остальные запросы
+(по id, страницы списков, по зданию, префикс телефона) работают в SQLite
+как есть. Запись в реплику не предусмотрена: файл открыт только для
+чтения, а изменяющие запросы отклоняет ReplicaReadOnlyMiddleware.
+"""
+from sqlalchemy import JSON, Float, Integer, String, bindparam, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.activity.models import Activity, OrganizationActivity
+from src.activity.repository import ActivityRepository
+from src.activity.repository import WITH_RELATIONS as ACTIVITY_RELATIONS
+from src.building.models import Building
+from src.building.repository import BuildingRepository
+from src.organization.models import Organization, OrganizationPhone
+from src.organization.repository import (
+    FIND_BY_PHONE_PREFIX,
+    FIND_ONE,
+    WITH_RELATIONS,
+    OrganizationRepository,
+    _page,
+)
+from src.replica.database import activity_closure, building_geo, organization_names
+
+_LIMIT = bindparam("limit", type_=Integer)
+# В SQLite LIMIT NULL — ошибка, отсутствие ограничения — LIMIT -1
+NO_LIMIT = -1
+
+# Здания в прямоугольнике: кандидаты из R*Tree (границы в нём округлены
+# до float32 наружу) и точная проверка по координатам здания
+_LAT_MIN = bindparam("lat_min", type_=Float)
+_LAT_MAX = bindparam("lat_max", type_=Float)
+_LON_MIN = bindparam("lon_min", type_=Float)
+_LON_MAX = bindparam("lon_max", type_=Float)
+_box_buildings = (
+    select(Building.id)
+    .join(building_geo, building_geo.c.id == Building.id)
+    .where(
+        building_geo.c.max_lat >= _LAT_MIN,
+        building_geo.c.min_lat <= _LAT_MAX,
+        building_geo.c.max_lon >= _LON_MIN,
+        building_geo.c.min_lon <= _LON_MAX,
+        Building.latitude.between(_LAT_MIN, _LAT_MAX),
+        Building.longitude.between(_LON_MIN, _LON_MAX),
+    )
+)
+# Организации с видом деятельности из поддерева: один join с таблицей
+# замыкания вместо рекурсивного обхода
+_subtree_organizations = (
+    select(OrganizationActivity.organization_id)
+    .join(
+        activity_closure,
+        activity_closure.c.descendant_id == OrganizationActivity.activity_id,
+    )
+    .where(activity_closure.c.ancestor_id == bindparam("activity_id", type_=Integer))
+)
+# Квадрат расстояния в градусах: для порядка корень не нужен
+_squared_distance = func.pow(
+    Building.latitude - bindparam("lat", type_=Float), 2
+) + func.pow(Building.longitude - bindparam("lon", type_=Float), 2)
+# Названия в organization_names хранятся в нижнем регистре (lower() SQLite
+# меняет регистр только у латиницы), шаблон приводится так же. Триграммный
+# индекс работает с шаблонами от трёх символов; для коротких SQLite 3.40
+# ошибается в подсчёте многобайтных символов и ничего не находит, поэтому
+# они проверяются сканом (+name не передаётся индексу)
+_names_like = organization_names.c.name.like(bindparam("pattern", type_=String))
+_names_scan_like = literal_column("+organization_names.name").like(
+    bindparam("pattern", type_=String)
+)
+
+FIND_BY_ACTIVITY_TREE = _page(
+    select(Organization).where(Organization.id.in_(_subtree_organizations))
+)
+FIND_BY_NAME = _page(
+    select(Organization).where(
+        Organization.id.in_(select(organization_names.c.rowid).where(_names_like))
+    )
+)
+FIND_BY_SHORT_NAME = _page(
+    select(Organization).where(
+        Organization.id.in_(select(organization_names.c.rowid).where(_names_scan_like))
+    )
+)
+FIND_BY_PHONE = _page(
+    select(Organization).where(
+        Organization.id.in_(
+            select(OrganizationPhone.organization_id).where(
+                OrganizationPhone.phone_digits == bindparam("digits", type_=String)
+            )
+        )
+    )
+)
+FIND_OWNERS_BY_PHONES = (
+    select(OrganizationPhone.phone_digits, Organization.id, Organization.name)
+    .join(Organization, Organization.id == OrganizationPhone.organization_id)
+    .where(OrganizationPhone.phone_digits.in_(bindparam("digits", expanding=True)))
+)
+FIND_IN_BOX = _page(
+    select(Organization).where(Organization.building_id.in_(_box_buildings))
+)
+FIND_NEAREST = (
+    select(Organization, func.sqrt(_squared_distance).label("distance"))
+    .join(Building, Building.id == Organization.building_id)
+    .where(Organization.id.in_(_subtree_organizations))
+    .order_by(_squared_distance)
+    .limit(_LIMIT)
+    .options(*WITH_RELATIONS)
+)
+FIND_NEAREST_WITHIN = FIND_NEAREST.where(
+    Building.id.in_(_box_buildings),
+    _squared_distance <= bindparam("max_distance_squared", type_=Float),
+)
+FIND_ORGANIZATION_ROWS = select(
+    Organization.id,
+    Organization.name,
+    Organization.building_id,
+    Organization.version,
+    select(func.json_group_array(OrganizationActivity.activity_id, type_=JSON))
+    .where(OrganizationActivity.organization_id == Organization.id)
+    .scalar_subquery()
+    .label("activity_ids"),
+    select(func.json_group_array(OrganizationPhone.phone, type_=JSON))
+    .where(OrganizationPhone.organization_id == Organization.id)
+    .scalar_subquery()
+    .label("phones"),
+).where(Organization.id.in_(bindparam("ids", expanding=True)))
+
+FIND_ACTIVITIES = (
+    select(Activity)
+    .where(Activity.id.in_(bindparam("ids", expanding=True)))
+    .order_by(Activity.id)
+    .options(*ACTIVITY_RELATIONS)
+)
+FIND_ACTIVITY_ROWS = select(
+    Activity.id, Activity.name, Activity.parent_id, Activity.version
+).where(Activity.id.in_(bindparam("ids", expanding=True)))
+FIND_ACTIVITY_TREE = select(Activity.id, Activity.parent_id)
+
+FIND_BUILDING_ROWS = select(
+    Building.id, Building.address, Building.latitude, Building.longitude, Building.version
+).where(Building.id.in_(bindparam("ids", expanding=True)))
+FIND_BUILDINGS_IN_BOX = select(Building).where(Building.id.in_(_box_buildings))
+
+
+def _box_params(lat_min: float, lat_max: float, lon_min: float, lon_max: float):
+    return {"lat_min": lat_min, "lat_max": lat_max, "lon_min": lon_min, "lon_max": lon_max}
+
+
+def _limit(limit: int | None) -> int:
+    return NO_LIMIT if limit is None else limit
+
+
+class ReplicaOrganizationRepository(OrganizationRepository):
+    async def find_by_activity_tree(
+        self,
+        session: AsyncSession,
+        activity_id: int,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple | None = None,
+    ):
+        params = {"activity_id": activity_id, "limit": _limit(limit), "offset": offset}
+        return await self._find_page(session, FIND_BY_ACTIVITY_TREE, params, fields)
+
+    async def find_by_name(
+        self,
+        session: AsyncSession,
+        name: str,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple | None = None,
+    ):
+        params = {
+            "pattern": f"%{name.lower()}%",
+            "limit": _limit(limit),
+            "offset": offset,
+        }
+        stmt = FIND_BY_NAME if len(name) >= 3 else FIND_BY_SHORT_NAME
+        return await self._find_page(session, stmt, params, fields)
+
+    async def find_by_phone(
+        self,
+        session: AsyncSession,
+        digits: str,
+        prefix: bool = False,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple | None = None,
+    ):
+        if prefix:
+            # Диапазон по индексу phone_digits, как в Postgres: в сортировке
+            # BINARY после "9" тоже идёт ":"
+            upper = digits[:-1] + chr(ord(digits[-1]) + 1)
+            params = {"lower": digits, "upper": upper}
+            stmt = FIND_BY_PHONE_PREFIX
+        else:
+            params = {"digits": digits}
+            stmt = FIND_BY_PHONE
+        params.update(limit=_limit(limit), offset=offset)
+        return await self._find_page(session, stmt, params, fields)
+
+    async def find_rows(self, session: AsyncSession, ids: list[int]) -> dict[int, dict]:
+        res = await session.execute(FIND_ORGANIZATION_ROWS, {"ids": ids})
+        return {row.id: dict(row._mapping) for row in res}
+
+    async def find_owners_by_phones(self, session: AsyncSession, digits: list[str]):
+        return (await session.execute(FIND_OWNERS_BY_PHONES, {"digits": digits})).all()
+
+    async def find_nearest_by_activity_tree(
+        self,
+        session: AsyncSession,
+        activity_id: int,
+        lat: float,
+        lon: float,
+        limit: int = 10,
+        max_distance: float | None = None,
+    ):
+        """Ближайшие организации из поддерева, расстояние в градусах
+
+        Поддерево в реплике небольшое по сравнению с Postgres-инсталляцией,
+        поэтому его организации сортируются по расстоянию целиком; с
+        max_distance кандидатов сначала отбирает R*Tree.
+        """
+        params = {"activity_id": activity_id, "lat": lat, "lon": lon, "limit": limit}
+        if max_distance is None:
+            stmt = FIND_NEAREST
+        else:
+            params.update(
+                max_distance_squared=max_distance * max_distance,
+                **_box_params(
+                    lat - max_distance,
+                    lat + max_distance,
+                    lon - max_distance,
+                    lon + max_distance,
+                ),
+            )
+            stmt = FIND_NEAREST_WITHIN
+        return (await session.execute(stmt, params)).all()
+
+    async def find_by_bbox(
+        self,
+        session: AsyncSession,
+        lat_min: float,
+        lat_max: float,
+        lon_min: float,
+        lon_max: float,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple | None = None,
+    ):
+        params = {
+            **_box_params(lat_min, lat_max, lon_min, lon_max),
+            "limit": _limit(limit),
+            "offset": offset,
+        }
+        return await self._find_page(session, FIND_IN_BOX, params, fields)
+
+    async def warm_up(self, session: AsyncSession):
+        await session.execute(FIND_ONE, {"id": 0})
+        await self.find_all(session, limit=1)
+        await self.find_by_name(session, "", limit=1)
+        await self.find_by_activity_tree(session, 0, limit=1)
+        await self.find_nearest_by_activity_tree(session, 0, 0, 0, limit=1)
+        await self.find_by_bbox(session, 0, 0, 0, 0, limit=1)
+
+
+class ReplicaActivityRepository(ActivityRepository):
+    search = ReplicaOrganizationRepository()
+
+    async def find_all(
+        self,
+        session: AsyncSession,
+        limit: int = None,
+        offset: int = None,
+        fields: tuple | None = None,
+    ):
+        return await super().find_all(session, _limit(limit), offset or 0, fields)
+
+    async def find_many(self, session: AsyncSession, ids: list[int]) -> list[Activity]:
+        res = await session.execute(FIND_ACTIVITIES, {"ids": ids})
+        return list(res.scalars().all())
+
+    async def find_rows(self, session: AsyncSession, ids: list[int]) -> dict[int, dict]:
+        res = await session.execute(FIND_ACTIVITY_ROWS, {"ids": ids})
+        return {row.id: dict(row._mapping) for row in res}
+
+    async def find_tree(self, session: AsyncSession) -> dict[int, int | None]:
+        return dict((await session.execute(FIND_ACTIVITY_TREE)).tuples().all())
+
+
+class ReplicaBuildingRepository(BuildingRepository):
+    async def find_all(
+        self,
+        session: AsyncSession,
+        limit: int = None,
+        offset: int = None,
+        fields: tuple | None = None,
+    ):
+        return await super().find_all(session, _limit(limit), offset or 0, fields)
+
+    async def find_rows(self, session: AsyncSession, ids: list[int]) -> dict[int, dict]:
+        res = await session.execute(FIND_BUILDING_ROWS, {"ids": ids})
+        return {row.id: dict(row._mapping) for row in res}
+
+    async def find_in_bbox(
+        self,
+        session: AsyncSession,
+        lat_min: float,
+        lat_max: float,
+        lon_min: float,
+        lon_max: float,
+    ):
+        params = _box_params(lat_min, lat_max, lon_min, lon_max)
+        return (await session.execute(FIND_BUILDINGS_IN_BOX, params)).scalars().all()
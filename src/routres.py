@@ -1,9 +1,17 @@
 from src.activity.routres import activity_router
 from src.organization.routers import organization_router
 from src.building.routers import building_router
+from src.changes.routers import changes_router
+from src.common.routers import system_router
+from src.dedup.routers import duplicate_router
+from src.batch.routers import batch_router
 
 all_routers = [
     organization_router,
     activity_router,
     building_router,
+    changes_router,
+    duplicate_router,
+    batch_router,
+    system_router,
 ]
@@ -0,0 +1,355 @@
+"""Снимок справочника в Parquet для аналитики
+
+    python -m src.snapshot.job                # полный снимок
+    python -m src.snapshot.job --incremental  # изменения с прошлого снимка
+
+Отчёты читают файлы снимка, а не рабочую БД. В каталоге снимка по файлу на
+таблицу (organizations, buildings, activities, organization_activities,
+organization_phones) и денормализованный directory: организация с
+адресом и координатами здания, видами деятельности и телефонами.
+
+Все таблицы читаются в одной транзакции REPEATABLE READ, то есть из одного
+снимка БД, через серверный курсор пачками по SNAPSHOT_CHUNK_ROWS строк;
+каждая пачка сразу пишется группой строк Parquet, так что память не
+зависит от размера таблиц. Снимок собирается во временном каталоге и
+переименовывается, когда готов целиком.
+
+Позиция снимка — граница ленты изменений (см. ChangeRepository.get_horizon),
+она записывается в manifest.json. Инкрементальный снимок содержит строки с
+change_seq из [позиция прошлого снимка, граница): их нужно применить поверх
+прежних данных по id, а удалённые записи перечислены в deleted. Связи с
+видами деятельности отбираются по изменённым организациям: их изменение
+помечает организацию триггером, а directory — по тем же правилам, что и
+обновление organization_search.
+
+Нужен пакет pyarrow. На шардированной установке снимок снимается с
+каждого шарда отдельно (--url).
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import time
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import Select, and_, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.activity.models import Activity, OrganizationActivity
+from src.building.models import Building
+from src.changes.models import ChangeTombstone
+from src.changes.repository import ChangeRepository
+from src.common.config import SNAPSHOT_CHUNK_ROWS, SNAPSHOT_DATABASE_URL, SNAPSHOT_DIR
+from src.common.database import create_engine, engine
+from src.common.logger import logger
+from src.organization.models import Organization, OrganizationPhone
+from src.organization.repository import OrganizationRepository
+
+MANIFEST = "manifest.json"
+
+
+def _changed(model):
+    def condition(since: int, until: int):
+        return and_(model.change_seq >= since, model.change_seq < until)
+
+    return condition
+
+
+def _array(column, order_by, *conditions, empty: str):
+    """Массив значений column по организации, пустой вместо NULL"""
+    return func.coalesce(
+        select(func.array_agg(aggregate_order_by(column, order_by)))
+        .where(*conditions)
+        .scalar_subquery(),
+        literal_column(empty),
+    )
+
+
+_activity_links = (
+    OrganizationActivity.organization_id == Organization.id,
+    Activity.id == OrganizationActivity.activity_id,
+)
+
+
+@dataclass(frozen=True)
+class Source:
+    name: str
+    stmt: Select
+    # Условие инкрементального снимка по [since, until)
+    changed: Callable
+    # Колонки Parquet: имя -> тип (см. _arrow_type)
+    columns: dict[str, str]
+
+
+SOURCES = (
+    Source(
+        "organizations",
+        select(
+            Organization.id,
+            Organization.name,
+            Organization.building_id,
+            Organization.version,
+            Organization.updated_at,
+            Organization.change_seq,
+        ),
+        _changed(Organization),
+        {
+            "id": "int64",
+            "name": "string",
+            "building_id": "int64",
+            "version": "int64",
+            "updated_at": "timestamp",
+            "change_seq": "int64",
+        },
+    ),
+    Source(
+        "buildings",
+        select(
+            Building.id,
+            Building.address,
+            Building.latitude,
+            Building.longitude,
+            Building.version,
+            Building.updated_at,
+            Building.change_seq,
+        ),
+        _changed(Building),
+        {
+            "id": "int64",
+            "address": "string",
+            "latitude": "float64",
+            "longitude": "float64",
+            "version": "int64",
+            "updated_at": "timestamp",
+            "change_seq": "int64",
+        },
+    ),
+    Source(
+        "activities",
+        select(
+            Activity.id,
+            Activity.name,
+            Activity.parent_id,
+            Activity.version,
+            Activity.updated_at,
+            Activity.change_seq,
+        ),
+        _changed(Activity),
+        {
+            "id": "int64",
+            "name": "string",
+            "parent_id": "int64",
+            "version": "int64",
+            "updated_at": "timestamp",
+            "change_seq": "int64",
+        },
+    ),
+    Source(
+        "organization_phones",
+        select(
+            OrganizationPhone.id,
+            OrganizationPhone.organization_id,
+            OrganizationPhone.phone,
+            OrganizationPhone.phone_digits,
+            OrganizationPhone.change_seq,
+        ),
+        _changed(OrganizationPhone),
+        {
+            "id": "int64",
+            "organization_id": "int64",
+            "phone": "string",
+            "phone_digits": "string",
+            "change_seq": "int64",
+        },
+    ),
+    Source(
+        "organization_activities",
+        select(OrganizationActivity.organization_id, OrganizationActivity.activity_id),
+        lambda since, until: OrganizationActivity.organization_id.in_(
+            select(Organization.id).where(_changed(Organization)(since, until))
+        ),
+        {"organization_id": "int64", "activity_id": "int64"},
+    ),
+    Source(
+        "directory",
+        select(
+            Organization.id,
+            Organization.name,
+            Organization.building_id,
+            Building.address,
+            Building.latitude,
+            Building.longitude,
+            _array(
+                Activity.id, Activity.id, *_activity_links, empty="'{}'::integer[]"
+            ).label("activity_ids"),
+            _array(
+                Activity.name, Activity.id, *_activity_links, empty="'{}'::varchar[]"
+            ).label("activity_names"),
+            _array(
+                OrganizationPhone.phone,
+                OrganizationPhone.id,
+                OrganizationPhone.organization_id == Organization.id,
+                empty="'{}'::varchar[]",
+            ).label("phones"),
+            Organization.change_seq,
+        ).join(Building, Building.id == Organization.building_id),
+        lambda since, until: Organization.id.in_(
+            OrganizationRepository().changed_organizations(since, until)
+        ),
+        {
+            "id": "int64",
+            "name": "string",
+            "building_id": "int64",
+            "address": "string",
+            "latitude": "float64",
+            "longitude": "float64",
+            "activity_ids": "list<int64>",
+            "activity_names": "list<string>",
+            "phones": "list<string>",
+            "change_seq": "int64",
+        },
+    ),
+)
+DELETED = Source(
+    "deleted",
+    select(ChangeTombstone.entity, ChangeTombstone.record_id, ChangeTombstone.change_seq),
+    _changed(ChangeTombstone),
+    {"entity": "string", "record_id": "int64", "change_seq": "int64"},
+)
+
+
+def source_statement(source: Source, since: int | None, until: int | None) -> Select:
+    """Запрос источника: все строки или изменённые в [since, until)"""
+    if since is None:
+        return source.stmt
+    return source.stmt.where(source.changed(since, until))
+
+
+async def stream_chunks(
+    conn: AsyncConnection, stmt: Select, chunk: int
+) -> AsyncIterator[list[tuple]]:
+    """Строки запроса пачками не больше chunk через серверный курсор"""
+    result = await conn.stream(stmt.execution_options(yield_per=chunk))
+    async for rows in result.partitions(chunk):
+        yield [tuple(row) for row in rows]
+
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Для снимков справочника требуется пакет pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def _arrow_type(pa, name: str):
+    if name.startswith("list<"):
+        return pa.list_(_arrow_type(pa, name[5:-1]))
+    if name == "timestamp":
+        return pa.timestamp("us", tz="UTC")
+    return getattr(pa, name)()
+
+
+async def write_source(
+    conn: AsyncConnection, source: Source, stmt: Select, path: Path, chunk: int
+) -> int:
+    """Пишет строки запроса в Parquet по пачке на группу строк, возвращает их число"""
+    pa, pq = _arrow()
+    schema = pa.schema(
+        [(name, _arrow_type(pa, type_)) for name, type_ in source.columns.items()]
+    )
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        async for batch in stream_chunks(conn, stmt, chunk):
+            columns = list(zip(*batch))
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema,
+                )
+            )
+            rows += len(batch)
+    return rows
+
+
+def last_position(directory: Path) -> int | None:
+    """Позиция последнего готового снимка в каталоге или None"""
+    positions = [
+        json.loads(manifest.read_text())["until"]
+        for manifest in directory.glob(f"*/{MANIFEST}")
+    ]
+    return max(positions, default=None)
+
+
+async def export(
+    conn: AsyncConnection, directory: Path, since: int | None, chunk: int
+) -> Path:
+    """Снимок в подкаталог directory, полный (since=None) или инкрементальный"""
+    until = await ChangeRepository().get_horizon(conn)
+    name = f"full-{until}" if since is None else f"incremental-{since}-{until}"
+    target = directory / name
+    partial = directory / f".{name}"
+    shutil.rmtree(partial, ignore_errors=True)
+    partial.mkdir(parents=True)
+
+    sources = SOURCES if since is None else (*SOURCES, DELETED)
+    tables = {}
+    for source in sources:
+        started = time.perf_counter()
+        tables[source.name] = await write_source(
+            conn,
+            source,
+            source_statement(source, since, until),
+            partial / f"{source.name}.parquet",
+            chunk,
+        )
+        logger.info(
+            f"Снимок {name}: {source.name} — {tables[source.name]} строк "
+            f"за {time.perf_counter() - started:.1f} с"
+        )
+    manifest = {"since": since, "until": until, "tables": tables}
+    (partial / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    partial.rename(target)
+    return target
+
+
+async def run(directory: Path, incremental: bool, since: int | None, chunk: int, url: str | None):
+    if incremental and since is None:
+        since = last_position(directory)
+        if since is None:
+            logger.info("Прошлых снимков нет, снимается полный")
+    source_engine = create_engine(url) if url else engine
+    try:
+        async with source_engine.connect() as conn:
+            # Один снимок БД на все таблицы, только чтение
+            await conn.execution_options(
+                isolation_level="REPEATABLE READ", postgresql_readonly=True
+            )
+            async with conn.begin():
+                target = await export(conn, directory, since, chunk)
+        logger.info(f"Снимок готов: {target}")
+    finally:
+        await source_engine.dispose()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Снимок справочника в Parquet")
+    parser.add_argument("--dir", type=Path, default=Path(SNAPSHOT_DIR))
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="только изменения с позиции последнего снимка в каталоге",
+    )
+    parser.add_argument("--since", type=int, help="позиция, с которой брать изменения")
+    parser.add_argument("--chunk", type=int, default=SNAPSHOT_CHUNK_ROWS)
+    parser.add_argument("--url", default=SNAPSHOT_DATABASE_URL, help="БД для чтения")
+    args = parser.parse_args()
+    await run(args.dir, args.incremental, args.since, args.chunk, args.url)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""Обвязка тестов: временная схема Postgres с миграциями и данными
+
+    pip install -r requirements-dev.txt
+    pytest                       # все тесты
+    pytest -m "not performance"  # без потолков запросов и времени
+
+Тесты подключаются к БД из TEST_DATABASE_URL (по умолчанию та же, что у
+приложения, переменные DB_*) и на время сессии создают схему test_<hex>:
+соединения тестового движка ищут таблицы в ней (search_path), миграции
+Alembic применяются туда же, а в конце схема удаляется. Без доступной БД
+тесты пропускаются.
+
+Каждый тест работает в транзакции, которая откатывается: коммиты
+репозиториев и сервисов становятся точками сохранения внутри неё, так что
+тесты не видят изменений друг друга.
+"""
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from pytest_asyncio import is_async_test
+from sqlalchemy import make_url, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.common.database import DATABASE_URL, create_session_maker
+from tests.data import Dataset, seed
+from tests.perf import QueryLog
+
+ROOT = Path(__file__).resolve().parent.parent
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", DATABASE_URL)
+
+
+def pytest_collection_modifyitems(items):
+    # Движок и данные живут всю сессию, поэтому и тесты выполняются в её
+    # event loop: соединения asyncpg привязаны к циклу, в котором открыты
+    marker = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(marker, append=False)
+
+
+def _upgrade(connection):
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
+
+@pytest.fixture(scope="session")
+async def engine():
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_async_engine(TEST_DATABASE_URL, poolclass=NullPool)
+    try:
+        async with admin.begin() as conn:
+            await conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    except (OSError, SQLAlchemyError) as e:
+        await admin.dispose()
+        url = make_url(TEST_DATABASE_URL).render_as_string(hide_password=True)
+        pytest.skip(f"Нет тестовой БД {url}: {e}")
+
+    test_engine = create_async_engine(
+        TEST_DATABASE_URL,
+        pool_size=5,
+        connect_args={"server_settings": {"search_path": f"{schema},public"}},
+    )
+    try:
+        async with test_engine.begin() as conn:
+            await conn.run_sync(_upgrade)
+        yield test_engine
+    finally:
+        await test_engine.dispose()
+        async with admin.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        await admin.dispose()
+
+
+@pytest.fixture(scope="session")
+async def dataset(engine) -> Dataset:
+    async with create_session_maker(engine)() as session:
+        return await seed(session)
+
+
+@pytest.fixture
+async def session(engine, dataset):
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        maker = create_session_maker(conn)
+        async with maker(join_transaction_mode="create_savepoint") as session:
+            yield session
+        await transaction.rollback()
+
+
+@pytest.fixture
+def sql(engine):
+    log = QueryLog(engine)
+    yield log
+    log.close()
@@ -0,0 +1,118 @@
+"""Детерминированный набор данных тестов
+
+Зерно и размеры фиксированы: потолки времени в test_performance подобраны
+под этот масштаб. Организации создаются через OrganizationRepository, так
+что документы organization_search собираются тем же кодом, что в API.
+"""
+import random
+from dataclasses import dataclass, field
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.activity.models import Activity
+from src.building.models import Building
+from src.organization.repository import OrganizationRepository
+
+SEED = 20240601
+BUILDINGS = 200
+ORGANIZATIONS = 2000
+# Дерево видов деятельности: корни, их дети и внуки
+ACTIVITY_FANOUT = (5, 4, 3)
+# Здания вокруг Москвы
+CENTER = (55.75, 37.62)
+SPREAD = 0.5
+BATCH_SIZE = 500
+
+
+@dataclass
+class Dataset:
+    buildings: dict[int, tuple[float, float]]
+    parents: dict[int, int | None]
+    organization_ids: list[int]
+    phones: list[str]
+    roots: list[int] = field(init=False)
+    leaves: list[int] = field(init=False)
+
+    def __post_init__(self):
+        self.roots = [id for id, parent in self.parents.items() if parent is None]
+        with_children = set(self.parents.values())
+        self.leaves = [id for id in self.parents if id not in with_children]
+
+    def subtree(self, activity_id: int) -> set[int]:
+        """Вид деятельности и все его потомки"""
+        subtree = {activity_id}
+        for id in self.parents:
+            current = id
+            while current is not None and current not in subtree:
+                current = self.parents[current]
+            if current is not None:
+                subtree.add(id)
+        return subtree
+
+
+def phone(index: int) -> str:
+    return f"+7 (900) {index // 10000:03d}-{index % 10000:04d}"
+
+
+async def _insert(session: AsyncSession, model, rows: list[dict]) -> list[int]:
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list((await session.execute(stmt, rows)).scalars().all())
+
+
+async def seed(session: AsyncSession) -> Dataset:
+    rng = random.Random(SEED)
+
+    coordinates = [
+        (
+            round(CENTER[0] + rng.uniform(-SPREAD, SPREAD), 6),
+            round(CENTER[1] + rng.uniform(-SPREAD, SPREAD), 6),
+        )
+        for _ in range(BUILDINGS)
+    ]
+    building_ids = await _insert(
+        session,
+        Building,
+        [
+            {"address": f"г. Москва, Тестовая ул., {i}", "latitude": lat, "longitude": lon}
+            for i, (lat, lon) in enumerate(coordinates, start=1)
+        ],
+    )
+
+    parents: dict[int, int | None] = {}
+    level: list[int | None] = [None]
+    for depth, fanout in enumerate(ACTIVITY_FANOUT):
+        rows = [
+            {"name": f"Вид {depth}.{n}", "parent_id": parent}
+            for n, parent in enumerate(p for p in level for _ in range(fanout))
+        ]
+        ids = await _insert(session, Activity, rows)
+        parents.update(zip(ids, (row["parent_id"] for row in rows)))
+        level = ids
+    await session.commit()
+    activity_ids = list(parents)
+
+    repository = OrganizationRepository()
+    organization_ids: list[int] = []
+    phones: list[str] = []
+    for start in range(0, ORGANIZATIONS, BATCH_SIZE):
+        items = []
+        for i in range(start, min(start + BATCH_SIZE, ORGANIZATIONS)):
+            numbers = [phone(2 * i)] + ([phone(2 * i + 1)] if i % 3 == 0 else [])
+            phones.extend(numbers)
+            items.append(
+                {
+                    "name": f"ООО Тест {i}",
+                    "building_id": rng.choice(building_ids),
+                    "phones": [{"phone": number} for number in numbers],
+                    "activity_ids": rng.sample(activity_ids, rng.randint(1, 3)),
+                }
+            )
+        organization_ids.extend(await repository.create_many(session, items))
+
+    return Dataset(
+        buildings=dict(zip(building_ids, coordinates)),
+        parents=parents,
+        organization_ids=organization_ids,
+        phones=phones,
+    )
@@ -0,0 +1,144 @@
+"""Проверки производительности в тестах: число SQL-запросов и время ответа
+
+Потолок числа запросов ловит N+1 (например, потерянный selectinload):
+при превышении тест падает с diff выполненного SQL против эталона. Эталон —
+запросы того же вызова на одной строке, так что лишние запросы на каждую
+строку страницы видны в diff строками «+».
+
+Потолки времени подобраны под набор данных tests.data; на медленной
+машине их можно ослабить множителем TEST_LATENCY_FACTOR.
+"""
+import difflib
+import gc
+import os
+import re
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+LATENCY_FACTOR = float(os.getenv("TEST_LATENCY_FACTOR", "1"))
+
+_PARAM = re.compile(r"\$\d+(?:::\w+(?:\[\])?)?")
+_IN_LIST = re.compile(r"IN \((?:\?, )*\?\)")
+_SPACES = re.compile(r"\s+")
+# Точки сохранения открывает обвязка теста (см. фикстуру session)
+_HARNESS = re.compile(r"(RELEASE |ROLLBACK TO )?SAVEPOINT ", re.IGNORECASE)
+
+
+def normalize(statement: str) -> str:
+    """Текст запроса без значений и длины списков IN"""
+    statement = _PARAM.sub("?", _SPACES.sub(" ", statement))
+    return _IN_LIST.sub("IN (...)", statement).strip()
+
+
+class QueryLog:
+    """Запросы, которые движок отправил в БД внутри capture()"""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine.sync_engine
+        self._active: list[list[str]] = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if _HARNESS.match(statement):
+            return
+        for captured in self._active:
+            captured.append(statement)
+
+    @contextmanager
+    def capture(self):
+        captured: list[str] = []
+        self._active.append(captured)
+        try:
+            yield captured
+        finally:
+            self._active.remove(captured)
+
+    async def run(self, session: AsyncSession, call: Callable[[], Awaitable]) -> list[str]:
+        """Запросы одного вызова с пустой identity map сессии
+
+        Иначе selectinload связи многие-к-одному пропускает уже загруженные
+        объекты, и число запросов зависит от предыдущих вызовов.
+        """
+        session.expunge_all()
+        with self.capture() as captured:
+            await call()
+        return captured
+
+    def close(self):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def assert_max_queries(
+    queries: list[str], limit: int, baseline: list[str] | None = None
+):
+    """Не больше limit запросов, иначе падение с diff выполненного SQL
+
+    baseline — запросы эталонного вызова; без него diff показывает
+    запросы сверх первых limit.
+    """
+    if len(queries) <= limit:
+        return
+    expected = baseline if baseline is not None else queries[:limit]
+    diff = difflib.unified_diff(
+        [normalize(q) for q in expected],
+        [normalize(q) for q in queries],
+        "ожидалось",
+        "выполнено",
+        lineterm="",
+    )
+    pytest.fail(
+        f"Выполнено запросов: {len(queries)}, допустимо: {limit}\n" + "\n".join(diff),
+        pytrace=False,
+    )
+
+
+async def assert_no_n_plus_one(
+    sql: QueryLog,
+    session: AsyncSession,
+    call: Callable[[int], Awaitable],
+    limit: int,
+    rows: int = 20,
+):
+    """Страница из rows строк стоит столько же запросов, сколько из одной"""
+    baseline = await sql.run(session, lambda: call(1))
+    assert_max_queries(baseline, limit)
+    assert_max_queries(await sql.run(session, lambda: call(rows)), len(baseline), baseline)
+
+
+async def assert_latency(
+    call: Callable[[], Awaitable], ceiling_ms: float, repeat: int = 30, warm_up: int = 3
+):
+    """95-й перцентиль времени вызова не выше ceiling_ms × TEST_LATENCY_FACTOR
+
+    Как и timeit, замер идёт с выключенной сборкой мусора: полный проход
+    по объектам, накопленным предыдущими тестами, иначе попадает в случайный
+    вызов и определяет p95.
+    """
+    for _ in range(warm_up):
+        await call()
+    samples = []
+    collecting = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await call()
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        if collecting:
+            gc.enable()
+    p95 = statistics.quantiles(samples, n=20)[-1]
+    ceiling = ceiling_ms * LATENCY_FACTOR
+    if p95 > ceiling:
+        pytest.fail(
+            f"p95 {p95:.1f} мс выше потолка {ceiling:.0f} мс "
+            f"(медиана {statistics.median(samples):.1f} мс)",
+            pytrace=False,
+        )
@@ -0,0 +1,162 @@
+import pytest
+
+from src.activity.repository import ActivityRepository
+from src.activity.schemas import (
+    ActivityCreateSchema,
+    ActivityRestructureSchema,
+    ActivityUpdateSchema,
+)
+from src.activity.service import ActivityService
+from src.activity.tree import check_moves
+from src.common.config import ACTIVITY_MAX_DEPTH
+from src.common.exceptions import (
+    ActivityDepthExceededException,
+    ActivityNotFoundException,
+    CircularDependencyException,
+    DuplicateActivityNameException,
+    ParentActivityNotFoundException,
+)
+from src.organization.repository import OrganizationRepository
+
+
+@pytest.fixture
+def service():
+    return ActivityService(repository=ActivityRepository())
+
+
+async def test_get_activity_with_children(session, service, dataset):
+    root = dataset.roots[0]
+
+    activity = await service.get_activity(session, root)
+
+    assert set(activity.children_ids) == {
+        id for id, parent in dataset.parents.items() if parent == root
+    }
+
+
+async def test_create_under_missing_parent(session, service):
+    with pytest.raises(ParentActivityNotFoundException):
+        await service.create_activity(
+            session, ActivityCreateSchema(name="Сироты", parent_id=0)
+        )
+
+
+async def test_create_duplicate_name(session, service, dataset):
+    name = (await service.get_activity(session, dataset.roots[0])).name
+
+    with pytest.raises(DuplicateActivityNameException):
+        await service.create_activity(session, ActivityCreateSchema(name=name))
+
+
+async def test_move_into_own_subtree(session, service, dataset):
+    root = dataset.roots[0]
+    descendant = next(
+        id for id in dataset.leaves if id != root and id in dataset.subtree(root)
+    )
+
+    with pytest.raises(CircularDependencyException):
+        await service.update_activity(
+            session, root, ActivityUpdateSchema(parent_id=descendant)
+        )
+
+
+async def test_move_to_other_root(session, service, dataset):
+    leaf = dataset.leaves[0]
+    target = next(id for id in dataset.roots if leaf not in dataset.subtree(id))
+
+    moved = await service.update_activity(
+        session, leaf, ActivityUpdateSchema(parent_id=target)
+    )
+
+    assert moved.parent_id == target
+
+
+def _depth(dataset, activity_id):
+    depth = 0
+    while activity_id is not None:
+        depth += 1
+        activity_id = dataset.parents[activity_id]
+    return depth
+
+
+def _children(dataset, activity_id):
+    return [id for id, parent in dataset.parents.items() if parent == activity_id]
+
+
+async def _organizations_under(session, activity_id):
+    """Организации поддерева по документам organization_search"""
+    organizations = await OrganizationRepository().find_by_activity_tree(
+        session, activity_id, limit=None
+    )
+    return {org.id for org in organizations}
+
+
+async def test_create_deeper_than_max_depth(session, service, dataset):
+    leaf = max(dataset.leaves, key=lambda id: _depth(dataset, id))
+    assert _depth(dataset, leaf) == ACTIVITY_MAX_DEPTH
+
+    with pytest.raises(ActivityDepthExceededException):
+        await service.create_activity(
+            session, ActivityCreateSchema(name="Слишком глубоко", parent_id=leaf)
+        )
+
+
+async def test_move_subtree_deeper_than_max_depth(session, service, dataset):
+    root, other = dataset.roots[:2]
+
+    with pytest.raises(ActivityDepthExceededException):
+        await service.update_activity(
+            session, root, ActivityUpdateSchema(parent_id=other)
+        )
+
+
+async def test_move_refreshes_search_in_same_transaction(session, service, dataset):
+    leaf = dataset.leaves[0]
+    target = next(id for id in dataset.roots if leaf not in dataset.subtree(id))
+    before = await _organizations_under(session, leaf)
+    assert before and not before <= await _organizations_under(session, target)
+
+    await service.update_activity(session, leaf, ActivityUpdateSchema(parent_id=target))
+
+    assert before <= await _organizations_under(session, target)
+
+
+async def test_restructure_applies_dependent_moves(session, service, dataset):
+    middle = _children(dataset, dataset.roots[0])[0]
+    grandchild = _children(dataset, middle)[0]
+    leaf = next(id for id in dataset.leaves if id not in dataset.subtree(middle))
+    # Лист встаёт на третий уровень только потому, что middle поднят в корень
+    moves = [{"id": middle, "parent_id": None}, {"id": leaf, "parent_id": grandchild}]
+
+    moved = await service.restructure(session, ActivityRestructureSchema(moves=moves))
+
+    assert {(a.id, a.parent_id) for a in moved} == {(middle, None), (leaf, grandchild)}
+    assert await _organizations_under(session, leaf) <= await _organizations_under(
+        session, middle
+    )
+
+
+async def test_restructure_rejects_cycle(session, service, dataset):
+    first, second = dataset.roots[:2]
+    moves = [
+        {"id": first, "parent_id": _children(dataset, second)[0]},
+        {"id": second, "parent_id": _children(dataset, first)[0]},
+    ]
+
+    with pytest.raises(CircularDependencyException):
+        await service.restructure(session, ActivityRestructureSchema(moves=moves))
+
+
+def test_check_moves_in_memory():
+    # 1 -> 2 -> 3 и отдельный корень 4
+    parents = {1: None, 2: 1, 3: 2, 4: None}
+
+    assert check_moves(parents, {4: 3}, max_depth=4)[4] == 3
+    with pytest.raises(ActivityDepthExceededException):
+        check_moves(parents, {4: 3}, max_depth=3)
+    with pytest.raises(CircularDependencyException):
+        check_moves(parents, {1: 3}, max_depth=10)
+    with pytest.raises(ActivityNotFoundException):
+        check_moves(parents, {5: None}, max_depth=3)
+    with pytest.raises(ParentActivityNotFoundException):
+        check_moves(parents, {4: 5}, max_depth=3)
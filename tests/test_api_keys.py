@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from src.common import verify_key
+from src.common.api_keys import (
+    ApiKey,
+    ApiKeyStore,
+    InMemoryRateLimiter,
+    hash_api_key,
+)
+from src.common.exceptions import QuotaExceededException, RateLimitExceededException
+
+
+def _write_keys(path, *keys: tuple[str, str], mtime: float):
+    records = [{"name": name, "key_hash": hash_api_key(key)} for name, key in keys]
+    path.write_text(json.dumps(records), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def keys_file(tmp_path):
+    path = tmp_path / "keys.json"
+    _write_keys(path, ("partner-a", "ключ-a"), mtime=1_000)
+    return path
+
+
+async def test_unknown_key_rejected(monkeypatch, keys_file):
+    store = ApiKeyStore(path=str(keys_file))
+    monkeypatch.setattr(verify_key, "api_key_store", store)
+    monkeypatch.setattr(verify_key, "rate_limiter", InMemoryRateLimiter())
+
+    assert (await verify_key.verify_api_key("ключ-a")).name == "partner-a"
+    with pytest.raises(HTTPException) as rejected:
+        await verify_key.verify_api_key("ключ-b")
+    assert rejected.value.status_code == 401
+
+
+def test_changed_file_reloaded(keys_file):
+    store = ApiKeyStore(path=str(keys_file), reload_interval=0)
+    assert store.authenticate("ключ-a") is not None
+
+    _write_keys(keys_file, ("partner-b", "ключ-b"), mtime=2_000)
+
+    assert store.authenticate("ключ-a") is None
+    assert store.authenticate("ключ-b").name == "partner-b"
+
+
+def test_broken_file_keeps_loaded_keys(keys_file):
+    store = ApiKeyStore(path=str(keys_file), reload_interval=0)
+    store.load()
+
+    keys_file.write_text("[{", encoding="utf-8")
+    os.utime(keys_file, (2_000, 2_000))
+
+    assert store.authenticate("ключ-a").name == "partner-a"
+
+
+def test_reload_waits_for_interval(keys_file):
+    store = ApiKeyStore(path=str(keys_file), reload_interval=3600)
+    store.load()
+
+    _write_keys(keys_file, ("partner-b", "ключ-b"), mtime=2_000)
+
+    assert store.authenticate("ключ-a") is not None
+    assert store.authenticate("ключ-b") is None
+
+
+async def test_token_bucket_limits_burst():
+    limiter = InMemoryRateLimiter()
+    key = ApiKey(name="partner-a", key_hash="", rate=0.5, burst=2)
+    other = ApiKey(name="partner-b", key_hash="", rate=0.5, burst=2)
+
+    await limiter.acquire(key)
+    await limiter.acquire(key)
+    with pytest.raises(RateLimitExceededException) as limited:
+        await limiter.acquire(key)
+    # Корзина у каждого ключа своя
+    await limiter.acquire(other)
+
+    assert limited.value.status_code == 429
+    assert limited.value.headers == {"Retry-After": "2"}
+
+
+async def test_quota_per_period():
+    limiter = InMemoryRateLimiter(quota_period=3600)
+    key = ApiKey(name="partner-a", key_hash="", quota=2)
+
+    await limiter.acquire(key)
+    await limiter.acquire(key)
+    with pytest.raises(QuotaExceededException) as exhausted:
+        await limiter.acquire(key)
+
+    assert exhausted.value.status_code == 429
+    assert 0 < int(exhausted.value.headers["Retry-After"]) <= 3600
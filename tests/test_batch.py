@@ -0,0 +1,67 @@
+import pytest
+from pydantic import ValidationError
+
+from src.batch.dependencies import batch_service
+from src.batch.schemas import BatchRequestSchema
+from src.common.config import BATCH_MAX_COST
+from src.common.exceptions import BatchTooComplexException
+
+
+@pytest.fixture
+def service():
+    return batch_service()
+
+
+async def test_batch_with_includes(session, service, dataset):
+    org_ids = dataset.organization_ids[:3]
+    child = next(id for id, parent in dataset.parents.items() if parent is not None)
+    building_id = next(iter(dataset.buildings))
+
+    response = await service.execute(
+        session,
+        BatchRequestSchema(
+            queries=[
+                {
+                    "entity": "organization",
+                    "ids": [*org_ids, 0],
+                    "include": ["building", "activities"],
+                },
+                {"entity": "activity", "ids": [child], "include": ["parent"]},
+                {"entity": "building", "ids": [building_id]},
+            ]
+        ),
+    )
+
+    organizations, activities, buildings = response["results"]
+    assert [org and org["id"] for org in organizations] == [*org_ids, None]
+    for org in organizations[:-1]:
+        assert org["building"]["id"] == org["building_id"]
+        assert {a["id"] for a in org["activities"]} == set(org["activity_ids"])
+        assert all("phone" in phone for phone in org["phones"])
+    assert activities[0]["parent"]["id"] == dataset.parents[child]
+    assert buildings[0]["id"] == building_id
+
+
+async def test_batch_cost_limit(session, service, dataset):
+    ids = list(range(1, BATCH_MAX_COST // 3 + 2))
+
+    with pytest.raises(BatchTooComplexException):
+        await service.execute(
+            session,
+            BatchRequestSchema(
+                queries=[
+                    {
+                        "entity": "organization",
+                        "ids": ids,
+                        "include": ["building", "activities"],
+                    }
+                ]
+            ),
+        )
+
+
+def test_batch_unknown_include():
+    with pytest.raises(ValidationError):
+        BatchRequestSchema(
+            queries=[{"entity": "building", "ids": [1], "include": ["organizations"]}]
+        )
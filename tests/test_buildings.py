@@ -0,0 +1,33 @@
+import pytest
+
+from src.building.repository import BuildingRepository
+from src.building.service import BuildingService
+from src.common.exceptions import BuildingNotFoundException, InvalidBuildingDataException
+
+
+@pytest.fixture
+def service():
+    return BuildingService(repository=BuildingRepository())
+
+
+async def test_buildings_in_radius(session, service, dataset):
+    lat, lon = next(iter(dataset.buildings.values()))
+    expected = {
+        id
+        for id, (b_lat, b_lon) in dataset.buildings.items()
+        if abs(b_lat - lat) <= 0.1 and abs(b_lon - lon) <= 0.1
+    }
+
+    buildings = await service.get_buildings_in_radius(session, lat, lon, 0.1)
+
+    assert {building.id for building in buildings} == expected
+
+
+async def test_invalid_bbox(session, service):
+    with pytest.raises(InvalidBuildingDataException):
+        await service.get_buildings_in_bbox(session, 56, 55, 37, 38)
+
+
+async def test_missing_building(session, service):
+    with pytest.raises(BuildingNotFoundException):
+        await service.get_building(session, 0)
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from src.changes.repository import ChangeRepository
+from src.changes.schemas import ChangeCursor
+from src.changes.service import ChangeService
+from src.common.exceptions import InvalidChangeCursorException
+from src.organization.repository import OrganizationRepository
+
+
+@pytest.fixture
+def changes():
+    return ChangeRepository()
+
+
+async def _events(session, changes, cursor, horizon, limit=1000):
+    return [
+        row async for row in changes.stream_changes(session, cursor, horizon, limit)
+    ]
+
+
+async def _changed(session, dataset):
+    """Изменения одной транзакции теста: номер транзакции и id организаций
+
+    Коммиты в тестах — точки сохранения, поэтому все события получают номер
+    внешней транзакции, а граница ленты берётся сразу за ним.
+    """
+    repository = OrganizationRepository()
+    changed_id, deleted_id = dataset.organization_ids[10:12]
+    await repository.update_one(session, changed_id, {"name": "ООО Лента"})
+    await repository.delete_one(session, deleted_id)
+    conn = await session.connection()
+    xid = (
+        await conn.execute(text("SELECT pg_current_xact_id()::text::bigint"))
+    ).scalar_one()
+    return xid, changed_id, deleted_id
+
+
+async def test_feed_has_upserts_and_tombstones(session, changes, dataset):
+    xid, changed_id, deleted_id = await _changed(session, dataset)
+
+    rows = await _events(session, changes, ChangeCursor(xid - 1), xid + 1)
+    events = {
+        (e["op"], e["entity"], e["id"]): e
+        for e in map(json.loads, (r.event for r in rows))
+    }
+
+    assert events[("upsert", "organization", changed_id)]["data"]["name"] == "ООО Лента"
+    assert ("delete", "organization", deleted_id) in events
+    assert ("upsert", "organization", deleted_id) not in events
+    assert all(event["seq"] == xid for event in events.values())
+
+
+async def test_feed_stops_at_horizon(session, changes, dataset):
+    xid, _, _ = await _changed(session, dataset)
+
+    # Транзакция ещё не завершена: до границы xid её события не отдаются
+    assert await _events(session, changes, ChangeCursor(xid - 1), xid) == []
+    assert await _events(session, changes, ChangeCursor(xid), xid + 1) == []
+
+
+async def test_cursor_resumes_inside_transaction(session, changes, dataset):
+    xid, _, _ = await _changed(session, dataset)
+    everything = await _events(session, changes, ChangeCursor(xid - 1), xid + 1)
+
+    pages, cursor = [], ChangeCursor(xid - 1)
+    while page := await _events(session, changes, cursor, xid + 1, limit=2):
+        pages += page
+        last = page[-1]
+        cursor = ChangeCursor.parse(
+            str(ChangeCursor(last.change_seq, last.entity, last.id))
+        )
+
+    assert len(everything) > 2
+    assert [row.event for row in pages] == [row.event for row in everything]
+
+
+def test_invalid_cursor_rejected():
+    service = ChangeService(repository=ChangeRepository(), notifier=None)
+
+    assert service.parse_cursor("42:organization:7") == ChangeCursor(
+        42, "organization", 7
+    )
+    with pytest.raises(InvalidChangeCursorException):
+        service.parse_cursor("42:organization")
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+
+from src.common.admission import AdmissionController, TimedQueuePool
+from src.common.config import DB_STATEMENT_TIMEOUT_MS, DB_STATEMENT_TIMEOUTS
+from src.common.database import (
+    create_session_maker,
+    get_async_session,
+    statement_timeout,
+)
+from src.common.exceptions import DatabaseOverloadedException
+
+
+@pytest.fixture
+async def small_pool(engine):
+    """Движок с пулом из одного соединения и коротким ожиданием"""
+    pool_engine = create_async_engine(
+        engine.url,
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.2,
+    )
+    yield pool_engine
+    await pool_engine.dispose()
+
+
+async def test_admission_rejects_when_pool_saturated(small_pool):
+    controller = AdmissionController(max_wait_ms=10)
+    pool = small_pool.pool
+
+    async with small_pool.connect():
+        with pytest.raises(TimeoutError):
+            async with small_pool.connect():
+                pass
+        assert pool.saturated and pool.wait_ms >= 10
+
+        with pytest.raises(DatabaseOverloadedException) as rejected:
+            controller.admit(pool)
+
+    assert rejected.value.status_code == 503
+    assert rejected.value.headers == {"Retry-After": "1"}
+    # Соединение вернулось в пул: ожидание ещё высокое, но запрос принимается
+    assert not pool.saturated
+    controller.admit(pool)
+
+
+async def test_admission_disabled_by_zero_wait(small_pool):
+    async with small_pool.connect():
+        small_pool.pool.wait_ms = 1000
+        AdmissionController(max_wait_ms=0).admit(small_pool.pool)
+
+
+async def _route_timeout(path: str | None) -> int | None:
+    scope = {"type": "http", "route": path and SimpleNamespace(path=path)}
+    sessions = get_async_session(Request(scope))
+    await anext(sessions)
+    await sessions.aclose()
+    return statement_timeout.get()
+
+
+async def test_statement_timeout_per_route():
+    # Каждый вызов в своей задаче: значение ContextVar не переходит в тест
+    route, other, outside = await asyncio.gather(
+        asyncio.create_task(_route_timeout("/api/organizations")),
+        asyncio.create_task(_route_timeout("/api/buildings")),
+        asyncio.create_task(_route_timeout(None)),
+    )
+
+    assert route == DB_STATEMENT_TIMEOUTS["/api/organizations"]
+    assert other == outside == DB_STATEMENT_TIMEOUT_MS
+    assert statement_timeout.get() is None
+
+
+async def _run_limited(engine, timeout_ms: int, sql: str):
+    statement_timeout.set(timeout_ms)
+    async with create_session_maker(engine)() as session:
+        setting = (await session.execute(text("SHOW statement_timeout"))).scalar_one()
+        await session.execute(text(sql))
+        return setting
+
+
+async def test_statement_timeout_cancels_slow_query(engine):
+    with pytest.raises(DBAPIError, match="statement timeout"):
+        await asyncio.create_task(_run_limited(engine, 50, "SELECT pg_sleep(1)"))
+
+    setting = await asyncio.create_task(_run_limited(engine, 50, "SELECT 1"))
+    async with engine.connect() as conn:
+        default = (await conn.execute(text("SHOW statement_timeout"))).scalar_one()
+
+    assert setting == "50ms"
+    # SET LOCAL не переживает транзакцию: соединение возвращается без лимита
+    assert default == "0"
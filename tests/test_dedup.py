@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy import delete, func, or_, select, text
+
+from src.common.database import create_session_maker
+from src.common.exceptions import DuplicateOrganizationMissingException
+from src.dedup import job
+from src.dedup.dependencies import duplicate_service
+from src.dedup.models import CANDIDATE_MERGED, CANDIDATE_OBSOLETE, DuplicateCandidate
+from src.organization.models import Organization
+from src.organization.repository import OrganizationRepository
+from tests.data import phone
+
+# Почти одинаковые названия и постороннее название в том же здании
+DUPLICATE_NAMES = ("Кофейня Ромашка на Арбате", "Кофейня Ромашка, Арбат")
+OTHER_NAME = "Автосервис Гараж 24"
+
+
+@pytest.fixture
+def service():
+    return duplicate_service()
+
+
+async def _candidate(session, left_id: int, right_id: int) -> int:
+    candidate = DuplicateCandidate(
+        left_id=left_id, right_id=right_id, score=0.9, reason="building"
+    )
+    session.add(candidate)
+    await session.flush()
+    return candidate.id
+
+
+async def test_merge_moves_phones(session, service, dataset):
+    keep_id, drop_id = dataset.organization_ids[:2]
+    candidate_id = await _candidate(session, keep_id, drop_id)
+
+    merged = await service.merge_candidate(session, candidate_id)
+
+    assert merged.id == keep_id
+    assert {p.phone for p in merged.phones} == {phone(0), phone(1), phone(2)}
+    merged_candidates = await service.repository.find_all(session, CANDIDATE_MERGED)
+    assert [candidate.id for candidate in merged_candidates] == [candidate_id]
+
+
+async def test_merge_with_deleted_organization(session, service, dataset):
+    candidate_id = await _candidate(session, 0, dataset.organization_ids[0])
+
+    with pytest.raises(DuplicateOrganizationMissingException):
+        await service.merge_candidate(session, candidate_id)
+    obsolete = await service.repository.find_all(session, CANDIDATE_OBSOLETE)
+    assert [candidate.id for candidate in obsolete] == [candidate_id]
+
+
+@pytest.fixture
+async def job_organizations(engine, dataset):
+    """Организации для задачи поиска дубликатов, зафиксированные в БД
+
+    Задача работает в своих соединениях и транзакциях, поэтому данные не
+    могут лежать в откатываемой транзакции теста; после теста они и
+    найденные пары удаляются.
+    """
+    async with engine.connect() as conn:
+        trgm = await conn.scalar(
+            text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")
+        )
+    if not trgm:
+        pytest.skip("Нет расширения pg_trgm")
+
+    building_id = next(iter(dataset.buildings))
+    items = [
+        {"name": name, "building_id": building_id, "phones": [], "activity_ids": []}
+        for name in (*DUPLICATE_NAMES, OTHER_NAME)
+    ]
+    async with create_session_maker(engine)() as session:
+        ids = await OrganizationRepository().create_many(session, items)
+    yield ids
+    async with engine.begin() as conn:
+        await conn.execute(delete(DuplicateCandidate))
+        await conn.execute(delete(Organization).where(Organization.id.in_(ids)))
+
+
+async def test_job_finds_duplicate_pair(monkeypatch, engine, job_organizations):
+    left_id, right_id, other_id = job_organizations
+    monkeypatch.setattr(job, "engine", engine)
+    found = (
+        select(DuplicateCandidate.left_id, DuplicateCandidate.right_id)
+        .where(
+            or_(
+                DuplicateCandidate.left_id.in_(job_organizations),
+                DuplicateCandidate.right_id.in_(job_organizations),
+            )
+        )
+        .order_by(DuplicateCandidate.id)
+    )
+
+    await job.run(shards=2, name_threshold=0.5, geo_threshold=0.8, cell=0.005)
+    async with engine.connect() as conn:
+        pairs = (await conn.execute(found)).all()
+        total = await conn.scalar(select(func.count()).select_from(DuplicateCandidate))
+    # Повторный запуск не дублирует уже найденные пары
+    await job.run(shards=2, name_threshold=0.5, geo_threshold=0.8, cell=0.005)
+    async with engine.connect() as conn:
+        rerun_total = await conn.scalar(
+            select(func.count()).select_from(DuplicateCandidate)
+        )
+
+    assert (left_id, right_id) in pairs
+    assert all(other_id not in pair for pair in pairs)
+    assert rerun_total == total
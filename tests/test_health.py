@@ -0,0 +1,47 @@
+import asyncio
+
+from src.common.health import Readiness
+
+
+class FlakyReadiness(Readiness):
+    """Прогрев без БД: первые failures попыток падают, каждая длится delay"""
+
+    def __init__(self, failures: int, delay: float = 0, retry_seconds: float = 60):
+        super().__init__(retry_seconds=retry_seconds)
+        self.shards = ["primary"]
+        self.failures = failures
+        self.delay = delay
+        self.attempts = 0
+
+    async def _warm_up_shard(self, shard):
+        self.attempts += 1
+        await asyncio.sleep(self.delay)
+        if self.attempts <= self.failures:
+            raise ConnectionError("БД недоступна")
+
+
+async def test_probes_do_not_start_second_warm_up():
+    readiness = FlakyReadiness(failures=0, delay=0.05, retry_seconds=0)
+
+    startup = asyncio.create_task(readiness.warm_up())
+    await asyncio.sleep(0)
+    await asyncio.gather(*(readiness.retry() for _ in range(5)))
+    await startup
+
+    assert readiness.attempts == 1
+    assert readiness.ready
+
+
+async def test_failed_warm_up_retried_after_interval():
+    readiness = FlakyReadiness(failures=1)
+
+    await readiness.warm_up()
+    await readiness.retry()
+
+    assert (readiness.attempts, readiness.ready) == (1, False)
+    assert "БД недоступна" in readiness.reason
+
+    readiness.retry_seconds = 0
+    await readiness.retry()
+
+    assert (readiness.attempts, readiness.ready) == (2, True)
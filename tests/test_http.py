@@ -0,0 +1,126 @@
+import gzip
+import json
+
+import pytest
+from starlette.datastructures import Headers
+from starlette.requests import Request
+
+from src.changes.notifier import change_notifier
+from src.common.compression import ENCODINGS, CompressionMiddleware, negotiate
+from src.common.conditional import ETagMiddleware, conditional_get
+from src.common.exceptions import NotModifiedException
+
+BODY = json.dumps([{"id": i, "name": f"ООО {i}"} for i in range(100)]).encode()
+
+
+def _scope(headers: dict[str, str] | None = None, method: str = "GET") -> dict:
+    return {
+        "type": "http",
+        "method": method,
+        "path": "/api/buildings",
+        "headers": [
+            (k.lower().encode(), v.encode()) for k, v in (headers or {}).items()
+        ],
+    }
+
+
+def _json_app(*chunks: bytes, status: int = 200):
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        for i, chunk in enumerate(chunks):
+            more = i < len(chunks) - 1
+            await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+    return app
+
+
+async def _call(app, scope) -> tuple[int, Headers, bytes]:
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    await app(scope, receive, send)
+    start, *bodies = messages
+    body = b"".join(message.get("body", b"") for message in bodies)
+    return start["status"], Headers(raw=start.get("headers", [])), body
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip;q=0.5, br;q=0.8", "br"),
+        ("gzip, br, zstd", ENCODINGS[0]),
+        ("gzip;q=0", None),
+        ("deflate, identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate_by_quality(accept, expected):
+    assert negotiate(accept) == expected
+
+
+async def test_json_compressed_for_accepted_encoding():
+    app = CompressionMiddleware(_json_app(BODY), minimum_size=500)
+
+    status, headers, body = await _call(app, _scope({"Accept-Encoding": "gzip"}))
+
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body) < len(BODY)
+    assert gzip.decompress(body) == BODY
+
+
+@pytest.mark.parametrize(
+    "chunks, accept",
+    [
+        ((BODY[:100],), "gzip"),  # меньше minimum_size
+        ((BODY[:1000], BODY[1000:]), "gzip"),  # потоковый ответ
+        ((BODY,), "deflate"),  # кодировка не поддерживается
+    ],
+)
+async def test_passthrough_without_compression(chunks, accept):
+    app = CompressionMiddleware(_json_app(*chunks), minimum_size=500)
+
+    _, headers, body = await _call(app, _scope({"Accept-Encoding": accept}))
+
+    assert "content-encoding" not in headers
+    assert body == b"".join(chunks)
+
+
+async def test_conditional_get_answers_not_modified(monkeypatch):
+    monkeypatch.setattr(change_notifier, "versions", {"buildings": 7})
+    check = conditional_get(("buildings",)).dependency
+
+    fresh = Request(_scope())
+    await check(fresh)
+    with pytest.raises(NotModifiedException) as matched:
+        await check(Request(_scope({"If-None-Match": '"5", W/"7"'})))
+    await check(Request(_scope({"If-None-Match": 'W/"6"'})))
+
+    assert fresh.state.etag == 'W/"7"'
+    assert matched.value.status_code == 304
+    assert matched.value.headers == {"ETag": 'W/"7"'}
+
+
+async def test_etag_added_to_successful_get():
+    async def endpoint(scope, receive, send):
+        scope.setdefault("state", {})["etag"] = 'W/"7"'
+        await _json_app(BODY)(scope, receive, send)
+
+    _, headers, _ = await _call(ETagMiddleware(endpoint), _scope())
+    _, post_headers, _ = await _call(ETagMiddleware(endpoint), _scope(method="POST"))
+
+    assert headers["etag"] == 'W/"7"'
+    assert "etag" not in post_headers
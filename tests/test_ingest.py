@@ -0,0 +1,75 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.organization import ingest
+from src.organization.ingest import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_PENDING,
+    OrganizationIngestQueue,
+)
+from src.organization.repository import OrganizationRepository
+from src.organization.schemas import OrganizationCreateSchema
+
+
+@pytest.fixture
+def queue(monkeypatch, session):
+    # Воркер открывает свои сессии; в тесте это сессия откатываемой транзакции
+    @asynccontextmanager
+    async def test_session():
+        yield session
+
+    monkeypatch.setattr(ingest, "async_session_maker", test_session)
+    return OrganizationIngestQueue(repository=OrganizationRepository(), batch_size=10)
+
+
+def _organization(name: str, building_id: int, activity_id: int):
+    return OrganizationCreateSchema(
+        name=name,
+        phones=[{"phone": "8-800-000-00-03"}],
+        building_id=building_id,
+        activity_ids=[activity_id],
+    )
+
+
+async def test_claimed_jobs_create_organizations(session, queue, dataset):
+    building_id = next(iter(dataset.buildings))
+    submitted = [
+        await queue.submit(session, _organization(name, building_id, dataset.leaves[0]))
+        for name in ("ООО Очередь 1", "ООО Очередь 2")
+    ]
+    assert [job.status for job in submitted] == [JOB_PENDING, JOB_PENDING]
+
+    assert await queue._flush() == 2
+
+    jobs = [await queue.get_job(session, job.job_id) for job in submitted]
+    assert [job.status for job in jobs] == [JOB_DONE, JOB_DONE]
+    organizations = [
+        await queue.repository.find_one(session, job.organization_id) for job in jobs
+    ]
+    assert [org.name for org in organizations] == ["ООО Очередь 1", "ООО Очередь 2"]
+    assert organizations[0].building.id == building_id
+    assert await queue.pending(session) == 0
+    assert await queue._flush() == 0
+
+
+async def test_bad_job_fails_alone(session, queue, dataset):
+    building_id = next(iter(dataset.buildings))
+    missing_building = max(dataset.buildings) + 1000
+    good = await queue.submit(
+        session, _organization("ООО Верная", building_id, dataset.leaves[0])
+    )
+    bad = await queue.submit(
+        session, _organization("ООО Без здания", missing_building, dataset.leaves[0])
+    )
+
+    assert await queue._flush() == 2
+
+    good_job = await queue.get_job(session, good.job_id)
+    bad_job = await queue.get_job(session, bad.job_id)
+    created = await queue.repository.find_one(session, good_job.organization_id)
+    assert good_job.status == JOB_DONE
+    assert created.name == "ООО Верная"
+    assert bad_job.status == JOB_FAILED
+    assert bad_job.organization_id is None and bad_job.error
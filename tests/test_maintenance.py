@@ -0,0 +1,39 @@
+from sqlalchemy import event
+
+from src.common.database import _record_call_site, query_call_sites, take_call_sites
+from src.common.maintenance import FIND_CALL_SITES, MaintenanceAdvisor, fingerprint
+from src.organization.repository import OrganizationRepository
+
+FIND_PAGE = "src.organization.repository:OrganizationRepository._find_page"
+
+
+def test_fingerprint_matches_normalized_statement():
+    sent = (
+        "SELECT jobs.id FROM jobs WHERE jobs.status = 'pending' "
+        "AND jobs.id IN ($1::VARCHAR, $2::VARCHAR) /* note */\n LIMIT 10"
+    )
+    # Так текст запроса хранит pg_stat_statements: константы заменены на $n
+    normalized = (
+        "SELECT jobs.id FROM jobs WHERE jobs.status = $3 "
+        "AND jobs.id IN ($1::VARCHAR, $2::VARCHAR) LIMIT $4"
+    )
+    assert fingerprint(sent) == fingerprint(normalized)
+    assert fingerprint(sent) != fingerprint(sent.replace("status", "error"))
+
+
+async def test_call_sites_saved_by_fingerprint(engine, session):
+    take_call_sites()
+    event.listen(engine.sync_engine, "before_cursor_execute", _record_call_site)
+    try:
+        await OrganizationRepository().find_by_name(session, "тест", limit=5)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _record_call_site)
+    [statement] = [s for s in query_call_sites if "ILIKE" in s]
+    assert query_call_sites[statement] == {FIND_PAGE}
+
+    conn = await session.connection()
+    assert await MaintenanceAdvisor().save_call_sites(conn)
+    assert not query_call_sites
+    key = fingerprint(statement)
+    found = dict((await conn.execute(FIND_CALL_SITES, {"fingerprints": [key]})).all())
+    assert found[key] == FIND_PAGE
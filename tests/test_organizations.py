@@ -0,0 +1,353 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import delete, func, insert, select, text
+
+from src.activity.models import OrganizationActivity
+from src.building.models import Building
+from src.common.database import Shard, ShardRouter
+from src.common.exceptions import (
+    InvalidPhoneNumberException,
+    OrganizationNotFoundException,
+    VersionConflictException,
+)
+from src.common.geo import GEOHASH_ALPHABET, region_of
+from src.common.metrics import metrics
+from src.organization.models import (
+    Organization,
+    OrganizationPhone,
+    OrganizationSearch,
+)
+from src.organization.planner import INDEX, SCAN, ActivityTreePlanner
+from src.organization.repository import OrganizationRepository
+from src.organization.schemas import (
+    OrganizationCreateSchema,
+    OrganizationFilterSchema,
+    OrganizationUpdateSchema,
+)
+from src.organization import service as organization_service
+from src.organization.service import OrganizationService
+
+
+@pytest.fixture
+def repository():
+    return OrganizationRepository()
+
+
+@pytest.fixture
+def service(repository):
+    return OrganizationService(repository=repository)
+
+
+async def test_find_one_loads_relations(session, repository, dataset):
+    organization = await repository.find_one(session, dataset.organization_ids[0])
+
+    assert organization.building.id in dataset.buildings
+    assert organization.phones
+    assert organization.activities
+
+
+async def test_activity_tree_includes_descendants(session, repository, dataset):
+    root = dataset.roots[0]
+    subtree = dataset.subtree(root)
+
+    organizations = await repository.find_by_activity_tree(session, root, limit=100)
+
+    assert organizations
+    for organization in organizations:
+        assert subtree & {activity.id for activity in organization.activities}
+
+
+async def test_activity_tree_plan_by_subtree_size(session, repository, dataset):
+    planner = ActivityTreePlanner()
+    await planner.refresh(session)
+    repository.tree_planner = planner
+    root, leaf = dataset.roots[0], dataset.leaves[0]
+
+    everything = await repository.find_by_activity_tree(session, root, limit=None)
+    scanned = await repository.find_by_activity_tree(session, root, limit=20)
+
+    assert planner.estimate(root) == len(everything)
+    assert planner.choose(root, 20, 0) == SCAN
+    assert planner.choose(leaf, 20, 0) == INDEX
+    assert len(scanned) == 20
+    assert {org.id for org in scanned} <= {org.id for org in everything}
+
+
+async def test_activity_tree_stats_shared_between_planners(session, dataset):
+    first = ActivityTreePlanner()
+    await first.refresh(session)
+    metrics.set("organizations.activity_tree.stats_ms", -1)
+
+    # Статистика свежая: второй воркер читает её, а не пересчитывает
+    second = ActivityTreePlanner()
+    await second.refresh(session)
+
+    assert metrics.get("organizations.activity_tree.stats_ms") == -1
+    root = dataset.roots[0]
+    assert second.estimate(root) == first.estimate(root) > 0
+
+
+async def test_bbox_returns_only_inside(session, repository, dataset):
+    lat, lon = next(iter(dataset.buildings.values()))
+    box = (lat - 0.1, lat + 0.1, lon - 0.1, lon + 0.1)
+
+    organizations = await repository.find_by_bbox(session, *box, limit=100)
+
+    assert organizations
+    for organization in organizations:
+        assert box[0] <= organization.building.latitude <= box[1]
+        assert box[2] <= organization.building.longitude <= box[3]
+
+
+async def test_nearest_sorted_by_distance(session, repository, dataset):
+    lat, lon = next(iter(dataset.buildings.values()))
+
+    rows = await repository.find_nearest_by_activity_tree(
+        session, dataset.roots[0], lat, lon, limit=20
+    )
+
+    distances = [distance for _, distance in rows]
+    assert distances == sorted(distances)
+
+
+async def test_fields_projection(session, repository):
+    fields = repository.fields.parse("name,building_address")
+
+    organizations = await repository.find_all(session, 5, 0, fields)
+
+    assert len(organizations) == 5
+    assert all(set(org) == {"id", "name", "building_address"} for org in organizations)
+
+
+async def test_filter_by_building_and_name(session, repository, dataset):
+    organization = await repository.find_one(session, dataset.organization_ids[7])
+    expected = (
+        await session.scalars(
+            select(Organization.id).where(
+                Organization.building_id == organization.building_id
+            )
+        )
+    ).all()
+
+    in_building = await repository.find_by_building(
+        session, organization.building_id, limit=100
+    )
+    by_name = await repository.find_by_name(session, organization.name.upper())
+
+    assert [org.id for org in in_building] == sorted(expected)
+    assert organization.id in {org.id for org in by_name}
+
+
+async def test_filter_by_phone_and_prefix(session, service, dataset):
+    number = dataset.phones[0]
+    digits = "".join(ch for ch in number if ch.isdigit())
+
+    exact = await service.get_filtered_organizations(
+        session, OrganizationFilterSchema(phone=number)
+    )
+    prefix = await service.get_filtered_organizations(
+        session, OrganizationFilterSchema(phone_prefix=digits[:-1], limit=100)
+    )
+
+    assert [org["id"] for org in exact] == [dataset.organization_ids[0]]
+    assert dataset.organization_ids[0] in {org["id"] for org in prefix}
+    with pytest.raises(InvalidPhoneNumberException):
+        await service.get_filtered_organizations(
+            session, OrganizationFilterSchema(phone="---")
+        )
+
+
+async def test_lookup_phones_keeps_request_order(session, service, dataset):
+    phones = [dataset.phones[3], "нет номера", dataset.phones[0]]
+
+    result = await service.lookup_phones(session, phones)
+
+    assert [item["phone"] for item in result] == phones
+    assert result[1]["organizations"] == []
+    assert result[2]["organizations"][0]["id"] == dataset.organization_ids[0]
+
+
+async def test_lookup_phones_keeps_duplicates(session, service, dataset):
+    phones = [dataset.phones[0], "нет номера", dataset.phones[0]]
+
+    result = await service.lookup_phones(session, phones)
+
+    assert [item["phone"] for item in result] == phones
+    assert result[0]["organizations"] == result[2]["organizations"]
+    assert result[0]["organizations"][0]["id"] == dataset.organization_ids[0]
+
+
+async def test_search_refresh_drops_deleted_phone(session, repository, dataset):
+    org_id = dataset.organization_ids[0]
+    kept, removed = (
+        "".join(ch for ch in number if ch.isdigit()) for number in dataset.phones[:2]
+    )
+    await session.execute(
+        delete(OrganizationPhone).where(OrganizationPhone.phone_digits == removed)
+    )
+    xid = await session.scalar(text("SELECT pg_current_xact_id()::text::bigint"))
+
+    await repository.refresh_search_changes(session, xid, xid + 1)
+
+    digits = await session.scalar(
+        select(OrganizationSearch.phone_digits).where(OrganizationSearch.id == org_id)
+    )
+    assert digits == [kept]
+
+
+async def test_search_documents_land_in_every_region(session, repository, dataset):
+    # Центры всех 32 ячеек 45° x 45°: у каждой своя секция organization_search
+    points = [
+        (-90 + 45 * la + 22.5, -180 + 45 * lo + 22.5)
+        for la in range(4)
+        for lo in range(8)
+    ]
+    res = await session.execute(
+        insert(Building).returning(Building.id, sort_by_parameter_order=True),
+        [
+            {"address": f"Регион {i}", "latitude": lat, "longitude": lon}
+            for i, (lat, lon) in enumerate(points)
+        ],
+    )
+    building_ids = list(res.scalars().all())
+
+    org_ids = await repository.create_many(
+        session,
+        [
+            {"name": f"ООО Регион {i}", "building_id": building_id}
+            for i, building_id in enumerate(building_ids)
+        ],
+    )
+
+    rows = await session.execute(
+        select(OrganizationSearch.id, OrganizationSearch.region).where(
+            OrganizationSearch.id.in_(org_ids)
+        )
+    )
+    regions = dict(rows.tuples().all())
+    assert [regions[id] for id in org_ids] == [region_of(*point) for point in points]
+    assert set(regions.values()) == set(GEOHASH_ALPHABET)
+
+
+async def test_created_organization_is_searchable(session, service, dataset):
+    building_id = next(iter(dataset.buildings))
+    leaf = dataset.leaves[0]
+    data = OrganizationCreateSchema(
+        name="ООО Новая",
+        phones=[{"phone": "8-800-000-00-01"}],
+        building_id=building_id,
+        activity_ids=[leaf],
+    )
+
+    created = await service.create_organization(session, data)
+    found = await service.get_filtered_organizations(
+        session, OrganizationFilterSchema(activity_id=leaf, limit=100)
+    )
+
+    assert created.building.id == building_id
+    assert created.id in {org["id"] for org in found}
+
+
+async def test_update_with_stale_version_conflicts(session, service, dataset):
+    org_id = dataset.organization_ids[1]
+    version = (await service.get_organization(session, org_id)).version
+
+    updated = await service.update_organization(
+        session, org_id, OrganizationUpdateSchema(name="ООО Другая", version=version)
+    )
+
+    assert updated.version == version + 1
+    with pytest.raises(VersionConflictException):
+        await service.update_organization(
+            session,
+            org_id,
+            OrganizationUpdateSchema(name="ООО Третья", version=version),
+        )
+
+
+async def test_update_replaces_loaded_children(session, service, dataset):
+    org_id = dataset.organization_ids[2]
+    # Организация остаётся в identity map: ответ PATCH перечитывается из БД
+    loaded = await service.get_organization(session, org_id)
+    version = loaded.version
+    activity_ids = dataset.leaves[:2]
+
+    updated = await service.update_organization(
+        session,
+        org_id,
+        OrganizationUpdateSchema(
+            phones=[{"phone": "8-800-000-00-02"}],
+            activity_ids=activity_ids,
+            version=version,
+        ),
+    )
+
+    assert [phone.phone for phone in updated.phones] == ["8-800-000-00-02"]
+    assert {activity.id for activity in updated.activities} == set(activity_ids)
+    assert updated.version == version + 1
+
+
+async def test_delete_removes_children(session, service, dataset):
+    org_id = dataset.organization_ids[3]
+    await service.get_organization(session, org_id)
+
+    await service.delete_organization(session, org_id)
+
+    phones = await session.scalar(
+        select(func.count())
+        .select_from(OrganizationPhone)
+        .where(OrganizationPhone.organization_id == org_id)
+    )
+    links = await session.scalar(
+        select(func.count())
+        .select_from(OrganizationActivity)
+        .where(OrganizationActivity.organization_id == org_id)
+    )
+    assert (phones, links) == (0, 0)
+    with pytest.raises(OrganizationNotFoundException):
+        await service.get_organization(session, org_id)
+
+
+async def test_delete_missing_organization(session, service):
+    with pytest.raises(OrganizationNotFoundException):
+        await service.delete_organization(session, 0)
+
+
+async def test_get_missing_organization(session, service):
+    with pytest.raises(OrganizationNotFoundException):
+        await service.get_organization(session, 0)
+
+
+async def test_sharded_pages_merge_by_id(monkeypatch, service):
+    # Два шарда с чередующимися id: каждый отдаёт свои строки по id
+    shards = [
+        Shard("primary", 0, None, None, None),
+        Shard("second", 1, frozenset("u"), None, None),
+    ]
+    stored = {0: [1, 4, 5, 8, 9], 1: [2, 3, 6, 7, 10]}
+    monkeypatch.setattr(organization_service, "shard_router", ShardRouter(shards, 100))
+
+    @asynccontextmanager
+    async def shard_session(session, shard):
+        yield shard
+
+    async def find_filtered(shard, filters):
+        page = stored[shard.index][filters.offset : filters.offset + filters.limit]
+        return [{"id": id} for id in page]
+
+    monkeypatch.setattr(service, "_shard_session", shard_session)
+    monkeypatch.setattr(service, "_find_filtered", find_filtered)
+
+    pages = [
+        await service._get_filtered_organizations(
+            None, OrganizationFilterSchema(limit=3, offset=offset)
+        )
+        for offset in (0, 3, 6, 9)
+    ]
+    assert [[row["id"] for row in page] for page in pages] == [
+        [1, 2, 3],
+        [4, 5, 6],
+        [7, 8, 9],
+        [10],
+    ]
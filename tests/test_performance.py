@@ -0,0 +1,230 @@
+"""Потолки числа запросов и времени ответа для основных эндпоинтов
+
+Запросы считаются на уровне сервисов, которые вызывают обработчики API.
+Полный ответ об организации — это основной SELECT и по одному selectinload
+на здание, виды деятельности и телефоны, то есть 4 запроса на страницу
+любой длины.
+"""
+import pytest
+
+from src.activity.repository import ActivityRepository
+from src.activity.service import ActivityService
+from src.batch.dependencies import batch_service
+from src.batch.schemas import BatchRequestSchema
+from src.building.repository import BuildingRepository
+from src.building.service import BuildingService
+from src.organization.repository import OrganizationRepository
+from src.organization.schemas import OrganizationCreateSchema, OrganizationFilterSchema
+from src.organization.service import OrganizationService
+from tests.perf import assert_latency, assert_max_queries, assert_no_n_plus_one
+
+pytestmark = pytest.mark.performance
+
+ORGANIZATION_QUERIES = 4
+
+
+@pytest.fixture
+def organizations():
+    return OrganizationService(repository=OrganizationRepository())
+
+
+@pytest.fixture
+def activities():
+    return ActivityService(repository=ActivityRepository())
+
+
+@pytest.fixture
+def buildings():
+    return BuildingService(repository=BuildingRepository())
+
+
+def _filters(dataset):
+    """Фильтры списка организаций по имени сценария"""
+    lat, lon = next(iter(dataset.buildings.values()))
+    return {
+        "page": {},
+        "activity": {"activity_id": dataset.roots[0]},
+        "radius": {"lat": lat, "lon": lon, "radius": 0.3},
+        "bbox": {
+            "lat_min": lat - 0.3,
+            "lat_max": lat + 0.3,
+            "lon_min": lon - 0.3,
+            "lon_max": lon + 0.3,
+        },
+        "search": {"search": "Тест 1"},
+        "phone_prefix": {"phone_prefix": "7900"},
+    }
+
+
+SCENARIOS = ("page", "activity", "radius", "bbox", "search", "phone_prefix")
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+async def test_organization_list_queries(sql, session, organizations, dataset, scenario):
+    filters = _filters(dataset)[scenario]
+
+    async def call(limit):
+        page = await organizations.get_filtered_organizations(
+            session, OrganizationFilterSchema(**filters, limit=limit)
+        )
+        assert page
+
+    await assert_no_n_plus_one(sql, session, call, ORGANIZATION_QUERIES)
+
+
+@pytest.mark.parametrize(
+    ("fields", "limit"),
+    [("id,name", 1), ("id,name,building_id,version", 1), ("name,phones", 2)],
+)
+async def test_organization_fields_queries(sql, session, organizations, fields, limit):
+    async def call(rows):
+        await organizations.get_filtered_organizations(
+            session, OrganizationFilterSchema(fields=fields, limit=rows)
+        )
+
+    await assert_no_n_plus_one(sql, session, call, limit)
+
+
+async def test_nearest_queries(sql, session, organizations, dataset):
+    lat, lon = next(iter(dataset.buildings.values()))
+
+    async def call(limit):
+        await organizations.get_nearest_organizations(
+            session, dataset.roots[0], lat, lon, limit
+        )
+
+    await assert_no_n_plus_one(sql, session, call, ORGANIZATION_QUERIES)
+
+
+async def test_organization_detail_queries(sql, session, organizations, dataset):
+    queries = await sql.run(
+        session,
+        lambda: organizations.get_organization(session, dataset.organization_ids[0]),
+    )
+
+    assert_max_queries(queries, ORGANIZATION_QUERIES)
+
+
+async def test_phone_lookup_single_query(sql, session, organizations, dataset):
+    async def call(count):
+        await organizations.lookup_phones(session, dataset.phones[:count])
+
+    await assert_no_n_plus_one(sql, session, call, 1, rows=100)
+
+
+async def test_batch_queries(sql, session, dataset):
+    """Пакет с любым числом запросов: за каждый из двух проходов — не больше
+    запроса на тип сущности (виды деятельности читаются в обоих)"""
+    service = batch_service()
+
+    async def call(count):
+        queries = []
+        for org_id in dataset.organization_ids[:count]:
+            queries.append(
+                {
+                    "entity": "organization",
+                    "ids": [org_id],
+                    "include": ["building", "activities"],
+                }
+            )
+            queries.append(
+                {"entity": "activity", "ids": dataset.leaves[:1], "include": ["parent"]}
+            )
+        await service.execute(session, BatchRequestSchema(queries=queries))
+
+    await assert_no_n_plus_one(sql, session, call, 4)
+
+
+async def test_activity_list_queries(sql, session, activities):
+    async def call(limit):
+        await activities.get_activities(session, limit, 0)
+
+    await assert_no_n_plus_one(sql, session, call, 2)
+
+
+async def test_building_list_queries(sql, session, buildings):
+    async def call(limit):
+        await buildings.get_buildings(session, limit, 0)
+
+    await assert_no_n_plus_one(sql, session, call, 1)
+
+
+async def test_create_organization_queries(sql, session, dataset):
+    """Пачка организаций пишется тем же числом запросов, что и одна"""
+    repository = OrganizationRepository()
+    building_id = next(iter(dataset.buildings))
+    counter = iter(range(1_000_000))
+
+    def items(count):
+        return [
+            {
+                "name": f"ООО Пачка {next(counter)}",
+                "building_id": building_id,
+                "phones": [{"phone": "8-800-000-00-02"}],
+                "activity_ids": dataset.leaves[:2],
+            }
+            for _ in range(count)
+        ]
+
+    async def call(count):
+        await repository.create_many(session, items(count))
+
+    await assert_no_n_plus_one(sql, session, call, 4, rows=50)
+
+
+# Потолки p95 в мс на наборе tests.data
+LATENCY_CEILINGS = {
+    "page": 30,
+    "activity": 40,
+    "radius": 40,
+    "bbox": 40,
+    "search": 60,
+    "phone_prefix": 30,
+}
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+async def test_organization_list_latency(session, organizations, dataset, scenario):
+    filters = OrganizationFilterSchema(**_filters(dataset)[scenario], limit=20)
+
+    await assert_latency(
+        lambda: organizations.get_filtered_organizations(session, filters),
+        LATENCY_CEILINGS[scenario],
+    )
+
+
+async def test_nearest_latency(session, organizations, dataset):
+    lat, lon = next(iter(dataset.buildings.values()))
+
+    await assert_latency(
+        lambda: organizations.get_nearest_organizations(
+            session, dataset.roots[0], lat, lon, 10
+        ),
+        40,
+    )
+
+
+async def test_organization_detail_latency(session, organizations, dataset):
+    org_id = dataset.organization_ids[len(dataset.organization_ids) // 2]
+
+    await assert_latency(
+        lambda: organizations.get_organization(session, org_id), 15
+    )
+
+
+async def test_create_organization_latency(session, organizations, dataset):
+    building_id = next(iter(dataset.buildings))
+    counter = iter(range(1_000_000))
+
+    async def create():
+        await organizations.create_organization(
+            session,
+            OrganizationCreateSchema(
+                name=f"ООО Замер {next(counter)}",
+                phones=[{"phone": "8-800-000-00-03"}],
+                building_id=building_id,
+                activity_ids=dataset.leaves[:2],
+            ),
+        )
+
+    await assert_latency(create, 50)
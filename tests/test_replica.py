@@ -0,0 +1,92 @@
+import pytest
+
+from src.activity.repository import ActivityRepository
+from src.building.repository import BuildingRepository
+from src.organization.repository import OrganizationRepository
+from src.replica.build import build
+from src.replica.database import Replica
+from src.replica.repository import (
+    ReplicaActivityRepository,
+    ReplicaBuildingRepository,
+    ReplicaOrganizationRepository,
+)
+
+ALL = 10_000
+
+
+@pytest.fixture
+async def replica_session(session, dataset, tmp_path):
+    """Сессия реплики, собранной из тестовой БД"""
+    pytest.importorskip("aiosqlite")
+    replica = Replica(str(tmp_path / "directory.db"))
+    replica.version = await build(await session.connection(), tmp_path / "directory.db", 500)
+    async with replica.shard.session_maker() as replica_session:
+        yield replica_session
+    await replica.dispose()
+
+
+def _ids(items) -> set[int]:
+    return {item.id for item in items}
+
+
+async def test_organization_lookups_match_postgres(session, replica_session, dataset):
+    postgres = OrganizationRepository()
+    replica = ReplicaOrganizationRepository()
+    lat, lon = dataset.buildings[next(iter(dataset.buildings))]
+    digits = "".join(c for c in dataset.phones[3] if c.isdigit())
+    lookups = [
+        ("find_by_activity_tree", (dataset.roots[0],)),
+        ("find_by_activity_tree", (dataset.leaves[-1],)),
+        ("find_by_name", ("тест 12",)),
+        ("find_by_name", ("1",)),
+        ("find_by_phone", (digits,)),
+        ("find_by_phone", (digits[:8], True)),
+        ("find_by_bbox", (lat - 0.1, lat + 0.1, lon - 0.1, lon + 0.1)),
+    ]
+    for method, args in lookups:
+        expected = await getattr(postgres, method)(session, *args, limit=ALL)
+        found = await getattr(replica, method)(replica_session, *args, limit=ALL)
+        assert expected, method
+        assert _ids(found) == _ids(expected), (method, args)
+
+    # limit=None — без ограничения, как в Postgres
+    for method, args in lookups:
+        found = await getattr(replica, method)(replica_session, *args, limit=None)
+        expected = await getattr(replica, method)(replica_session, *args, limit=ALL)
+        assert _ids(found) == _ids(expected), (method, args)
+
+    organization = await replica.find_one(replica_session, dataset.organization_ids[0])
+    assert [phone.phone for phone in organization.phones]
+    assert organization.building.address
+
+
+async def test_nearest_matches_postgres(session, replica_session, dataset):
+    lat, lon = 55.75, 37.62
+    for max_distance in (None, 0.2):
+        expected = await OrganizationRepository().find_nearest_by_activity_tree(
+            session, dataset.roots[1], lat, lon, 20, max_distance
+        )
+        found = await ReplicaOrganizationRepository().find_nearest_by_activity_tree(
+            replica_session, dataset.roots[1], lat, lon, 20, max_distance
+        )
+        assert [d for _, d in found] == pytest.approx([d for _, d in expected])
+
+
+async def test_buildings_and_activities_match_postgres(session, replica_session, dataset):
+    box = (55.6, 55.8, 37.5, 37.7)
+    assert _ids(await ReplicaBuildingRepository().find_in_bbox(replica_session, *box)) == _ids(
+        await BuildingRepository().find_in_bbox(session, *box)
+    )
+    assert await ReplicaActivityRepository().find_tree(replica_session) == dataset.parents
+
+    ids = dataset.organization_ids[:5]
+    expected = await OrganizationRepository().find_rows(session, ids)
+    found = await ReplicaOrganizationRepository().find_rows(replica_session, ids)
+    for id in ids:
+        assert sorted(found[id]["activity_ids"]) == sorted(expected[id]["activity_ids"])
+        assert sorted(found[id]["phones"]) == sorted(expected[id]["phones"])
+    activities = await ReplicaActivityRepository().find_many(replica_session, dataset.roots)
+    assert [a.id for a in activities] == sorted(dataset.roots)
+    assert len(await ReplicaActivityRepository().find_all(replica_session)) == len(
+        await ActivityRepository().find_all(session)
+    )
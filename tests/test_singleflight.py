@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from src.common.metrics import metrics
+from src.common.singleflight import SingleFlight
+from src.organization.repository import OrganizationRepository
+from src.organization.schemas import OrganizationFilterSchema
+from src.organization.service import OrganizationService
+
+
+async def test_concurrent_identical_lists_share_one_query(session, sql, dataset):
+    service = OrganizationService(repository=OrganizationRepository())
+    filters = OrganizationFilterSchema(building_id=next(iter(dataset.buildings)))
+    shared = metrics.get("singleflight.organizations.shared")
+
+    single = await sql.run(
+        session, lambda: service.get_filtered_organizations(session, filters)
+    )
+    session.expunge_all()
+    with sql.capture() as concurrent:
+        first, second = await asyncio.gather(
+            service.get_filtered_organizations(session, filters),
+            service.get_filtered_organizations(session, filters),
+        )
+
+    assert single and len(concurrent) == len(single)
+    assert first is second
+    assert metrics.get("singleflight.organizations.shared") == shared + 1
+
+
+async def test_waiter_runs_query_itself_when_leader_cancelled():
+    flight = SingleFlight("test", enabled=True)
+    started = asyncio.Event()
+    calls = []
+
+    async def slow():
+        calls.append("leader")
+        started.set()
+        await asyncio.sleep(10)
+
+    async def fast():
+        calls.append("waiter")
+        return "своя страница"
+
+    leader = asyncio.create_task(flight.do("key", slow))
+    await started.wait()
+    waiter = asyncio.create_task(flight.do("key", fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "своя страница"
+    assert calls == ["leader", "waiter"]
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_waiters_get_leader_error():
+    flight = SingleFlight("test", enabled=True)
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("нет БД")
+
+    results = await asyncio.gather(
+        flight.do("key", failing), flight.do("key", failing), return_exceptions=True
+    )
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert results[0] is results[1]
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import func, select, text
+
+from src.organization.models import Organization
+from src.organization.repository import OrganizationRepository
+from src.snapshot.job import DELETED, SOURCES, export, source_statement, stream_chunks
+
+SOURCE = {source.name: source for source in SOURCES}
+
+
+async def _rows(conn, source, since=None, until=None, chunk=1000):
+    rows = []
+    async for batch in stream_chunks(conn, source_statement(source, since, until), chunk):
+        assert len(batch) <= chunk
+        rows += batch
+    return rows
+
+
+async def test_stream_in_bounded_chunks(session, dataset):
+    conn = await session.connection()
+    total = (await session.execute(select(func.count()).select_from(Organization))).scalar_one()
+
+    rows = await _rows(conn, SOURCE["directory"], chunk=7)
+
+    assert len(rows) == total
+    assert all(row[6] is not None and row[8] is not None for row in rows)
+
+
+async def test_incremental_contains_changes_and_deletions(session, dataset):
+    repository = OrganizationRepository()
+    changed_id, deleted_id = dataset.organization_ids[:2]
+    await repository.update_one(session, changed_id, {"name": "ООО Снимок"})
+    await repository.delete_one(session, deleted_id)
+    conn = await session.connection()
+    xid = (await conn.execute(text("SELECT pg_current_xact_id()::text::bigint"))).scalar_one()
+
+    directory = await _rows(conn, SOURCE["directory"], xid, xid + 1)
+    deleted = await _rows(conn, DELETED, xid, xid + 1)
+
+    assert [(row[0], row[1]) for row in directory] == [(changed_id, "ООО Снимок")]
+    assert ("organization", deleted_id) in {(row[0], row[1]) for row in deleted}
+    assert await _rows(conn, SOURCE["organizations"], xid + 1, xid + 2) == []
+
+
+async def test_export_writes_parquet(session, dataset, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    conn = await session.connection()
+
+    target = await export(conn, tmp_path, None, 100)
+
+    table = pq.read_table(target / "directory.parquet")
+    assert table.num_rows == len(await _rows(conn, SOURCE["directory"]))
+    assert set(table.column_names) == set(SOURCE["directory"].columns)